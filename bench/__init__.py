@@ -0,0 +1 @@
+"""基准测试脚本包（在项目根目录下以 python -m bench.xxx 运行）。"""
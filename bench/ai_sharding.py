@@ -0,0 +1,198 @@
+"""AI 分片基准：按章节分片并发请求 vs 整篇单次请求
+
+生成一篇约 100 页的合成论文（题目 + 中英文摘要 + 若干章/小节），分别用整篇请求与分片请求
+（Preprocessor.call_ai_api_sharded）测墙钟时间，并检查拼接后的标题编号是否连续。
+
+默认发往本地的 OpenAI 兼容桩服务：首字节延迟固定，之后按固定速率输出与输入等长的内容，
+模拟"耗时随篇幅线性增长"的生成过程；加 --real 则使用 api_config.json 中当前选中的提供商。
+
+用法（项目根目录下）：
+    python -m bench.ai_sharding --pages 100 --concurrency 4
+    python -m bench.ai_sharding --ttfb 1.5 --chars-per-sec 400
+    python -m bench.ai_sharding --real
+"""
+import argparse
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core import provider_stats, sharding
+from core.preprocess import Preprocessor
+from core.splitter import parse_sections
+
+CHARS_PER_PAGE = 900
+_CN_NUMS = "一二三四五六七八九十"
+_FILLER = (
+    "本节围绕物流配送路径优化问题展开讨论，结合实际业务场景分析算法在动态路网中的表现，"
+    "并给出实验设置、评价指标与结果分析。"
+)
+
+
+def make_thesis(pages, chapters=8, sections=5):
+    """合成论文原文：每章若干小节，每节若干段，总长约 pages * CHARS_PER_PAGE 字"""
+    lines = [
+        "毕业论文",
+        "题目：基于深度强化学习的智能物流路径优化系统设计与实现",
+        "摘要",
+        _FILLER * 4,
+        "关键词：深度强化学习；路径优化；智能物流",
+        "Abstract",
+        "This thesis studies route optimization for logistics with deep reinforcement learning. " * 4,
+        "Keywords: Deep Reinforcement Learning; Route Optimization; Logistics",
+    ]
+    per_section = pages * CHARS_PER_PAGE // (chapters * sections)
+    paragraphs = max(1, per_section // len(_FILLER))
+    for c in range(1, chapters + 1):
+        lines.append(f"第{_CN_NUMS[c - 1] if c <= 10 else c}章 研究内容{c}")
+        for s in range(1, sections + 1):
+            lines.append(f"{c}.{s} 小节{c}.{s}")
+            lines.extend(_FILLER for _ in range(paragraphs))
+    lines += ["参考文献", "[1] 张三. 物流路径优化研究. 2024."]
+    return "\n".join(lines)
+
+
+# ================= 本地桩服务 =================
+_HEADING = re.compile(r"^(?:第([一二三四五六七八九十\d]+)章|(\d+)\.(\d+))\s+(.*)$")
+
+
+def fake_reply(user_content):
+    """模拟 AI 输出：按分片说明决定输出哪些模块，正文标题转为 Markdown（每片都从 1 开始编号）"""
+    raw = user_content.split("请按要求处理：\n\n", 1)[-1]
+    front_only = "abstract_cn.md=== 与" in user_content
+    body_only = "只输出 ===FILE: body.md===" in user_content
+
+    parts = []
+    if not body_only:
+        parts.append("===FILE: abstract_cn.md===\n" + raw[:200])
+        parts.append("===FILE: abstract_en.md===\n" + raw[200:400])
+    if not front_only:
+        body = []
+        chapter = 0
+        for line in raw.splitlines():
+            m = _HEADING.match(line)
+            if m and m.group(4) and line.startswith("第"):
+                chapter += 1
+                body.append(f"# {chapter}  {m.group(4)}")
+            elif m and m.group(2):
+                body.append(f"## {max(chapter, 1)}.{m.group(3)}  {m.group(4)}")
+            else:
+                body.append(line)
+        parts.append("===FILE: body.md===\n" + "\n\n".join(body))
+    return "\n\n".join(parts)
+
+
+def make_handler(ttfb, chars_per_sec, stats):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *_args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            reply = fake_reply(body["messages"][-1]["content"])
+            with stats["lock"]:
+                stats["requests"] += 1
+                stats["in_flight"] += 1
+                stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+            try:
+                time.sleep(ttfb)
+                if body.get("stream"):
+                    self._stream(reply)
+                else:
+                    time.sleep(len(reply) / chars_per_sec)
+                    self._json(reply)
+            finally:
+                with stats["lock"]:
+                    stats["in_flight"] -= 1
+
+        def _json(self, reply):
+            data = json.dumps({
+                "id": "bench", "object": "chat.completion", "created": 0, "model": "stub",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _stream(self, reply, chunk=200):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for i in range(0, len(reply), chunk):
+                piece = reply[i:i + chunk]
+                time.sleep(len(piece) / chars_per_sec)
+                event = {
+                    "id": "bench", "object": "chat.completion.chunk", "created": 0, "model": "stub",
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                }
+                self.wfile.write(b"data: " + json.dumps(event).encode("utf-8") + b"\n\n")
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+
+    return Handler
+
+
+def heading_numbers(markdown):
+    return re.findall(r"^#{1,3} (\d+(?:\.\d+)*)", markdown, re.M)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI 分片并发 vs 整篇单次请求")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=sharding.SHARD_CONCURRENCY)
+    parser.add_argument("--max-chars", type=int, default=sharding.SHARD_MAX_CHARS)
+    parser.add_argument("--ttfb", type=float, default=0.5, help="桩服务首字节延迟（秒）")
+    parser.add_argument("--chars-per-sec", type=float, default=20000, help="桩服务输出速率（字/秒）")
+    parser.add_argument("--real", action="store_true", help="使用 api_config.json 中的真实提供商")
+    args = parser.parse_args()
+
+    raw_text = make_thesis(args.pages)
+    front, shards = sharding.split_chapters(raw_text, args.max_chars)
+    print(f"合成论文: {len(raw_text)} 字 (约 {len(raw_text) // CHARS_PER_PAGE} 页), "
+          f"摘要 {len(front)} 字 + {len(shards)} 个正文分片")
+
+    server = None
+    stats = {"lock": threading.Lock(), "requests": 0, "in_flight": 0, "max_in_flight": 0}
+    if args.real:
+        from core import config_manager  # 依赖 PyQt6，仅 --real 时导入
+
+        api_config = config_manager.get_selected_provider_config(config_manager.load_api_config())
+    else:
+        # 桩服务的测速样本写入临时文件，不混入真实的 provider_stats.json
+        provider_stats.set_stats_file(os.path.join(tempfile.mkdtemp(prefix="bench_stats_"), "provider_stats.json"))
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.ttfb, args.chars_per_sec, stats))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        api_config = {"api_key": "bench", "base_url": f"http://127.0.0.1:{server.server_port}/v1", "model_name": "stub"}
+
+    quiet = lambda _msg: None  # noqa: E731
+    try:
+        processor = Preprocessor(api_config=dict(api_config, shard=False))
+        t0 = time.perf_counter()
+        processor.stream_ai_api(raw_text, log=quiet)
+        single_s = time.perf_counter() - t0
+
+        processor = Preprocessor(api_config=dict(api_config, shard=True))
+        t0 = time.perf_counter()
+        sharded = processor.call_ai_api_sharded(raw_text, concurrency=args.concurrency, max_chars=args.max_chars, log=quiet)
+        sharded_s = time.perf_counter() - t0
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    numbers = heading_numbers(parse_sections(sharded).get("body.md", ""))
+    chapters = [n for n in numbers if "." not in n]
+    print(f"{'模式':<10}{'耗时':>10}")
+    print(f"{'整篇单次':<8}{single_s:>10.2f}s")
+    print(f"{'分片并发':<8}{sharded_s:>10.2f}s   (并发 {args.concurrency}, 加速 {single_s / sharded_s:.2f}x)")
+    if server is not None:
+        print(f"桩服务: 共 {stats['requests']} 次请求, 最大同时在途 {stats['max_in_flight']}")
+    print(f"拼接后一级标题编号: {' '.join(chapters)}  (共 {len(numbers)} 个编号标题)")
+
+
+if __name__ == "__main__":
+    main()
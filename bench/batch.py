@@ -0,0 +1,98 @@
+"""批量排版吞吐基准：逐份处理 vs BatchRunner 并发
+
+生成 N 份合成论文原文（.txt），AI 请求发往本地的 OpenAI 兼容桩服务（首字节延迟 + 固定输出速率），
+组装阶段使用 FakeWordApplication 组成的 Word 实例池（每次 COM 调用注入延迟），只组装静态组件以免依赖 Pandoc。
+分别以"同时处理 1 份、组装 1 份"与"同时处理 --concurrency 份、组装 --word-instances 份"跑完整批，
+对比墙钟时间与吞吐量（份/小时）。
+
+用法（项目根目录下）：
+    python -m bench.batch --docs 12 --concurrency 4 --word-instances 2
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer
+
+from bench.ai_sharding import make_handler, make_thesis
+from core import preprocess, provider_stats
+from core.batch import BatchRunner
+from core.fake_word import FakeWordApplication
+from core.word_pool import PooledWordBackend, WordPool
+
+STATIC_COMPONENTS = ["cover", "originality", "symbols", "toc"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量排版：逐份 vs 并发")
+    parser.add_argument("--docs", type=int, default=12)
+    parser.add_argument("--pages", type=int, default=5, help="每份合成论文的页数")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--word-instances", type=int, default=2)
+    parser.add_argument("--ttfb", type=float, default=3.0, help="桩服务首字节延迟（秒）")
+    parser.add_argument("--chars-per-sec", type=float, default=5000, help="桩服务输出速率（字/秒）")
+    parser.add_argument("--com-latency", type=float, default=0.005, help="每次 COM 调用的延迟（秒）")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="bench_batch_")
+    # 测速样本与 AI 回复缓存都放到临时目录，不混入真实数据
+    provider_stats.set_stats_file(os.path.join(work, "provider_stats.json"))
+    preprocess.AI_CACHE_DIR = os.path.join(work, "ai_cache")
+
+    inputs = []
+    for i in range(args.docs):
+        path = os.path.join(work, f"报告{i + 1:02d}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"学号 2024{i:04d}\n" + make_thesis(args.pages))
+        inputs.append(path)
+
+    stats = {"lock": threading.Lock(), "requests": 0, "in_flight": 0, "max_in_flight": 0}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.ttfb, args.chars_per_sec, stats))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_config = {
+        "provider": "stub", "api_key": "bench", "model_name": "stub", "shard": False,
+        "base_url": f"http://127.0.0.1:{server.server_port}/v1",
+    }
+
+    results = []
+    try:
+        for label, concurrency, instances in (
+            ("逐份处理", 1, 1),
+            ("批量并发", args.concurrency, args.word_instances),
+        ):
+            pool = WordPool(
+                size=instances,
+                app_factory=lambda: FakeWordApplication(latency=args.com_latency, write_outputs=True),
+                startup_delay=0,
+            ).start()
+            runner = BatchRunner(
+                inputs,
+                STATIC_COMPONENTS,
+                api_config,
+                output_dir=os.path.join(work, f"out_{concurrency}"),
+                use_ai_cache=False,
+                concurrency=concurrency,
+                build_workers=instances,
+                backend=lambda: PooledWordBackend(pool),
+                log=lambda _msg: None,
+            )
+            with contextlib.redirect_stdout(io.StringIO()):  # 屏蔽 [2/4]、[Merge] 等进度输出
+                summary = runner.run()
+            pool.shutdown()
+            results.append((label, concurrency, instances, summary))
+    finally:
+        server.shutdown()
+
+    print(f"{args.docs} 份文档, 每份约 {args.pages} 页; AI 首字节 {args.ttfb:g}s, COM 延迟 {args.com_latency * 1000:g} ms/次")
+    print(f"{'方式':<10}{'并发':>6}{'Word':>6}{'成功':>6}{'耗时':>10}{'吞吐(份/小时)':>16}")
+    for label, concurrency, instances, summary in results:
+        print(f"{label:<8}{concurrency:>6}{instances:>6}{summary['ok']:>6}"
+              f"{summary['wall_s']:>9.1f}s{summary['docs_per_hour']:>16.0f}")
+    print(f"桩服务最大同时在途请求: {stats['max_in_flight']}")
+    print(f"清单: {runner.manifest_path}")
+
+
+if __name__ == "__main__":
+    main()
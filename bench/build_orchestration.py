@@ -0,0 +1,74 @@
+"""构建编排基准：用 FakeWordApplication 代替真实 Word，统计每篇文档的 COM 往返次数与耗时
+
+用法（项目根目录下，Linux 亦可运行）：
+    python -m bench.build_orchestration --latency 0.002 --runs 3
+    python -m bench.build_orchestration --startup 1.5 --runs 5 --pool 1   # 对比常驻实例池
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import time
+
+from core import build_engine
+from core.backends import WordComBackend
+from core.fake_word import FakeWordApplication
+from core.word_pool import PooledWordBackend, WordPool
+
+# 仅使用静态组件，避免依赖 Pandoc
+STATIC_COMPONENTS = ["cover", "originality", "symbols", "toc"]
+
+
+def run_once(backend, components):
+    builder = build_engine.DocumentBuilder(backend=backend)
+
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        builder.build(components, os.path.join(build_engine.Config.TEMP_DIR, "bench_fake.docx"))
+    return time.perf_counter() - t0, backend.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Word COM 编排基准 (FakeWordApplication)")
+    parser.add_argument("--latency", type=float, default=0.0, help="每次 COM 调用注入的延迟（秒）")
+    parser.add_argument("--startup", type=float, default=0.0, help="模拟 Word 启动耗时（秒）")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--components", default=",".join(STATIC_COMPONENTS))
+    parser.add_argument("--pool", type=int, default=0, help="使用常驻实例池（实例数），0 表示每次构建启动 Word")
+    args = parser.parse_args()
+
+    components = [c.strip() for c in args.components.split(",") if c.strip()]
+    apps = []
+
+    def factory():
+        app = FakeWordApplication(latency=args.latency, startup_latency=args.startup)
+        apps.append(app)
+        return app
+
+    pool = None
+    if args.pool:
+        pool = WordPool(size=args.pool, app_factory=factory, startup_delay=0).start()
+
+    timings = []
+    stats = {}
+    for _ in range(args.runs):
+        if pool is not None:
+            backend = PooledWordBackend(pool)
+        else:
+            backend = WordComBackend(app_factory=factory, startup_delay=0)
+        elapsed, stats = run_once(backend, components)
+        timings.append(elapsed)
+
+    print(f"组件: {components}")
+    print(f"COM 往返次数/文档: {stats.get('com_round_trips')}")
+    for name, count in apps[-1].call_counts().most_common(10):
+        print(f"  {name:<40} {count}")
+    print(f"耗时: 中位数 {statistics.median(timings) * 1000:.1f} ms, 最小 {min(timings) * 1000:.1f} ms")
+    if pool is not None:
+        print(f"实例池: {pool.metrics()}")
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
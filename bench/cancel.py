@@ -0,0 +1,262 @@
+"""取消基准：每个阶段都卡在慢替身上时，点击【取消】到任务线程结束的耗时
+
+每个场景在后台线程中运行 FormatJob.run()，等任务进入目标阶段（替身已开始工作）后调用 job.cancel()，
+记录线程结束的耗时，并检查替身是否真的被中止：
+
+  extract       原文为 .html，交给 Pandoc 命令行；假 pandoc 进程一直睡眠           -> 进程被结束
+  ai-stream     本地桩服务首字节延迟很长，流式请求阻塞在等待响应头                   -> 连接被关闭
+  ai-complete   同上，非流式请求（"stream": false）                                  -> 连接被关闭
+  convert       AI 很快返回，Markdown 组件交给一直睡眠的假 pandoc                    -> 全部进程被结束
+  word-pool     实例池后端，FakeWordApplication 的 InsertFile 卡住                   -> 放弃调用，实例回收
+  word          每次构建启动 Word 的后端，InsertFile 较慢                            -> 当前调用返回后退出 Word
+
+假 pandoc 是放在临时目录并加入 PATH 的 Python 脚本（--version 立即返回；FAKE_PANDOC_SLEEP < 0 时立即失败，
+用于组装场景跳过 Markdown 组件）。word 后端的调用在任务线程内执行，跨线程无法打断正在进行的 COM 调用，
+其取消耗时以一次调用的延迟为上限（--word-call）；其余场景应在 --bound 秒内结束。
+线程按时结束且替身确实被中止（右列状态）才判定通过，否则判定为「超时」或「未中止」。
+
+用法（项目根目录下，Linux 亦可运行）：
+    python -m bench.cancel
+    python -m bench.cancel --bound 0.5 --word-call 1
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+from bench.ai_sharding import make_handler
+from bench.synth import make_thesis, write_thesis
+from core import build_engine, http_client, pandoc_runner, preprocess, provider_stats
+from core.backends import WordComBackend
+from core.fake_word import FakeWordApplication
+from core.pipeline import FormatJob, JobCancelled
+from core.word_pool import PooledWordBackend, WordPool
+
+FAKE_PANDOC = """#!{python}
+import os, sys, time
+if "--version" in sys.argv:
+    print("pandoc 0.0 (bench.cancel)")
+    sys.exit(0)
+with open(os.environ["FAKE_PANDOC_PIDS"], "a") as f:
+    f.write(f"{{os.getpid()}}\\n")
+delay = float(os.environ.get("FAKE_PANDOC_SLEEP", "60"))
+if delay < 0:
+    sys.stderr.write("fake pandoc: conversion failed\\n")
+    sys.exit(1)
+time.sleep(delay)
+"""
+
+
+def wait_until(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def pids(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [int(line) for line in f if line.strip()]
+    except OSError:
+        return []
+
+
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="各阶段卡在慢替身上时的取消耗时")
+    parser.add_argument("--bound", type=float, default=1.0, help="取消后线程须在多少秒内结束")
+    parser.add_argument("--word-call", type=float, default=1.0, help="word 场景中 InsertFile 的延迟（秒）")
+    parser.add_argument("--settle", type=float, default=0.3, help="替身开始工作后等待多久再取消（秒）")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="bench_cancel_")
+    provider_stats.set_stats_file(os.path.join(work, "provider_stats.json"))
+    preprocess.AI_CACHE_DIR = os.path.join(work, "ai_cache")
+    build_engine.Config.PANDOC_CACHE_DIR = os.path.join(work, "pandoc_cache")
+    build_engine.Config.PANDOC_SERVER = False
+
+    # 假 pandoc：进程级默认 PandocRunner 首次创建时固定为命令行模式
+    bin_dir = os.path.join(work, "bin")
+    os.makedirs(bin_dir)
+    fake = os.path.join(bin_dir, "pandoc")
+    with open(fake, "w", encoding="utf-8") as f:
+        f.write(FAKE_PANDOC.format(python=sys.executable))
+    os.chmod(fake, 0o755)
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ.get("PATH", "")
+    pid_file = os.path.join(work, "pandoc.pids")
+    os.environ["FAKE_PANDOC_PIDS"] = pid_file
+    pandoc_runner.get_default_runner(use_server=False)
+
+    source_txt = write_thesis(make_thesis(pages=5, seed=1), os.path.join(work, "论文.txt"))
+    with open(source_txt, "r", encoding="utf-8") as f:
+        text = f.read()
+    source_html = os.path.join(work, "论文.html")
+    with open(source_html, "w", encoding="utf-8") as f:
+        f.write("<html><body><p>" + text.replace("\n", "</p><p>") + "</p></body></html>")
+
+    def start_server(ttfb):
+        stats = {"lock": threading.Lock(), "requests": 0, "in_flight": 0, "max_in_flight": 0}
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(ttfb, 200000, stats))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server, stats
+
+    slow_server, slow_stats = start_server(ttfb=60)
+    fast_server, _fast_stats = start_server(ttfb=0.05)
+
+    def api_config(server, stream=True):
+        return {
+            "provider": f"stub-{server.server_port}", "api_key": "bench", "model_name": "stub", "shard": False,
+            "stream": stream, "retries": 0, "base_url": f"http://127.0.0.1:{server.server_port}/v1",
+        }
+
+    def run_case(source, config, started, backend=None, pandoc_sleep=60):
+        """运行任务直到 started() 为真，取消后返回 (取消耗时, 任务结果, 任务)"""
+        os.environ["FAKE_PANDOC_SLEEP"] = str(pandoc_sleep)
+        job = FormatJob(
+            source, build_engine.PRESETS["thesis"], config,
+            output_dir=os.path.join(work, "out"), use_ai_cache=False, incremental=False,
+            backend=backend, log=lambda _msg: None,
+        )
+        result = {}
+
+        def target():
+            try:
+                job.run()
+                result["status"] = "完成（未被取消）"
+            except JobCancelled:
+                result["status"] = "已取消"
+            except Exception as e:  # noqa: BLE001 - 记录到结果表
+                result["status"] = f"失败: {e!r}"
+            finally:
+                job.cleanup()
+
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        if not wait_until(started):
+            job.cancel()
+            thread.join(30)
+            return None, "替身未进入目标阶段", job
+        time.sleep(args.settle)
+        t0 = time.perf_counter()
+        job.cancel()
+        thread.join(30)
+        elapsed = time.perf_counter() - t0 if not thread.is_alive() else None
+        return elapsed, result.get("status", "线程未结束"), job
+
+    def pandoc_started(count=1):
+        before = len(pids(pid_file))
+        return lambda: len(pids(pid_file)) >= before + count
+
+    def pandoc_check(before):
+        """(是否全部被结束, 说明)：before 之后启动的假 pandoc 进程须已全部退出"""
+        started = pids(pid_file)[before:]
+        left = [pid for pid in started if alive(pid)]
+        return bool(started) and not left, f"pandoc 进程 {len(started)} 个，存活 {len(left)} 个"
+
+    def ai_started():
+        before = slow_stats["requests"]
+        return lambda: slow_stats["requests"] > before
+
+    def slow_pool():
+        return http_client.get_pool(f"http://127.0.0.1:{slow_server.server_port}")
+
+    def pool_check(discarded_before):
+        """(连接是否被关闭, 说明)：被取消的请求连接不归还连接池，丢弃数须增加"""
+        stats = slow_pool().stats()
+        ok = stats["discarded"] > discarded_before
+        return ok, f"连接池 idle {stats['idle']}，丢弃 {stats['discarded']}"
+
+    apps = []
+
+    def word_app(latency):
+        def factory():
+            app = FakeWordApplication(latency={"InsertFile": latency}, write_outputs=True)
+            apps.append(app)
+            return app
+        return factory
+
+    def inserts():
+        return sum(app.call_counts()["Selection.InsertFile"] for app in list(apps))
+
+    def insert_started():
+        before = inserts()
+        return lambda: inserts() > before
+
+    word_pool = WordPool(size=1, app_factory=word_app(60), startup_delay=0).start()
+
+    scenarios = []
+    with contextlib.redirect_stdout(io.StringIO()):  # 屏蔽 [1/4]、[Merge] 等进度输出
+        try:
+            before = len(pids(pid_file))
+            elapsed, status, _job = run_case(source_html, api_config(fast_server), pandoc_started())
+            scenarios.append(("extract", elapsed, status, pandoc_check(before)))
+
+            discarded = slow_pool().stats()["discarded"]
+            elapsed, status, _job = run_case(source_txt, api_config(slow_server), ai_started())
+            scenarios.append(("ai-stream", elapsed, status, pool_check(discarded)))
+
+            discarded = slow_pool().stats()["discarded"]
+            elapsed, status, _job = run_case(source_txt, api_config(slow_server, stream=False), ai_started())
+            scenarios.append(("ai-complete", elapsed, status, pool_check(discarded)))
+
+            before = len(pids(pid_file))
+            elapsed, status, _job = run_case(source_txt, api_config(fast_server), pandoc_started(min(3, build_engine.Config.PANDOC_WORKERS)))
+            scenarios.append(("convert", elapsed, status, pandoc_check(before)))
+
+            recycles_before = word_pool.metrics()["recycles"].get("cancelled", 0)
+            elapsed, status, job = run_case(
+                source_txt, api_config(fast_server), insert_started(),
+                backend=lambda: PooledWordBackend(word_pool), pandoc_sleep=-1,
+            )
+            recycles = word_pool.metrics()["recycles"].get("cancelled", 0)
+            saved = os.path.exists(job.final_docx or "")
+            scenarios.append(("word-pool", elapsed, status, (
+                recycles > recycles_before and not saved, f"取消回收实例 {recycles} 个，输出已保存: {saved}")))
+
+            elapsed, status, job = run_case(
+                source_txt, api_config(fast_server), insert_started(),
+                backend=lambda: WordComBackend(app_factory=word_app(args.word_call), startup_delay=0),
+                pandoc_sleep=-1,
+            )
+            quit_ = apps[-1].quit
+            saved = os.path.exists(job.final_docx or "")
+            scenarios.append(("word", elapsed, status, (
+                quit_ and not saved, f"Word 已退出: {quit_}，输出已保存: {saved}")))
+        finally:
+            word_pool.shutdown(wait=0)
+            slow_server.shutdown()
+            fast_server.shutdown()
+            shutil.rmtree(work, ignore_errors=True)
+
+    print(f"取消上限 {args.bound:g}s（word 场景 {args.word_call:g}s + 余量）")
+    print(f"{'场景':<14}{'取消耗时':>10}  {'结果':<8}{'判定':<6}替身状态")
+    failures = 0
+    for name, elapsed, status, (stopped, note) in scenarios:
+        bound = args.bound + (args.word_call if name == "word" else 0)
+        in_time = elapsed is not None and elapsed <= bound and status == "已取消"
+        verdict = "通过" if in_time and stopped else "超时" if not in_time else "未中止"
+        failures += verdict != "通过"
+        shown = f"{elapsed * 1000:.0f} ms" if elapsed is not None else "-"
+        print(f"{name:<14}{shown:>10}  {status:<8}{verdict:<6}{note}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,134 @@
+"""AI 请求尾延迟基准：单提供商 vs 重试 vs 重试 + 对冲请求
+
+本地起两个 OpenAI 兼容的流式桩服务：
+- 主提供商：多数请求 --ttfb 秒后开始输出，但有 --slow-rate 比例的请求首字节拖到 --slow-ttfb 秒，
+  另有 --fail-rate 比例直接返回 503（模拟限流 / 过载）
+- 备用提供商：首字节稳定在 --backup-ttfb 秒
+
+顺序发送 N 个请求（Preprocessor.stream_ai_api），分别统计三种策略的成功率与 p50 / p95 / 最大耗时。
+
+用法（项目根目录下）：
+    python -m bench.hedging --requests 40 --slow-rate 0.1 --fail-rate 0.1 --hedge-after 0.5
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core import provider_stats
+from core.preprocess import Preprocessor
+
+_REPLY = "===FILE: body.md===\n# 1  绪论\n\n" + "正文内容。" * 200
+
+
+def make_handler(ttfb, slow_ttfb, slow_rate, fail_rate, rng, lock):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *_args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with lock:
+                roll = rng.random()
+            if roll < fail_rate:
+                body = b'{"error": "overloaded"}'
+                self.send_response(503)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            time.sleep(slow_ttfb if roll < fail_rate + slow_rate else ttfb)
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            try:
+                for i in range(0, len(_REPLY), 100):
+                    event = {"choices": [{"index": 0, "delta": {"content": _REPLY[i:i + 100]}}]}
+                    self.wfile.write(b"data: " + json.dumps(event).encode("utf-8") + b"\n\n")
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # 对冲请求落败后客户端提前断开
+            self.close_connection = True
+
+    return Handler
+
+
+def start_server(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/v1"
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重试 / 对冲请求对尾延迟的影响")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--ttfb", type=float, default=0.2, help="主提供商正常首字节延迟（秒）")
+    parser.add_argument("--slow-ttfb", type=float, default=3.0, help="主提供商慢请求首字节延迟（秒）")
+    parser.add_argument("--slow-rate", type=float, default=0.1)
+    parser.add_argument("--fail-rate", type=float, default=0.1)
+    parser.add_argument("--backup-ttfb", type=float, default=0.3, help="备用提供商首字节延迟（秒）")
+    parser.add_argument("--hedge-after", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # 桩服务的测速样本写入临时文件，不混入真实的 provider_stats.json
+    provider_stats.set_stats_file(os.path.join(tempfile.mkdtemp(prefix="bench_stats_"), "provider_stats.json"))
+    lock = threading.Lock()
+    primary, primary_url = start_server(make_handler(
+        args.ttfb, args.slow_ttfb, args.slow_rate, args.fail_rate, random.Random(args.seed), lock))
+    backup, backup_url = start_server(make_handler(
+        args.backup_ttfb, args.backup_ttfb, 0, 0, random.Random(args.seed), lock))
+
+    base = {"provider": "主提供商", "api_key": "bench", "base_url": primary_url, "model_name": "stub"}
+    backups = [{"provider": "备用提供商", "api_key": "bench", "base_url": backup_url, "model_name": "stub"}]
+    strategies = [
+        ("不重试", dict(base, retries=0)),
+        ("重试 + 备用", dict(base, retries=2, backups=backups)),
+        ("重试 + 对冲", dict(base, retries=2, backups=backups, hedge_after=args.hedge_after)),
+    ]
+    quiet = lambda _msg: None  # noqa: E731
+
+    print(f"{args.requests} 次请求/策略, 主提供商慢请求 {args.slow_rate:.0%} ({args.slow_ttfb:g}s), "
+          f"失败 {args.fail_rate:.0%}; 对冲预算 {args.hedge_after:g}s")
+    print(f"{'策略':<12}{'成功':>8}{'p50':>9}{'p95':>9}{'最大':>9}")
+    try:
+        for label, api_config in strategies:
+            processor = Preprocessor(api_config=api_config)
+            processor.get_system_prompt = lambda: "bench"
+            times, ok = [], 0
+            for _ in range(args.requests):
+                t0 = time.perf_counter()
+                try:
+                    with contextlib.redirect_stdout(io.StringIO()):  # 屏蔽 [2/4] 等进度输出
+                        processor.stream_ai_api("原文", log=quiet)
+                    ok += 1
+                except Exception:
+                    pass
+                times.append(time.perf_counter() - t0)
+            print(f"{label:<10}{ok:>6}/{args.requests:<3}{statistics.median(times):>8.2f}s"
+                  f"{percentile(times, 0.95):>8.2f}s{max(times):>8.2f}s")
+    finally:
+        primary.shutdown()
+        backup.shutdown()
+
+
+if __name__ == "__main__":
+    main()
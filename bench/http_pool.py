@@ -0,0 +1,104 @@
+"""HTTP 连接复用基准：共享 keep-alive 连接池 vs 每次新建 urllib 连接
+
+本地起一个 OpenAI 兼容的桩服务（HTTP/1.1 keep-alive），每接受一条新连接先等待 --handshake-ms，
+模拟公网 TCP + TLS 握手的往返耗时；然后分别用 urllib.request 与 http_client.HttpPool
+顺序 / 多线程发送 N 个小请求，对比总耗时并打印连接池的复用计数。
+
+用法（项目根目录下）：
+    python -m bench.http_pool --requests 50 --threads 4 --handshake-ms 150
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core import http_client
+
+_REPLY = json.dumps({
+    "id": "bench", "object": "chat.completion", "created": 0, "model": "stub",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+}).encode("utf-8")
+
+
+def make_handler(handshake_s, stats):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            with stats["lock"]:
+                stats["connections"] += 1
+            time.sleep(handshake_s)
+
+        def log_message(self, *_args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(_REPLY)))
+            self.end_headers()
+            self.wfile.write(_REPLY)
+
+    return Handler
+
+
+def run(send, count, threads):
+    t0 = time.perf_counter()
+    if threads <= 1:
+        for _ in range(count):
+            send()
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(lambda _i: send(), range(count)))
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="keep-alive 连接池 vs 每次新建连接")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--handshake-ms", type=float, default=150, help="模拟每条新连接的握手耗时")
+    parser.add_argument("--pool-size", type=int, default=http_client.POOL_SIZE)
+    args = parser.parse_args()
+
+    stats = {"lock": threading.Lock(), "connections": 0}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.handshake_ms / 1000, stats))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+    url = f"{base_url}/chat/completions"
+    payload = json.dumps({"model": "stub", "messages": [{"role": "user", "content": "Hi"}]}).encode("utf-8")
+    headers = {"Content-Type": "application/json", "Authorization": "Bearer bench"}
+
+    def send_urllib():
+        req = urllib.request.Request(url, data=payload, headers=headers, method="POST")
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            json.loads(resp.read())
+
+    pool = http_client.HttpPool(base_url, pool_size=args.pool_size)
+
+    def send_pool():
+        with pool.request("POST", url, body=payload, headers=headers) as resp:
+            json.loads(resp.read())
+
+    print(f"{args.requests} 次请求, 模拟握手 {args.handshake_ms:.0f} ms/连接")
+    print(f"{'方式':<18}{'线程':>6}{'总耗时':>12}{'服务端新连接':>14}")
+    try:
+        for threads in (1, args.threads):
+            for label, send in (("urllib 每次新建", send_urllib), ("HttpPool 复用", send_pool)):
+                before = stats["connections"]
+                elapsed = run(send, args.requests, threads)
+                print(f"{label:<16}{threads:>6}{elapsed:>11.2f}s{stats['connections'] - before:>14}")
+    finally:
+        pool.close()
+        server.shutdown()
+    print(f"HttpPool 计数: {pool.stats()}")
+
+
+if __name__ == "__main__":
+    main()
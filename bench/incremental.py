@@ -0,0 +1,130 @@
+"""增量构建基准：同一份论文在不同改动下重新排版的耗时
+
+用 bench.synth 生成一篇合成论文（.txt），AI 请求发往本地的 OpenAI 兼容桩服务（首字节延迟 + 固定输出速率），
+组装使用 FakeWordApplication（模拟 Word 启动耗时与每次 COM 调用的延迟），依次测：
+
+  1. 首次运行：全部阶段
+  2. 无改动重跑：job.up_to_date() 只比对文件大小与修改时间，直接沿用上次的输出
+  3. 删除输出后重跑：复用提取结果与 AI 回复，只重新组装
+  4. 修改静态组件（封面）后重跑：同上，只重新组装
+  5. 修改原文后重跑：全部阶段
+
+每次运行后打印增量构建清单中复用 / 重新执行的节点。未安装 Pandoc 时 Markdown 组件在合并时跳过，
+但其指纹仍参与组装节点的计算。
+
+用法（项目根目录下）：
+    python -m bench.incremental --pages 50 --ttfb 3 --word-startup 2
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+from bench.ai_sharding import make_handler
+from bench.synth import make_thesis, write_thesis
+from core import build_engine, incremental, preprocess, provider_stats
+from core.backends import WordComBackend
+from core.fake_word import FakeWordApplication
+from core.pipeline import FormatJob
+
+
+def main():
+    parser = argparse.ArgumentParser(description="增量构建：不同改动下的重跑耗时")
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--ttfb", type=float, default=3.0, help="桩服务首字节延迟（秒）")
+    parser.add_argument("--chars-per-sec", type=float, default=20000, help="桩服务输出速率（字/秒）")
+    parser.add_argument("--word-startup", type=float, default=2.0, help="模拟 Word 启动耗时（秒）")
+    parser.add_argument("--com-latency", type=float, default=0.005, help="每次 COM 调用的延迟（秒）")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="bench_incremental_")
+    # 测速样本、AI 回复缓存与增量构建产物都放到临时目录，不混入真实数据
+    provider_stats.set_stats_file(os.path.join(work, "provider_stats.json"))
+    preprocess.AI_CACHE_DIR = os.path.join(work, "ai_cache")
+    incremental.ARTIFACT_DIR = os.path.join(work, "artifacts")
+    build_engine.Config.PANDOC_CACHE_DIR = os.path.join(work, "pandoc_cache")
+
+    source = write_thesis(make_thesis(pages=args.pages, seed=1), os.path.join(work, "论文.txt"))
+    cover = os.path.join(work, "cover.docx")
+    shutil.copyfile(build_engine.COMPONENT_REGISTRY["cover"]["path"], cover)
+    build_engine.COMPONENT_REGISTRY["cover"] = dict(build_engine.COMPONENT_REGISTRY["cover"], path=cover)
+
+    stats = {"lock": threading.Lock(), "requests": 0, "in_flight": 0, "max_in_flight": 0}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.ttfb, args.chars_per_sec, stats))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_config = {
+        "provider": "stub", "api_key": "bench", "model_name": "stub", "shard": False,
+        "base_url": f"http://127.0.0.1:{server.server_port}/v1",
+    }
+
+    def backend():
+        return WordComBackend(
+            app_factory=lambda: FakeWordApplication(
+                latency=args.com_latency, startup_latency=args.word_startup, write_outputs=True
+            ),
+            startup_delay=0,
+        )
+
+    def run():
+        job = FormatJob(
+            source, build_engine.PRESETS["thesis"], api_config,
+            output_dir=os.path.join(work, "out"), backend=backend, log=lambda _msg: None,
+        )
+        requests = stats["requests"]
+        t0 = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):  # 屏蔽 [1/4]、[Merge] 等进度输出
+                job.run()
+        finally:
+            job.cleanup()
+        elapsed = time.perf_counter() - t0
+        manifest = job.manifest
+        if manifest.nodes:
+            note = manifest.summary()
+        else:
+            note = "up_to_date: 跳过全部阶段"
+        return elapsed, stats["requests"] - requests, note
+
+    def remove_output():
+        os.remove(os.path.join(work, "out", "论文.docx"))
+
+    def edit_cover():
+        with open(cover, "ab") as f:
+            f.write(b"\0")  # FakeWordApplication 不解析内容，只需文件内容变化
+
+    def edit_source():
+        with open(source, "a", encoding="utf-8") as f:
+            f.write("\n致谢\n感谢导师的悉心指导。\n")
+
+    scenarios = [
+        ("首次运行", None),
+        ("无改动重跑", None),
+        ("删除输出后重跑", remove_output),
+        ("修改封面后重跑", edit_cover),
+        ("修改原文后重跑", edit_source),
+    ]
+    rows = []
+    try:
+        for label, change in scenarios:
+            if change:
+                change()
+            rows.append((label, *run()))
+    finally:
+        server.shutdown()
+        shutil.rmtree(work, ignore_errors=True)
+
+    print(f"合成论文约 {args.pages} 页; AI 首字节 {args.ttfb:g}s, Word 启动 {args.word_startup:g}s, "
+          f"COM 延迟 {args.com_latency * 1000:g} ms/次"
+          + ("" if shutil.which("pandoc") else "（未安装 Pandoc，Markdown 组件合并时跳过）"))
+    print(f"{'场景':<12}{'耗时':>10}{'AI 请求':>8}  节点")
+    for label, elapsed, requests, note in rows:
+        print(f"{label:<10}{elapsed * 1000:>8.1f}ms{requests:>8}  {note}")
+
+
+if __name__ == "__main__":
+    main()
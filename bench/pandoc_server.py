@@ -0,0 +1,85 @@
+"""Pandoc 调用基准：常驻 pandoc server 与逐次启动命令行的单次转换耗时对比
+
+以 test/ 下的示例文档测两条实际路径：
+  - docx -> plain（预处理读取原文）
+  - markdown -> docx + reference.docx（构建时转换 Markdown 组件）
+
+用法（项目根目录下）：
+    python -m bench.pandoc_server --runs 10
+    python -m bench.pandoc_server --pandoc /path/to/pandoc
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from core import pandoc_runner
+from core.build_engine import Config
+
+SAMPLE_DOCX = os.path.join(Config.BASE_DIR, "test", "你需要排版的文件.docx")
+
+
+def measure(runner, runs, input_path, to, output_path=None, options=None):
+    timings = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        runner.convert(input_path, to, output_path=output_path, options=options)
+        timings.append(time.perf_counter() - t0)
+    return timings
+
+
+def report(label, timings):
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(
+        f"  {label:<8} 中位数 {statistics.median(timings) * 1000:8.1f} ms"
+        f"   最小 {ordered[0] * 1000:8.1f} ms   p95 {p95 * 1000:8.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pandoc server vs 命令行 单次转换耗时")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--pandoc", default="pandoc", help="pandoc 可执行文件")
+    parser.add_argument("--input", default=SAMPLE_DOCX)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_pandoc_")
+    try:
+        cli = pandoc_runner.PandocRunner(args.pandoc, use_server=False)
+        sample_md = os.path.join(workdir, "sample.md")
+        cli.convert(args.input, "markdown", output_path=sample_md)
+
+        server = pandoc_runner.PandocRunner(args.pandoc, use_server=True)
+        t0 = time.perf_counter()
+        mode = server.mode
+        print(f"pandoc server 启动: {mode} ({(time.perf_counter() - t0) * 1000:.0f} ms)")
+
+        cases = [
+            ("docx -> plain", args.input, "plain", None, {"wrap": "none"}),
+            (
+                "md -> docx",
+                sample_md,
+                "docx",
+                os.path.join(workdir, "out.docx"),
+                {"reference-doc": Config.REF_DOC},
+            ),
+        ]
+        for title, input_path, to, output_path, options in cases:
+            print(f"{title}  ({args.runs} 次)")
+            report("cli", measure(cli, args.runs, input_path, to, output_path, options))
+            if mode == "server":
+                # 预热一次，排除首个请求的连接开销
+                server.convert(input_path, to, output_path=output_path, options=options)
+                report("server", measure(server, args.runs, input_path, to, output_path, options))
+        if mode != "server":
+            print("  (pandoc server 不可用，仅测得命令行路径；需要 Pandoc >= 3.0 且为多线程运行时构建)")
+        server.shutdown()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
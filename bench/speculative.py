@@ -0,0 +1,154 @@
+"""提前组装基准：调用 AI 期间提前启动 Word、新建文档并插入开头的静态组件，端到端能省下多少时间
+
+对同一篇合成论文交替运行 FormatJob.run()，分别关闭 / 开启 speculative_build，比较端到端耗时与
+AI 回复完成之后的耗时（拆分 + 转换 + 组装，即用户在 AI 结束后还要等的部分）：
+
+  AI        本地桩服务（bench.ai_sharding），首字节延迟 --ttfb，按 --cps 字符/秒流式返回
+  Pandoc    放在临时目录并加入 PATH 的假 pandoc（每次转换睡眠 --pandoc 秒后写出占位文件）
+  Word      FakeWordApplication：启动耗时 --startup，InsertFile 延迟 --insert，其余调用 --com-latency；
+            --pool 时改用常驻实例池（启动耗时已预先付出，只剩新建文档与插入静态组件）
+
+理论上可省下 min(AI 耗时, 启动 Word + 新建文档 + 插入开头静态组件) 的时间。
+
+用法（项目根目录下，Linux 亦可运行）：
+    python -m bench.speculative
+    python -m bench.speculative --startup 4 --insert 0.5 --ttfb 3 --runs 3
+    python -m bench.speculative --pool
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+from bench.ai_sharding import make_handler
+from bench.synth import make_thesis, write_thesis
+from core import build_engine, pandoc_runner, preprocess, provider_stats
+from core.backends import WordComBackend
+from core.fake_word import FakeWordApplication
+from core.pipeline import FormatJob
+from core.word_pool import PooledWordBackend, WordPool
+
+FAKE_PANDOC = """#!{python}
+import sys, time
+if "--version" in sys.argv:
+    print("pandoc 0.0 (bench.speculative)")
+    sys.exit(0)
+time.sleep({delay})
+if "-o" in sys.argv:
+    with open(sys.argv[sys.argv.index("-o") + 1], "wb") as f:
+        f.write(b"PK")
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="调用 AI 期间提前组装的端到端收益")
+    parser.add_argument("--pages", type=int, default=20, help="合成论文页数")
+    parser.add_argument("--runs", type=int, default=3, help="每种设置的运行次数（交替进行，取中位数）")
+    parser.add_argument("--ttfb", type=float, default=2.0, help="AI 桩服务首字节延迟（秒）")
+    parser.add_argument("--cps", type=float, default=20000, help="AI 桩服务流式输出速度（字符/秒）")
+    parser.add_argument("--startup", type=float, default=2.0, help="Word 启动耗时（秒）")
+    parser.add_argument("--insert", type=float, default=0.3, help="每次 InsertFile 的延迟（秒）")
+    parser.add_argument("--com-latency", type=float, default=0.01, help="其余 COM 调用的延迟（秒）")
+    parser.add_argument("--pandoc", type=float, default=0.2, help="每次 Pandoc 转换的耗时（秒）")
+    parser.add_argument("--pool", action="store_true", help="使用常驻 Word 实例池（1 个实例）")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="bench_speculative_")
+    provider_stats.set_stats_file(os.path.join(work, "provider_stats.json"))
+    preprocess.AI_CACHE_DIR = os.path.join(work, "ai_cache")
+    build_engine.Config.PANDOC_CACHE_ENABLED = False  # 每轮都真正转换，两种设置条件一致
+    build_engine.Config.PANDOC_SERVER = False
+
+    bin_dir = os.path.join(work, "bin")
+    os.makedirs(bin_dir)
+    fake = os.path.join(bin_dir, "pandoc")
+    with open(fake, "w", encoding="utf-8") as f:
+        f.write(FAKE_PANDOC.format(python=sys.executable, delay=args.pandoc))
+    os.chmod(fake, 0o755)
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ.get("PATH", "")
+    pandoc_runner.get_default_runner(use_server=False)
+
+    source = write_thesis(make_thesis(pages=args.pages, seed=1), os.path.join(work, "论文.txt"))
+
+    stats = {"lock": threading.Lock(), "requests": 0, "in_flight": 0, "max_in_flight": 0}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.ttfb, args.cps, stats))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_config = {
+        "provider": f"stub-{server.server_port}", "api_key": "bench", "model_name": "stub", "shard": False,
+        "stream": True, "retries": 0, "base_url": f"http://127.0.0.1:{server.server_port}/v1",
+    }
+
+    latency = {"*": args.com_latency, "InsertFile": args.insert}
+
+    def word_app():
+        return FakeWordApplication(latency=latency, startup_latency=args.startup, write_outputs=True)
+
+    pool = None
+    if args.pool:
+        pool = WordPool(size=1, app_factory=word_app, startup_delay=0).start()
+        backend = lambda: PooledWordBackend(pool)  # noqa: E731
+    else:
+        backend = lambda: WordComBackend(app_factory=word_app, startup_delay=0)  # noqa: E731
+
+    def run_once(speculative):
+        ai_done = []
+        job = FormatJob(
+            source, build_engine.PRESETS["thesis"], api_config,
+            output_dir=os.path.join(work, "out"), use_ai_cache=False, incremental=False,
+            backend=backend, speculative_build=speculative, log=lambda _msg: None,
+        )
+        job.prepare()
+        call_ai = job._call_ai
+
+        def timed_call_ai():
+            call_ai()
+            ai_done.append(time.perf_counter())
+
+        job._call_ai = timed_call_ai
+        t0 = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                job.run()
+            end = time.perf_counter()
+        finally:
+            job.cleanup()
+        if not job.outputs:
+            raise RuntimeError("任务没有生成输出")
+        return end - t0, end - ai_done[0], ai_done[0] - t0
+
+    results = {False: [], True: []}
+    try:
+        run_once(True)  # 预热：导入、连接池、Pandoc 版本查询
+        for _ in range(args.runs):
+            for speculative in (False, True):
+                results[speculative].append(run_once(speculative))
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=0)
+        server.shutdown()
+        shutil.rmtree(work, ignore_errors=True)
+
+    def median(speculative, index):
+        return statistics.median(r[index] for r in results[speculative])
+
+    mode = "常驻实例池" if args.pool else f"每次启动 Word（启动 {args.startup:g}s）"
+    print(f"Word: {mode}，InsertFile {args.insert:g}s；AI 首字节 {args.ttfb:g}s；{args.runs} 轮中位数")
+    print(f"{'设置':<10}{'端到端':>10}{'AI 耗时':>10}{'AI 结束后':>12}")
+    for speculative, name in ((False, "关闭"), (True, "提前组装")):
+        print(f"{name:<10}{median(speculative, 0):>9.2f}s{median(speculative, 2):>9.2f}s{median(speculative, 1):>11.2f}s")
+    saved = median(False, 0) - median(True, 0)
+    print(f"端到端节省 {saved:.2f}s（{saved / median(False, 0) * 100:.0f}%），"
+          f"AI 结束后的等待从 {median(False, 1):.2f}s 降到 {median(True, 1):.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,157 @@
+"""AI 回复拆分基准：单遍按行扫描的 FileSplitter vs 最初的正则拆分
+
+最初的 split_and_save 先用两次整串 re.sub 去掉代码块包裹，再用
+re.findall(r"===FILE:\\s*(.*?)===\\s*(.*?)(?=(===FILE:|$))", ..., re.DOTALL) 拆分。
+这里用 bench.synth 生成不同大小的回复，分别测：
+
+  - 正则：原实现（仅在内存中拆分，不写盘）
+  - 整段：FileSplitter 一次 feed 全文（不写盘）
+  - 流式：FileSplitter 按 64 字的小块 feed（模拟 SSE，不写盘）
+  - 写盘：FileSplitter 一次 feed 全文并逐行写入临时目录
+
+--stray 在正文中每隔若干行插入一处未闭合的 "===FILE:" 字样（如引用提示词原文），
+正则会把它们连同之后的内容误当作新文件；表中"段数"列出两种实现各拆出了多少个文件。
+最后列出若干格式变体（CRLF、BOM、每个文件单独的代码块、正文中的 ===、重复标记）两种实现的拆分结果是否正确。
+
+用法（项目根目录下）：
+    python -m bench.splitter --pages 200,1000,4000 --runs 5
+    python -m bench.splitter --pages 200,1000 --stray 50
+"""
+import argparse
+import re
+import shutil
+import statistics
+import tempfile
+import time
+
+from bench.synth import fake_response, make_thesis
+from core.splitter import EXPECTED_FILES, FileSplitter
+
+LEGACY_PATTERN = r"===FILE:\s*(.*?)===\s*(.*?)(?=(===FILE:|$))"
+
+
+def legacy_split(text):
+    """最初 split_and_save 的解析部分，返回 {文件名: 内容}"""
+    clean = re.sub(r"^```(markdown)?\s*", "", text.strip())
+    clean = re.sub(r"\s*```$", "", clean)
+    return {name.strip(): content.strip() for name, content, _ in re.findall(LEGACY_PATTERN, clean, re.DOTALL)}
+
+
+def splitter_split(text, chunk=None, output_dir=None):
+    splitter = FileSplitter(output_dir, expected=EXPECTED_FILES)
+    if chunk:
+        for i in range(0, len(text), chunk):
+            splitter.feed(text[i:i + chunk])
+    else:
+        splitter.feed(text)
+    splitter.close()
+    return splitter.sections
+
+
+def median_ms(fn, runs):
+    timings = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings) * 1000
+
+
+def with_stray_markers(text, every):
+    lines = text.split("\n")
+    for i in range(len(lines) - 1, 0, -every):
+        lines.insert(i, "（提示词原文中的分隔符写作 ===FILE: 文件名，此处仅为引用）")
+    return "\n".join(lines)
+
+
+ROBUSTNESS_CASES = {
+    "标准格式": (
+        "===FILE: abstract_cn.md===\n摘要\n===FILE: body.md===\n# 1 绪论\n正文\n",
+        {"abstract_cn.md": "摘要", "body.md": "# 1 绪论\n正文"},
+    ),
+    "CRLF + BOM": (
+        "\ufeff===FILE: abstract_cn.md===\r\n摘要\r\n===FILE: body.md===\r\n正文\r\n",
+        {"abstract_cn.md": "摘要", "body.md": "正文"},
+    ),
+    "每个文件单独包裹": (
+        "===FILE: abstract_cn.md===\n```markdown\n摘要\n```\n===FILE: body.md===\n```markdown\n正文\n```\n",
+        {"abstract_cn.md": "摘要", "body.md": "正文"},
+    ),
+    "正文中的 ===": (
+        "===FILE: body.md===\n公式 a === b 成立\n比较运算 x === y\n",
+        {"body.md": "公式 a === b 成立\n比较运算 x === y"},
+    ),
+    "正文末尾的代码块": (
+        "===FILE: body.md===\n示例：\n```python\nprint(1)\n```\n",
+        {"body.md": "示例：\n```python\nprint(1)\n```"},
+    ),
+    "正文开头的代码块": (
+        "===FILE: body.md===\n```\ncode\n```\n正文\n",
+        {"body.md": "```\ncode\n```\n正文"},
+    ),
+    "裸 ``` 包裹": (
+        "===FILE: abstract_cn.md===\n```\n摘要\n```\n===FILE: body.md===\n```\n正文\n```python\nx = 1\n```\n```\n",
+        {"abstract_cn.md": "摘要", "body.md": "正文\n```python\nx = 1\n```"},
+    ),
+    "重复标记": (
+        "===FILE: body.md===\n第一部分\n===FILE: body.md===\n第二部分\n",
+        {"body.md": "第一部分\n\n第二部分"},
+    ),
+    "加粗的标记": (
+        "**===FILE: abstract_cn.md===**\n摘要\n**===FILE: body.md===**\n正文\n",
+        {"abstract_cn.md": "摘要", "body.md": "正文"},
+    ),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI 回复拆分：FileSplitter vs 正则")
+    parser.add_argument("--pages", default="200,1000,4000", help="逗号分隔的合成论文页数")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--stray", type=int, default=0, help="每隔多少行插入一处未闭合的 ===FILE: 字样（0 为不插入）")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="bench_splitter_")
+    rows = []
+    try:
+        for pages in [int(p) for p in args.pages.split(",") if p.strip()]:
+            text = fake_response(make_thesis(pages=pages, tables=pages // 20, images=pages // 40))
+            if args.stray:
+                text = with_stray_markers(text, args.stray)
+            expected = splitter_split(text)
+            legacy = legacy_split(text)
+            if legacy != expected and not args.stray:
+                print(f"[Warning] {pages} 页: 两种实现的拆分结果不一致")
+            rows.append((
+                pages,
+                f"{len(legacy)}/{len(expected)}",
+                len(text.encode("utf-8")) / 1e6,
+                median_ms(lambda: legacy_split(text), args.runs),
+                median_ms(lambda: splitter_split(text), args.runs),
+                median_ms(lambda: splitter_split(text, chunk=64), args.runs),
+                median_ms(lambda: splitter_split(text, output_dir=work), args.runs),
+            ))
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    note = f"，每 {args.stray} 行一处未闭合的 ===FILE:" if args.stray else ""
+    print(f"每项取 {args.runs} 轮中位数{note}")
+    print("段数: 正则 / FileSplitter 拆出的文件数")
+    print(f"{'页数':>6}{'大小':>9}{'段数':>8}{'正则':>11}{'整段':>11}{'流式':>11}{'写盘':>11}{'正则/整段':>11}")
+    for pages, sections, mb, legacy, whole, stream, disk in rows:
+        print(f"{pages:>6}{mb:>7.1f}MB{sections:>8}{legacy:>9.1f}ms{whole:>9.1f}ms{stream:>9.1f}ms{disk:>9.1f}ms"
+              f"{legacy / whole:>10.1f}x")
+
+    print("\n格式变体（✅ 拆分结果正确）:")
+    print(f"{'变体':<16}{'正则':>6}{'FileSplitter':>14}")
+    failures = 0
+    for name, (text, want) in ROBUSTNESS_CASES.items():
+        old = "✅" if legacy_split(text) == want else "❌"
+        ok = splitter_split(text) == want and splitter_split(text, chunk=3) == want
+        failures += not ok
+        print(f"{name:<16}{old:>6}{'✅' if ok else '❌':>14}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
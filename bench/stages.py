@@ -0,0 +1,203 @@
+"""分阶段端到端基准：读取原文 / 拆分 AI 回复 / Pandoc 转换 / 组装，按论文篇幅分别计时
+
+用 bench.synth 生成不同页数的合成论文（docx / md / txt 三种格式）与对应的 AI 回复，
+逐阶段取多轮中位数；结果写入 bench/results/stages_<时间>.json（含提交号、Python 与 Pandoc 版本），
+用 --compare 与之前的结果逐项对比，便于追踪版本间的性能变化。
+
+未安装 Pandoc 时跳过转换阶段，组装只使用静态组件；默认组装后端为 FakeWordApplication
+（每次 COM 调用注入 --com-latency 延迟），--backend 可改为 word / word-pool / ooxml 实测真实后端。
+
+用法（项目根目录下）：
+    python -m bench.stages --pages 10,50,200 --runs 3
+    python -m bench.stages --pages 50 --tables 20 --images 10 --compare bench/results/stages_20250101-120000.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.synth import fake_response, image_names, make_thesis, tiny_png, write_thesis
+from core import build_engine
+from core.backends import WordComBackend
+from core.fake_word import FakeWordApplication
+from core.preprocess import Preprocessor
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+FORMATS = ("docx", "md", "txt")
+STATIC_COMPONENTS = ["cover", "originality", "symbols", "toc"]
+MD_COMPONENTS = ["abs_cn", "abs_en", "body"]
+
+
+def median_s(fn, runs):
+    """多轮运行取中位数（秒），屏蔽各模块的进度输出"""
+    timings = []
+    for _ in range(runs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - t0)
+    return round(statistics.median(timings), 4)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=build_engine.Config.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_backend(name, com_latency):
+    if name == "fake":
+        return lambda: WordComBackend(
+            app_factory=lambda: FakeWordApplication(latency=com_latency, write_outputs=True), startup_delay=0
+        )
+    return name
+
+
+def bench_size(pages, args, work, has_pandoc):
+    thesis = make_thesis(
+        pages=pages, chapters=args.chapters, tables=args.tables, images=args.images,
+        references=args.references, en_ratio=args.en_ratio, seed=args.seed,
+    )
+    processor = Preprocessor()
+    stages = {}
+
+    # 1. 读取原文
+    chars = 0
+    for fmt in FORMATS:
+        path = write_thesis(thesis, os.path.join(work, f"thesis_{pages}.{fmt}"))
+        stages[f"extract.{fmt}"] = median_s(lambda: processor.convert_to_plain_text(path), args.runs)
+        if fmt == "txt":
+            with contextlib.redirect_stdout(io.StringIO()):
+                chars = len(processor.convert_to_plain_text(path))
+
+    # 2. 拆分 AI 回复
+    reply = fake_response(thesis)
+    split_dir = os.path.join(work, f"split_{pages}")
+    stages["split"] = median_s(lambda: processor.split_and_save(reply, output_dir=split_dir), args.runs)
+    png = tiny_png()
+    for name in image_names(thesis):
+        with open(os.path.join(split_dir, name), "wb") as f:
+            f.write(png)
+
+    registry = {k: dict(v) for k, v in build_engine.COMPONENT_REGISTRY.items()}
+    for key in MD_COMPONENTS:
+        registry[key]["path"] = os.path.join(split_dir, os.path.basename(registry[key]["path"]))
+
+    # 3. Pandoc 转换（关闭缓存，测真实转换耗时）
+    components = list(STATIC_COMPONENTS)
+    if has_pandoc:
+        builder = build_engine.DocumentBuilder(make_backend(args.backend, args.com_latency), temp_dir=work)
+        stages["pandoc"] = median_s(lambda: builder._prepare_files(MD_COMPONENTS, registry), args.runs)
+        components = ["cover", "originality", "abs_cn", "abs_en", "symbols", "toc", "body"]
+    else:
+        stages["pandoc"] = None
+
+    # 4. 组装（每轮新建构建器与后端）
+    output = os.path.join(work, f"out_{pages}.docx")
+
+    def build():
+        builder = build_engine.DocumentBuilder(make_backend(args.backend, args.com_latency), temp_dir=work)
+        builder.build(components, output, component_registry=registry)
+
+    stages["build"] = median_s(build, args.runs)
+    return {
+        "pages": pages,
+        "chars": chars,
+        "reply_chars": len(reply),
+        "build_components": components,
+        "stages": stages,
+    }
+
+
+def compare(current, previous_path):
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = json.load(f)
+    old = {r["pages"]: r["stages"] for r in previous["results"]}
+    print(f"\n对比 {os.path.basename(previous_path)} (提交 {previous['meta'].get('commit')}):")
+    print(f"{'页数':>6}  {'阶段':<14}{'之前':>10}{'现在':>10}{'变化':>9}")
+    for result in current["results"]:
+        before = old.get(result["pages"])
+        if before is None:
+            continue
+        for stage, now in result["stages"].items():
+            was = before.get(stage)
+            if now is None or was is None:
+                continue
+            change = f"{(now - was) / was * 100:+.0f}%" if was else "-"
+            print(f"{result['pages']:>6}  {stage:<14}{was:>9.4f}s{now:>9.4f}s{change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分阶段端到端基准（合成论文）")
+    parser.add_argument("--pages", default="10,50,200", help="逗号分隔的论文页数")
+    parser.add_argument("--chapters", type=int, default=6)
+    parser.add_argument("--tables", type=int, default=6)
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--references", type=int, default=30)
+    parser.add_argument("--en-ratio", type=float, default=0.1, help="英文段落比例")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--backend", default="fake", help="fake（FakeWordApplication）/ word / word-pool / ooxml")
+    parser.add_argument("--com-latency", type=float, default=0.001, help="fake 后端每次 COM 调用的延迟（秒）")
+    parser.add_argument("--out", default=None, help="结果 JSON 路径，默认 bench/results/stages_<时间>.json")
+    parser.add_argument("--compare", help="与之前的结果 JSON 对比")
+    args = parser.parse_args()
+
+    has_pandoc = shutil.which("pandoc") is not None
+    work = tempfile.mkdtemp(prefix="bench_stages_")
+    # 基准期间不读写真实的 Pandoc 缓存
+    build_engine.Config.PANDOC_CACHE_ENABLED = False
+
+    results = []
+    try:
+        for pages in [int(p) for p in args.pages.split(",") if p.strip()]:
+            results.append(bench_size(pages, args, work, has_pandoc))
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "pandoc": build_engine.get_pandoc_version() if has_pandoc else None,
+            "backend": args.backend,
+            "runs": args.runs,
+            "params": {k: getattr(args, k) for k in ("chapters", "tables", "images", "references", "en_ratio", "seed")},
+        },
+        "results": results,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"stages_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    names = list(results[0]["stages"]) if results else []
+    print(f"后端: {args.backend}, 每项取 {args.runs} 轮中位数" + ("" if has_pandoc else "（未安装 Pandoc，跳过转换阶段）"))
+    print(f"{'页数':>6}{'字数':>9}" + "".join(f"{name:>13}" for name in names))
+    for result in results:
+        cells = "".join(
+            f"{'-':>13}" if v is None else f"{v * 1000:>11.1f}ms" for v in result["stages"].values()
+        )
+        print(f"{result['pages']:>6}{result['chars']:>9}{cells}")
+    print(f"结果: {out}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
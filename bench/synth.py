@@ -0,0 +1,330 @@
+"""合成论文与 AI 回复生成器（供基准脚本使用）
+
+按页数、章节数、表格数、图片数、参考文献数与英文段落比例生成一篇结构确定的论文，
+可写成 .docx / .md / .txt 三种输入格式；fake_response 按 prompt.txt 约定的 ===FILE: 格式
+与 custom-style 样式生成"AI 已排好版"的回复，可直接交给 split_and_save 与 Pandoc。
+
+    thesis = make_thesis(pages=50, tables=6, images=4)
+    write_thesis(thesis, "synthetic.docx")
+    reply = fake_response(thesis)
+
+相同参数（含 seed）生成的内容完全一致，便于不同版本之间对比耗时。
+"""
+import random
+import struct
+import zipfile
+import zlib
+from xml.sax.saxutils import escape
+
+CHARS_PER_PAGE = 900
+_CN_NUMS = "一二三四五六七八九十"
+_CN_SENTENCES = (
+    "本节围绕物流配送路径优化问题展开讨论，结合实际业务场景分析算法在动态路网中的表现。",
+    "实验在真实订单数据上进行，对比了遗传算法、蚁群算法与深度强化学习方法的求解质量。",
+    "结果表明，所提方法在平均配送时长与车辆利用率两项指标上均优于基线方法。",
+    "为降低训练成本，本文引入经验回放与目标网络，并对奖励函数进行了归一化处理。",
+    "系统采用前后端分离架构，调度服务与地图服务之间通过消息队列解耦。",
+    "在此基础上，进一步讨论了模型在节假日订单高峰期间的稳定性与可扩展性。",
+)
+_EN_SENTENCES = (
+    "This section evaluates the proposed method on a real-world delivery dataset.",
+    "The agent is trained with experience replay and a periodically updated target network.",
+    "Compared with heuristic baselines, the average delivery time is reduced by 12.4 percent.",
+    "We further analyse the sensitivity of the reward weights and the size of the action space.",
+)
+TITLE = "基于深度强化学习的智能物流路径优化系统设计与实现"
+KEYWORDS_CN = ["深度强化学习", "路径优化", "智能物流"]
+KEYWORDS_EN = ["Deep Reinforcement Learning", "Route Optimization", "Intelligent Logistics"]
+
+
+def _cn(n):
+    return _CN_NUMS[n - 1] if n <= 10 else str(n)
+
+
+def _spread(total, buckets):
+    """把 total 个对象尽量均匀地分到 buckets 个桶"""
+    return [total // buckets + (1 if i < total % buckets else 0) for i in range(buckets)]
+
+
+def make_thesis(pages=20, chapters=6, sections=4, tables=4, images=4, references=20, en_ratio=0.1, seed=0):
+    """生成论文结构：dict(title, abstract_cn, abstract_en, chapters, references, thanks)
+
+    chapters 为 [(章标题, [(节标题, [块...]), ...]), ...]，块为
+    ("p", 文本) / ("table", 题注, 表头, 行列表) / ("image", 题注, 文件名)。
+    正文总字数约为 pages * CHARS_PER_PAGE，其中约 en_ratio 的段落为英文。
+    """
+    rng = random.Random(seed)
+
+    def paragraph():
+        if rng.random() < en_ratio:
+            return " ".join(rng.choice(_EN_SENTENCES) for _ in range(4))
+        return "".join(rng.choice(_CN_SENTENCES) for _ in range(4))
+
+    n_sections = chapters * sections
+    per_section = max(1, pages * CHARS_PER_PAGE // n_sections)
+    table_plan = _spread(tables, n_sections)
+    image_plan = _spread(images, n_sections)
+
+    body = []
+    index = 0
+    for c in range(1, chapters + 1):
+        secs = []
+        table_no = image_no = 0
+        for s in range(1, sections + 1):
+            blocks = []
+            size = 0
+            while size < per_section:
+                text = paragraph()
+                blocks.append(("p", text))
+                size += len(text)
+            for _ in range(table_plan[index]):
+                table_no += 1
+                rows = [[f"方案{r}", f"{rng.uniform(10, 99):.2f}", f"{rng.uniform(0, 1):.3f}", str(rng.randint(1, 500))]
+                        for r in range(1, 6)]
+                blocks.insert(len(blocks) // 2, ("table", f"表 {c}-{table_no} 实验结果对比", ["方法", "时长", "利用率", "订单数"], rows))
+            for _ in range(image_plan[index]):
+                image_no += 1
+                blocks.insert(len(blocks) // 2, ("image", f"图 {c}-{image_no} 系统结构示意", f"fig{c}_{image_no}.png"))
+            secs.append((f"{c}.{s} 研究内容{c}.{s}", blocks))
+            index += 1
+        body.append((f"第{_cn(c)}章 研究内容{c}", secs))
+
+    return {
+        "title": TITLE,
+        "abstract_cn": "".join(rng.choice(_CN_SENTENCES) for _ in range(8)),
+        "abstract_en": " ".join(rng.choice(_EN_SENTENCES) for _ in range(6)),
+        "chapters": body,
+        "references": [f"[{i}] 作者{i}. 物流路径优化研究（第{i}卷）. 北京: 科学出版社, {2000 + i % 25}." for i in range(1, references + 1)],
+        "thanks": "".join(rng.choice(_CN_SENTENCES) for _ in range(3)),
+    }
+
+
+def image_names(thesis):
+    return [block[2] for _c, secs in thesis["chapters"] for _s, blocks in secs for block in blocks if block[0] == "image"]
+
+
+def tiny_png(width=8, height=8):
+    """生成一张纯灰色 PNG（不依赖 Pillow）"""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    raw = b"".join(b"\x00" + b"\x80" * width for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+
+
+# ================= 原文（学生提交的未排版论文） =================
+def to_text(thesis):
+    """纯文本：表格用制表符分隔，图片只留题注"""
+    lines = ["毕业论文", f"题目：{thesis['title']}", "摘要", thesis["abstract_cn"],
+             f"关键词：{'；'.join(KEYWORDS_CN)}", "Abstract", thesis["abstract_en"],
+             f"Keywords: {'; '.join(KEYWORDS_EN)}"]
+    for chapter, secs in thesis["chapters"]:
+        lines.append(chapter)
+        for section, blocks in secs:
+            lines.append(section)
+            for block in blocks:
+                if block[0] == "p":
+                    lines.append(block[1])
+                elif block[0] == "table":
+                    lines.append(block[1])
+                    lines.extend("\t".join(row) for row in [block[2]] + block[3])
+                else:
+                    lines.append(f"[{block[1]}]")
+    lines += ["参考文献", *thesis["references"], "致谢", thesis["thanks"]]
+    return "\n".join(lines) + "\n"
+
+
+def _md_table(header, rows):
+    out = ["| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+    out += ["| " + " | ".join(row) + " |" for row in rows]
+    return "\n".join(out)
+
+
+def to_markdown(thesis):
+    """Markdown 原文：章节用 # / ##，表格为管道表，图片用 ![题注](文件名)"""
+    parts = [f"# {thesis['title']}", "## 摘要", thesis["abstract_cn"], f"关键词：{'；'.join(KEYWORDS_CN)}",
+             "## Abstract", thesis["abstract_en"], f"Keywords: {'; '.join(KEYWORDS_EN)}"]
+    for chapter, secs in thesis["chapters"]:
+        parts.append(f"# {chapter}")
+        for section, blocks in secs:
+            parts.append(f"## {section}")
+            for block in blocks:
+                if block[0] == "p":
+                    parts.append(block[1])
+                elif block[0] == "table":
+                    parts += [block[1], _md_table(block[2], block[3])]
+                else:
+                    parts.append(f"![{block[1]}]({block[2]})")
+    parts += ["# 参考文献", "\n".join(thesis["references"]), "# 致谢", thesis["thanks"]]
+    return "\n\n".join(parts) + "\n"
+
+
+# ================= docx（不依赖 python-docx，直接写 WordprocessingML） =================
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Default Extension="png" ContentType="image/png"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    "</Types>"
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/></Relationships>'
+)
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    f'<w:styles xmlns:w="{_W_NS}">'
+    '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/></w:style>'
+    + "".join(
+        f'<w:style w:type="paragraph" w:styleId="Heading{n}"><w:name w:val="heading {n}"/>'
+        f'<w:basedOn w:val="Normal"/><w:pPr><w:outlineLvl w:val="{n - 1}"/></w:pPr></w:style>'
+        for n in (1, 2)
+    )
+    + "</w:styles>"
+)
+
+
+def _p(text, style=None):
+    ppr = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+    return f'<w:p>{ppr}<w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>'
+
+
+def _tbl(header, rows):
+    def row(cells):
+        return "<w:tr>" + "".join(f"<w:tc>{_p(cell)}</w:tc>" for cell in cells) + "</w:tr>"
+
+    grid = "".join('<w:gridCol w:w="2000"/>' for _ in header)
+    return f"<w:tbl><w:tblGrid>{grid}</w:tblGrid>{row(header)}{''.join(row(r) for r in rows)}</w:tbl>"
+
+
+def _drawing(rid, index, cx=1828800, cy=1371600):
+    return (
+        '<w:p><w:r><w:drawing><wp:inline>'
+        f'<wp:extent cx="{cx}" cy="{cy}"/><wp:docPr id="{index}" name="Picture {index}"/>'
+        '<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+        f'<pic:pic><pic:nvPicPr><pic:cNvPr id="{index}" name="fig{index}.png"/><pic:cNvPicPr/></pic:nvPicPr>'
+        f'<pic:blipFill><a:blip r:embed="{rid}"/><a:stretch><a:fillRect/></a:stretch></pic:blipFill>'
+        f'<pic:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+        '<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></pic:spPr></pic:pic>'
+        "</a:graphicData></a:graphic></wp:inline></w:drawing></w:r></w:p>"
+    )
+
+
+def write_docx(thesis, path):
+    body = [_p("毕业论文"), _p(f"题目：{thesis['title']}"), _p("摘要", "Heading1"), _p(thesis["abstract_cn"]),
+            _p(f"关键词：{'；'.join(KEYWORDS_CN)}"), _p("Abstract", "Heading1"), _p(thesis["abstract_en"]),
+            _p(f"Keywords: {'; '.join(KEYWORDS_EN)}")]
+    rels = []
+    for chapter, secs in thesis["chapters"]:
+        body.append(_p(chapter, "Heading1"))
+        for section, blocks in secs:
+            body.append(_p(section, "Heading2"))
+            for block in blocks:
+                if block[0] == "p":
+                    body.append(_p(block[1]))
+                elif block[0] == "table":
+                    body += [_p(block[1]), _tbl(block[2], block[3])]
+                else:
+                    rid = f"rId{len(rels) + 10}"
+                    rels.append((rid, block[2]))
+                    body += [_drawing(rid, len(rels)), _p(block[1])]
+    body.append(_p("参考文献", "Heading1"))
+    body += [_p(ref) for ref in thesis["references"]]
+    body += [_p("致谢", "Heading1"), _p(thesis["thanks"])]
+
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<w:document xmlns:w="{_W_NS}" xmlns:r="{_R_NS}" '
+        'xmlns:wp="http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing" '
+        'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+        'xmlns:pic="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+        f"<w:body>{''.join(body)}<w:sectPr/></w:body></w:document>"
+    )
+    doc_rels = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/>'
+        + "".join(
+            f'<Relationship Id="{rid}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/image" '
+            f'Target="media/{name}"/>'
+            for rid, name in rels
+        )
+        + "</Relationships>"
+    )
+    png = tiny_png()
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        zf.writestr("_rels/.rels", _ROOT_RELS)
+        zf.writestr("word/document.xml", document)
+        zf.writestr("word/styles.xml", _STYLES)
+        zf.writestr("word/_rels/document.xml.rels", doc_rels)
+        for _rid, name in rels:
+            zf.writestr(f"word/media/{name}", png)
+    return path
+
+
+def write_thesis(thesis, path):
+    """按扩展名写出 .docx / .md / .txt"""
+    if path.lower().endswith(".docx"):
+        return write_docx(thesis, path)
+    text = to_markdown(thesis) if path.lower().endswith(".md") else to_text(thesis)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+
+# ================= AI 回复（prompt.txt 约定的格式） =================
+def _styled(style, text):
+    return f'::: {{custom-style="{style}"}}\n{text}\n:::'
+
+
+def fake_response(thesis):
+    """模拟 AI 按 prompt.txt 排好版的回复：abstract_cn.md / abstract_en.md / body.md 三段"""
+    cn = "\n\n".join([
+        _styled("SCAU_Abstract_Title", "摘要"),
+        _styled("SCAU_Abstract_Body", thesis["abstract_cn"]),
+        _styled("SCAU_Keywords", '[关键词：]{custom-style="SCAU_Keyword_Label"} ' + "；".join(KEYWORDS_CN)),
+    ])
+    en = "\n\n".join([
+        _styled("SCAU_English_Title", "Abstract"),
+        _styled("SCAU_Abstract_En", thesis["abstract_en"]),
+        _styled("SCAU_Keywords", '[Key words:]{custom-style="SCAU_Keyword_Label"} ' + "; ".join(KEYWORDS_EN)),
+    ])
+    body = []
+    for c, (chapter, secs) in enumerate(thesis["chapters"], 1):
+        body.append(f"# {c}  {chapter.split(' ', 1)[-1]}")
+        for section, blocks in secs:
+            number, title = section.split(" ", 1)
+            body.append(f"## {number}  {title}")
+            for block in blocks:
+                if block[0] == "p":
+                    body.append(block[1])
+                elif block[0] == "table":
+                    body += [_styled("SCAU_Caption", block[1]), _md_table(block[2], block[3])]
+                else:
+                    body.append(_styled("SCAU_Image_Container", f"![]({block[2]})") + "\n"
+                                + _styled("SCAU_Caption", block[1]))
+    body.append(_styled("SCAU_Section_Centered", "参  考  文  献"))
+    body.append(_styled("SCAU_References_Body", "\n\n".join(thesis["references"])))
+    body.append(_styled("SCAU_Section_Centered", "致        谢"))
+    body.append(thesis["thanks"])
+    return "\n\n".join([
+        "===FILE: abstract_cn.md===\n" + cn,
+        "===FILE: abstract_en.md===\n" + en,
+        "===FILE: body.md===\n" + "\n\n".join(body),
+    ]) + "\n"
@@ -0,0 +1,81 @@
+"""txt / md 输入基准：直接读取 vs pandoc -t plain
+
+以 test/ 下的示例文本生成几种常见输入（UTF-8、UTF-8 BOM、GBK、UTF-16 BOM、Markdown，
+以及超过 mmap 阈值的大文件），分别比较 extract.read_text_file 与 pandoc 的单次耗时。
+
+用法（项目根目录下）：
+    python -m bench.text_input --runs 5
+"""
+import argparse
+import codecs
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from core import extract, pandoc_runner
+from core.build_engine import Config
+
+SAMPLE_TXT = os.path.join(Config.BASE_DIR, "test", "你要排版的文件.txt")
+
+
+def make_inputs(workdir, text):
+    lines = text.splitlines()
+    markdown = "\n".join(f"## {line}" if len(line) < 20 and line else line for line in lines)
+    big = text * (extract.MMAP_THRESHOLD // len(text.encode("utf-8")) + 1)
+
+    cases = [
+        ("txt utf-8", "utf8.txt", text.encode("utf-8")),
+        ("txt utf-8 BOM", "utf8bom.txt", codecs.BOM_UTF8 + text.encode("utf-8")),
+        ("txt gbk", "gbk.txt", text.encode("gbk", errors="replace")),
+        ("txt utf-16 BOM", "utf16.txt", text.encode("utf-16")),
+        ("md utf-8", "sample.md", markdown.encode("utf-8")),
+        ("txt 大文件 (mmap)", "big.txt", big.encode("utf-8")),
+    ]
+    for _label, name, data in cases:
+        with open(os.path.join(workdir, name), "wb") as f:
+            f.write(data)
+    return [(label, os.path.join(workdir, name)) for label, name, _data in cases]
+
+
+def median_ms(fn, runs):
+    timings = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="txt / md 直接读取 vs pandoc")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--input", default=SAMPLE_TXT)
+    args = parser.parse_args()
+
+    text, _encoding = extract.read_text_file(args.input)
+    runner = pandoc_runner.PandocRunner(use_server=False)
+    workdir = tempfile.mkdtemp(prefix="bench_text_")
+    try:
+        print(f"{'输入类型':<18}{'大小':>10}{'编码':>12}{'直接读取':>12}{'pandoc':>12}{'节省':>12}")
+        for label, path in make_inputs(workdir, text):
+            _text, encoding = extract.read_text_file(path)
+            fast = median_ms(lambda: extract.read_text_file(path), args.runs)
+            try:
+                # pandoc 只认 UTF-8，其余编码实际会失败，这里仍计入一次进程启动的耗时
+                slow = median_ms(lambda: runner.convert(path, "plain", options={"wrap": "none"}), args.runs)
+                slow_text = f"{slow:.1f} ms"
+                saved = f"{slow - fast:.1f} ms"
+            except pandoc_runner.PandocError:
+                slow_text, saved = "失败", "-"
+            print(
+                f"{label:<16}{os.path.getsize(path) / 1024:>8.0f} KB{encoding:>12}"
+                f"{fast:>9.2f} ms{slow_text:>12}{saved:>12}"
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""命令行排版（无界面、无交互），适合脚本与服务器环境
+
+    python -m core 论文.docx --preset thesis --out 命令行输出 --pdf
+    python -m core 论文.docx --mode web --prompt-out 提示词.txt     # 网页模式第 1 步：导出要粘贴给 AI 的提示词
+    python -m core 论文.docx --mode web --response 回复.md          # 网页模式第 2 步：用 AI 网页端的回复组装
+
+只导入流水线需要的模块：不加载 PyQt6；openai 仅在 API 模式真正发起请求时导入，
+pywin32 仅在使用 Word 后端时导入。--help 末尾显示本次实测的冷启动耗时。
+整个文件夹请用 python -m core.batch。
+
+退出码：0 成功，1 排版失败，2 参数错误。
+"""
+import time
+
+_T0 = time.perf_counter()
+
+import argparse
+import contextlib
+import os
+import sys
+
+from . import config_manager
+from .build_engine import COMPONENT_REGISTRY, PRESETS
+from .pipeline import FormatJob, JobError
+
+# 命令行不应在启动时加载的模块（界面 / Word COM / OpenAI SDK）
+HEAVY_MODULES = ("PyQt6", "win32com", "pythoncom", "openai")
+
+
+def startup_report():
+    """启动耗时与重量级模块的加载情况（显示在 --help 末尾）"""
+    elapsed_ms = (time.perf_counter() - _T0) * 1000
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    status = f"已加载 {', '.join(loaded)}" if loaded else f"未加载 {' / '.join(HEAVY_MODULES)}"
+    return f"冷启动实测: 导入流水线 {elapsed_ms:.0f} ms（不含解释器自身启动），{status}"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m core",
+        description="排版单个 .docx / .md / .txt 文件（配置读取 api_config.json）",
+        epilog=startup_report(),
+    )
+    parser.add_argument("input", help="原始论文文件")
+    parser.add_argument("--mode", choices=["api", "web"], default="api",
+                        help="api: 调用 AI 接口；web: 通过 --prompt-out / --response 与 AI 网页端交换内容")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="thesis")
+    parser.add_argument("--components", help="逗号分隔的组件 key，覆盖 --preset")
+    parser.add_argument("--out", default="", help="导出目录（相对路径放在 outputs 下）")
+    parser.add_argument("--name", default="", help="导出文件名（不含扩展名），默认取输入文件名")
+    parser.add_argument("--pdf", action="store_true", help="同时导出 PDF")
+    parser.add_argument("--no-docx", action="store_true", help="不保留 docx（需配合 --pdf）")
+    parser.add_argument("--backend", default=None, help="组装后端: word / word-pool / ooxml / auto")
+    parser.add_argument("--no-cache", action="store_true", help="不复用 AI 回复缓存（API 模式）")
+    parser.add_argument("--prompt-out", help="网页模式：把完整提示词写入该文件（- 为标准输出）")
+    parser.add_argument("--response", help="网页模式：AI 回复所在的文件（- 为标准输入）")
+    return parser
+
+
+def _read_text(path):
+    if path == "-":
+        return sys.stdin.read()
+    with open(path, "r", encoding="utf-8-sig") as f:
+        return f.read()
+
+
+def _write_text(path, text, stdout):
+    if path == "-":
+        stdout.write(text)
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if not os.path.isfile(args.input):
+        parser.error(f"文件不存在: {args.input}（整个文件夹请用 python -m core.batch）")
+    if args.no_docx and not args.pdf:
+        parser.error("--no-docx 需配合 --pdf 使用")
+    if args.mode == "web" and not (args.prompt_out or args.response):
+        parser.error("网页模式需指定 --prompt-out（导出提示词）或 --response（使用 AI 回复）")
+    if args.mode == "api" and (args.prompt_out or args.response):
+        parser.error("--prompt-out / --response 仅用于 --mode web")
+
+    components = [key.strip() for key in args.components.split(",") if key.strip()] if args.components else PRESETS[args.preset]
+    unknown = [key for key in components if key not in COMPONENT_REGISTRY]
+    if unknown or not components:
+        parser.error(f"未知组件: {', '.join(unknown)}（可选: {', '.join(COMPONENT_REGISTRY)}）" if unknown else "未选择任何组件")
+    api_config = config_manager.get_request_config(config_manager.load_api_config()) if args.mode == "api" else {}
+    # 提示词输出到标准输出时，日志（含各模块的 print）改写到标准错误，避免混在一起
+    stdout = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr if args.prompt_out == "-" else stdout):
+        return _run(args, components, api_config, stdout)
+
+
+def _run(args, components, api_config, stdout):
+    job = FormatJob(
+        args.input,
+        components,
+        api_config,
+        output_dir=args.out,
+        output_basename=args.name,
+        export_docx=not args.no_docx,
+        export_pdf=args.pdf,
+        use_ai_cache=not args.no_cache,
+        backend=args.backend,
+        log=lambda text: print(text, flush=True),
+    )
+    try:
+        job.prepare()
+        if args.mode == "api" and job.up_to_date():
+            return 0
+        raw_text = job.extract()
+        if args.mode == "api":
+            job.run_ai()
+        else:
+            if args.prompt_out:
+                _write_text(args.prompt_out, job.processor.build_web_prompt(raw_text), stdout)
+                if args.prompt_out != "-":
+                    job.log(f"✅ 提示词已写入: {os.path.abspath(args.prompt_out)}")
+            if not args.response:
+                return 0
+            job.set_response(_read_text(args.response))
+        job.split()
+        job.resolve_outputs()
+        job.build()
+    except JobError as e:
+        print(f"排版失败: {e}", file=sys.stderr)
+        return 1
+    finally:
+        job.cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,330 @@
+"""文档组装后端
+
+DocumentBuilder 只负责编排（准备文件 -> 新建文档 -> 逐个插入 -> 后处理 -> 保存/导出），
+所有与具体文档引擎相关的调用都收敛在这里：
+
+- WordComBackend: 通过 Word COM 自动化组装（Windows + Office）
+- PooledWordBackend: 从常驻 Word 实例池租用实例（见 word_pool），免去每次启动/退出 Word
+- OoxmlBackend:   纯 Python 在 docx 包层面组装（无需 Office，见 ooxml_builder）
+
+WordComBackend 的 app_factory 可替换为 fake_word.FakeWordApplication，
+用于在 Linux CI 上回归测试编排逻辑并统计 COM 往返次数。
+"""
+import time
+
+from .build_engine import Config, load_win32, word_available
+
+
+class BuildBackend:
+    """组装后端接口：一次 start/shutdown 之间可依次构建多个文档"""
+
+    name = "base"
+    display_name = "后端"
+
+    def start(self):
+        """启动文档引擎（如 Word 进程）"""
+
+    def try_start(self, timeout):
+        """提前组装时的启动：需要等待其他构建释放资源时最多等 timeout 秒，等不到返回 False（未启动）"""
+        self.start()
+        return True
+
+    def new_document(self, template):
+        """基于模板新建空白文档"""
+        raise NotImplementedError
+
+    def insert_file(self, path):
+        """在文档末尾插入整个 docx 文件"""
+        raise NotImplementedError
+
+    def insert_page_break(self):
+        raise NotImplementedError
+
+    def update_toc(self):
+        """刷新目录域"""
+        raise NotImplementedError
+
+    def process_styles(self):
+        """样式后处理：图片居中 & 三线表 & 语言修正"""
+        raise NotImplementedError
+
+    def save_as(self, path):
+        raise NotImplementedError
+
+    def export_pdf(self, path):
+        raise NotImplementedError
+
+    def close_document(self, save_changes=True):
+        raise NotImplementedError
+
+    def shutdown(self):
+        """关闭文档引擎并释放资源"""
+
+    def abort(self):
+        """任务被取消时从其他线程调用：尽快中止进行中的调用（之后构建线程中的调用会失败）
+
+        文档不保存，构建线程随后照常调用 close_document(save_changes=False) 与 shutdown()。
+        """
+
+    def stats(self):
+        """可选的性能指标（如 COM 往返次数），供构建日志输出"""
+        return {}
+
+
+class WordComBackend(BuildBackend):
+    name = "word"
+    display_name = "Word"
+
+    def __init__(self, app_factory=None, startup_delay=0.2):
+        """
+        Args:
+            app_factory: 创建 Word.Application 的可调用对象，默认 win32.DispatchEx
+            startup_delay: 启动后等待 Word 完成初始化的秒数（减少偶发 COM 抖动）
+        """
+        self.app_factory = app_factory
+        self.startup_delay = startup_delay
+        self.app = None
+        self.doc = None
+        self._last_app = None
+        self._com_initialized = False
+
+    def start(self):
+        win32, pythoncom = load_win32()
+        # 初始化线程 COM 环境 (真实 Word 必须！)
+        if pythoncom is not None:
+            pythoncom.CoInitialize()
+            self._com_initialized = True
+
+        factory = self.app_factory
+        if factory is None:
+            if win32 is None:
+                raise RuntimeError("未安装 pywin32，无法使用 Word 后端")
+            factory = lambda: win32.DispatchEx("Word.Application")
+
+        # === 健壮的 Word 启动逻辑 ===
+        try:
+            self.app = factory()
+            self._last_app = self.app
+        except Exception as e:
+            # 捕获“服务器运行失败”，通常是因为此时屏幕上有个 Word 弹窗
+            if "服务器运行失败" in str(e) or "-2146959355" in str(e):
+                raise Exception(
+                    "Word 启动失败。请检查：\n"
+                    "1. 屏幕上是否有 Word 的安全弹窗或报错？请手动关闭它们。\n"
+                    "2. 后台是否卡死了 WINWORD.EXE 进程？\n"
+                    "3. 建议先打开一个空白 Word 文档，确保没有弹窗后再运行本工具。"
+                ) from e
+            raise
+
+        if self.startup_delay:
+            time.sleep(self.startup_delay)
+
+        # 设置不可见，避免闪烁
+        self.app.Visible = False
+
+        # === 关键：尝试禁止弹窗 ===
+        # 0 = wdAlertsNone
+        self.app.DisplayAlerts = 0
+
+    def new_document(self, template):
+        # 新建文档（基于 reference 模板）
+        self.doc = self.app.Documents.Add(Template=template)
+        if self.doc.Content.End > 1:
+            self.doc.Content.Delete()
+
+    def reset(self):
+        """关闭残留文档（不保存），使同一个 Word 实例可被下一次构建复用"""
+        self.doc = None
+        documents = self.app.Documents
+        while documents.Count > 0:
+            documents(1).Close(SaveChanges=0)
+
+    def insert_file(self, path):
+        self.app.Selection.InsertFile(FileName=path)
+
+    def insert_page_break(self):
+        self.app.Selection.InsertBreak(Type=Config.WD_PAGE_BREAK)
+
+    def update_toc(self):
+        """刷新目录域"""
+        doc = self.doc
+        if doc.TablesOfContents.Count > 0:
+            print("   -> [TOC] 正在刷新目录页码...")
+            for toc in doc.TablesOfContents:
+                toc.Update()
+
+    def process_styles(self):
+        """样式后处理：图片居中 & 三线表 & 语言修正"""
+        doc = self.doc
+        print("   -> [Style] 执行样式精修与语言校正...")
+
+        # ==========================================
+        # 修复红色波浪线 (语言设置)
+        # ==========================================
+        try:
+            # 2052 是 "中文(中国)" 的 Locale ID
+            # 1033 是 "英语(美国)"
+            doc.Content.LanguageID = 2052
+            doc.Content.NoProofing = False  # 允许校对，但现在是按中文校对
+
+            # 为了保险，直接关闭文档的拼写检查显示（眼不见为净）
+            doc.ShowSpellingErrors = False
+            doc.ShowGrammaticalErrors = False
+        except Exception as e:
+            print(f"   -> [Warning] 语言设置失败: {e}")
+
+        # ==========================================
+        # 图片处理
+        # ==========================================
+        if doc.InlineShapes.Count > 0:
+            for shape in doc.InlineShapes:
+                shape.Range.ParagraphFormat.Alignment = Config.WD_ALIGN_PARAGRAPH_CENTER
+                shape.Range.ParagraphFormat.FirstLineIndent = 0
+                shape.Range.ParagraphFormat.CharacterUnitFirstLineIndent = 0
+
+        # ==========================================
+        # 表格处理 (三线表)
+        # ==========================================
+        if doc.Tables.Count > 0:
+            for tbl in doc.Tables:
+                # 边框清除与重设
+                tbl.Borders.Enable = False
+                tbl.Borders(Config.WD_BORDER_TOP).LineStyle = Config.WD_LINE_STYLE_SINGLE
+                tbl.Borders(Config.WD_BORDER_TOP).LineWidth = Config.WD_LINE_WIDTH_150PT
+                tbl.Borders(Config.WD_BORDER_TOP).Color = Config.WD_COLOR_BLACK
+                tbl.Borders(Config.WD_BORDER_BOTTOM).LineStyle = Config.WD_LINE_STYLE_SINGLE
+                tbl.Borders(Config.WD_BORDER_BOTTOM).LineWidth = Config.WD_LINE_WIDTH_150PT
+                tbl.Borders(Config.WD_BORDER_BOTTOM).Color = Config.WD_COLOR_BLACK
+
+                if tbl.Rows.Count > 1:
+                    header = tbl.Rows(1)
+                    header.Borders(Config.WD_BORDER_BOTTOM).LineStyle = Config.WD_LINE_STYLE_SINGLE
+                    header.Borders(Config.WD_BORDER_BOTTOM).LineWidth = Config.WD_LINE_WIDTH_075PT
+                    header.Borders(Config.WD_BORDER_BOTTOM).Color = Config.WD_COLOR_BLACK
+
+                # 对齐修正
+                tbl.Range.ParagraphFormat.LeftIndent = 0
+                tbl.Range.ParagraphFormat.FirstLineIndent = 0
+                tbl.Range.ParagraphFormat.Alignment = Config.WD_ALIGN_PARAGRAPH_CENTER
+                tbl.Rows.Alignment = Config.WD_ALIGN_ROW_CENTER
+                tbl.AutoFitBehavior(Config.WD_AUTO_FIT_WINDOW)
+
+    def save_as(self, path):
+        self.doc.SaveAs(path)
+
+    def export_pdf(self, path):
+        self.doc.ExportAsFixedFormat(path, ExportFormat=Config.WD_EXPORT_FORMAT_PDF)
+
+    def close_document(self, save_changes=True):
+        if self.doc is None:
+            return
+        try:
+            if save_changes:
+                self.doc.Close()
+            else:
+                self.doc.Close(SaveChanges=False)
+        finally:
+            self.doc = None
+
+    def abort(self):
+        # 退出 Word：构建线程中正在进行的调用结束后，后续调用都会失败并进入清理流程。
+        # 真实 Word 的 COM 对象属于构建线程的套间，跨线程调用可能直接失败，此时只能等当前调用返回；
+        # 需要立即放弃卡住的 Word 时使用实例池后端（见 word_pool.PooledWordBackend.abort）
+        app = self.app
+        if app is None:
+            return
+        try:
+            app.Quit(SaveChanges=0)
+        except Exception:
+            pass
+
+    def shutdown(self):
+        if self.app is not None:
+            try:
+                # 0 = wdDoNotSaveChanges：未保存的文档（如被取消的构建）直接丢弃，不弹出保存提示
+                self.app.Quit(SaveChanges=0)
+            except Exception:
+                pass
+        self.app = None
+        self.doc = None
+
+        # 释放 COM 环境
+        if self._com_initialized:
+            load_win32()[1].CoUninitialize()
+            self._com_initialized = False
+
+    def stats(self):
+        # 仅 FakeWordApplication 提供调用计数（按类属性判断，避免对真实 COM 对象发起调用）
+        app = self._last_app
+        if app is None or not hasattr(type(app), "com_calls"):
+            return {}
+        return {"com_round_trips": app.com_calls}
+
+
+class OoxmlBackend(BuildBackend):
+    name = "ooxml"
+    display_name = "OOXML 后端 (无需 Word)"
+
+    def __init__(self):
+        self.doc = None
+        self._saved_path = None
+        self._builder = None
+
+    def start(self):
+        # 延迟导入：lxml 只在使用 OOXML 后端时才需要
+        from . import ooxml_builder
+
+        self._builder = ooxml_builder
+
+    def new_document(self, template):
+        self.doc = self._builder.OoxmlDocument(template)
+        self._saved_path = None
+
+    def insert_file(self, path):
+        self.doc.append_file(path)
+
+    def insert_page_break(self):
+        self.doc.append_page_break()
+
+    def update_toc(self):
+        if self.doc.update_toc():
+            print("   -> [TOC] 已标记目录域，打开文档时自动刷新页码")
+
+    def process_styles(self):
+        print("   -> [Style] 执行样式精修与语言校正...")
+        self.doc.process_styles()
+
+    def save_as(self, path):
+        self.doc.save(path)
+        self._saved_path = path
+
+    def export_pdf(self, path):
+        if not self._saved_path:
+            raise RuntimeError("请先保存 docx 再导出 PDF")
+        self._builder.export_pdf(self._saved_path, path)
+
+    def close_document(self, save_changes=True):
+        self.doc = None
+
+
+def create_backend(spec=None):
+    """根据名称（"word" / "word-pool" / "ooxml" / "auto"）、现成实例或工厂函数得到后端对象
+
+    多个文档同时构建时（批量模式）每个 DocumentBuilder 须有自己的后端对象，此时传名称或工厂函数。
+    """
+    if isinstance(spec, BuildBackend):
+        return spec
+    if callable(spec):
+        return spec()
+    name = (spec or Config.BUILD_BACKEND or "auto").lower()
+    if name == "auto":
+        name = "word-pool" if word_available() else "ooxml"
+    if name == "word-pool":
+        from .word_pool import PooledWordBackend
+
+        return PooledWordBackend()
+    if name == "word":
+        return WordComBackend()
+    if name == "ooxml":
+        return OoxmlBackend()
+    raise ValueError(f"未知的组装后端: {spec}")
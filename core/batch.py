@@ -0,0 +1,310 @@
+"""批量排版：一次处理整个文件夹（或一组文件）
+
+    python -m core.batch 报告目录/ --preset report --out 批量输出 --concurrency 4
+
+- 读取原文与 AI 请求在线程池中并发进行；AI 请求另受各提供商的并发数 / 每分钟请求数限制（见 ratelimit）
+- 组装阶段单独排队：Word 后端按实例池大小并行（默认 1 个实例，即逐个组装），OOXML 后端可多个同时组装
+- 每份文件结束后刷新输出目录下的 batch_manifest.json：各文件的状态、各阶段耗时、输出路径与错误信息，
+  以及整批的墙钟时间与吞吐量（份/小时）
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from . import build_engine
+from .build_engine import COMPONENT_REGISTRY, PRESETS
+from .cancel import CancelToken
+from .pipeline import FormatJob, sanitize_filename
+
+SUPPORTED_EXTS = (".docx", ".md", ".txt")
+# 同时处理（读取 + AI）的文档数
+BATCH_CONCURRENCY = 4
+MANIFEST_NAME = "batch_manifest.json"
+
+
+def collect_inputs(paths, recursive=False):
+    """把文件 / 文件夹列表展开为待处理的文件（按路径排序去重，跳过 Word 的 ~$ 临时文件）"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            if recursive:
+                for root, _dirs, names in os.walk(path):
+                    found.extend(os.path.join(root, name) for name in names)
+            else:
+                found.extend(os.path.join(path, name) for name in os.listdir(path))
+        else:
+            found.append(path)
+
+    inputs = []
+    seen = set()
+    for path in sorted(found):
+        name = os.path.basename(path)
+        key = os.path.normcase(os.path.abspath(path))
+        if key in seen or name.startswith("~$") or not os.path.isfile(path):
+            continue
+        if os.path.splitext(name)[1].lower() in SUPPORTED_EXTS:
+            seen.add(key)
+            inputs.append(path)
+    return inputs
+
+
+def default_build_workers(backend=None):
+    """组装阶段的并行度：Word 实例池按实例数，单次启动 Word 时为 1，OOXML 按 CPU 数"""
+    if backend is not None and not isinstance(backend, str):
+        return 1  # 自定义后端无法判断是否支持并行，保守起见逐个组装
+    name = (backend or build_engine.Config.BUILD_BACKEND or "auto").lower()
+    if name == "auto":
+        name = "word-pool" if build_engine.word_available() else "ooxml"
+    if name == "word-pool":
+        return max(1, build_engine.Config.WORD_POOL_SIZE)
+    if name == "ooxml":
+        return max(1, min(4, os.cpu_count() or 1))
+    return 1
+
+
+class BatchRunner:
+    def __init__(
+        self,
+        inputs,
+        components,
+        api_config,
+        output_dir: str | None = None,
+        export_docx: bool = True,
+        export_pdf: bool = False,
+        use_ai_cache: bool = True,
+        concurrency: int = BATCH_CONCURRENCY,
+        build_workers: int | None = None,
+        backend=None,
+        cancel_token=None,
+        log=print,
+    ):
+        """
+        Args:
+            inputs: 待处理的文件列表（见 collect_inputs）
+            output_dir: 导出目录（同 FormatJob），manifest 也写在这里
+            concurrency: 同时读取 / 请求 AI 的文档数
+            build_workers: 同时组装的文档数，默认按后端决定（见 default_build_workers）
+            cancel_token: 全部任务共用的取消令牌（见 core.cancel）；取消后进行中的文档立即中止，其余记为失败
+        """
+        self.inputs = list(inputs)
+        self.components = list(components)
+        self.api_config = api_config or {}
+        self.output_dir = output_dir
+        self.export_docx = export_docx
+        self.export_pdf = export_pdf
+        self.use_ai_cache = use_ai_cache
+        self.concurrency = max(1, concurrency)
+        self.build_workers = build_workers or default_build_workers(backend)
+        self.backend = backend
+        self.cancel_token = cancel_token or CancelToken()
+        self.log = log
+
+        self.entries = []
+        self.manifest_path = None
+        self.started = None
+        self._lock = threading.Lock()
+        self._t0 = None
+
+    def _basenames(self):
+        """各文件的导出文件名；不同文件夹下的同名文件加序号区分"""
+        names, used = [], {}
+        for path in self.inputs:
+            base = sanitize_filename(os.path.splitext(os.path.basename(path))[0]) or "Output"
+            count = used.get(base.lower(), 0)
+            used[base.lower()] = count + 1
+            names.append(base if count == 0 else f"{base}_{count + 1}")
+        return names
+
+    def _job_log(self, index, name):
+        prefix = f"[{index + 1}/{len(self.inputs)} {name}]"
+        return lambda text: self.log(f"{prefix} {text}")
+
+    def _front(self, entry, job):
+        """读取 + AI + 拆分（在 AI 线程池中执行）"""
+        entry["_t0"] = time.perf_counter()
+        entry["status"] = "running"
+        job.prepare()
+        # 与上次相比输入均未变化时沿用已有输出，不再排队组装
+        entry["up_to_date"] = job.up_to_date()
+        if entry["up_to_date"]:
+            return job
+        job.extract()
+        job.run_ai()
+        job.split()
+        return job
+
+    def _back(self, entry, job):
+        """组装（在组装线程池中执行）"""
+        job.resolve_outputs()
+        return job.build()
+
+    def _finish(self, entry, job, error=None):
+        entry["timings"] = dict(job.timings)
+        entry["elapsed"] = round(time.perf_counter() - entry.pop("_t0", self._t0), 3)
+        if error is None:
+            entry["status"] = "ok"
+            entry["outputs"] = [os.path.abspath(p) for p in job.outputs]
+            entry["ai_cached"] = not job.fresh_response
+        else:
+            entry["status"] = "failed"
+            entry["error"] = str(error)
+            job.log(f"❌ 失败: {error}")
+        job.cleanup()
+        self._write_manifest()
+
+    def _summary(self):
+        wall = time.perf_counter() - self._t0
+        done = [e for e in self.entries if e["status"] in ("ok", "failed")]
+        ok = sum(1 for e in self.entries if e["status"] == "ok")
+        return {
+            "total": len(self.entries),
+            "finished": len(done),
+            "ok": ok,
+            "failed": len(done) - ok,
+            "wall_s": round(wall, 3),
+            "docs_per_hour": round(ok * 3600 / wall, 1) if wall > 0 else None,
+            "concurrency": self.concurrency,
+            "build_workers": self.build_workers,
+        }
+
+    def _write_manifest(self):
+        with self._lock:
+            data = {
+                "started": self.started,
+                "components": self.components,
+                "summary": self._summary(),
+                "files": [{k: v for k, v in e.items() if not k.startswith("_")} for e in self.entries],
+            }
+            tmp = f"{self.manifest_path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp, self.manifest_path)
+
+    def _resolve_manifest_path(self):
+        outputs_root = build_engine.Config.OUTPUTS_DIR
+        final_dir = (self.output_dir or "").strip() or outputs_root
+        if not os.path.isabs(final_dir):
+            final_dir = os.path.abspath(os.path.join(outputs_root, final_dir))
+        os.makedirs(final_dir, exist_ok=True)
+        return os.path.join(final_dir, MANIFEST_NAME)
+
+    def run(self):
+        """处理全部文件，返回 manifest 中的汇总信息"""
+        self._t0 = time.perf_counter()
+        self.started = time.strftime("%Y-%m-%d %H:%M:%S")
+        self.manifest_path = self._resolve_manifest_path()
+        self.log(
+            f"📚 批量排版: {len(self.inputs)} 份文件 "
+            f"(同时处理 {self.concurrency} 份, 同时组装 {self.build_workers} 份)"
+        )
+
+        jobs = {}
+        for index, (path, base) in enumerate(zip(self.inputs, self._basenames())):
+            entry = {"input": os.path.abspath(path), "output_basename": base, "status": "pending", "error": None}
+            self.entries.append(entry)
+            jobs[index] = FormatJob(
+                path,
+                self.components,
+                self.api_config,
+                output_dir=self.output_dir,
+                output_basename=base,
+                export_docx=self.export_docx,
+                export_pdf=self.export_pdf,
+                use_ai_cache=self.use_ai_cache,
+                backend=self.backend,
+                # 组装在另一个线程池中进行，不能在 AI 线程中提前启动后端
+                speculative_build=False,
+                cancel_token=self.cancel_token,
+                log=self._job_log(index, os.path.basename(path)),
+            )
+        self._write_manifest()
+
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix="batch-ai") as front_pool, \
+                ThreadPoolExecutor(self.build_workers, thread_name_prefix="batch-build") as back_pool:
+            fronts = {}
+            for index, job in jobs.items():
+                fronts[front_pool.submit(self._front, self.entries[index], job)] = index
+
+            backs = {}
+            for future in as_completed(fronts):
+                index = fronts[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    self._finish(self.entries[index], jobs[index], e)
+                    continue
+                if self.entries[index]["up_to_date"]:
+                    self._finish(self.entries[index], jobs[index])
+                    continue
+                self.entries[index]["status"] = "building"
+                backs[back_pool.submit(self._back, self.entries[index], jobs[index])] = index
+
+            for future in as_completed(backs):
+                index = backs[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    self._finish(self.entries[index], jobs[index], e)
+                else:
+                    self._finish(self.entries[index], jobs[index])
+
+        summary = self._summary()
+        self._write_manifest()
+        self.log(
+            f"📊 批量完成: 成功 {summary['ok']} / 失败 {summary['failed']}，"
+            f"耗时 {summary['wall_s']:.1f}s，吞吐 {summary['docs_per_hour'] or 0:.0f} 份/小时"
+        )
+        self.log(f"📝 清单: {self.manifest_path}")
+        return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量排版文件夹中的 .docx / .md / .txt（API 模式）")
+    parser.add_argument("inputs", nargs="+", help="文件或文件夹")
+    parser.add_argument("--recursive", action="store_true", help="包含子文件夹")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="thesis")
+    parser.add_argument("--components", help="逗号分隔的组件 key，覆盖 --preset")
+    parser.add_argument("--out", default="", help="导出目录（相对路径放在 outputs 下）")
+    parser.add_argument("--pdf", action="store_true", help="同时导出 PDF")
+    parser.add_argument("--no-docx", action="store_true", help="不保留 docx（需配合 --pdf）")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--build-workers", type=int, default=None)
+    parser.add_argument("--backend", default=None, help="组装后端: word / word-pool / ooxml / auto")
+    parser.add_argument("--no-cache", action="store_true", help="不复用 AI 回复缓存")
+    args = parser.parse_args(argv)
+    components = [key.strip() for key in args.components.split(",") if key.strip()] if args.components else PRESETS[args.preset]
+    unknown = [key for key in components if key not in COMPONENT_REGISTRY]
+    if unknown or not components:
+        parser.error(f"未知组件: {', '.join(unknown)}（可选: {', '.join(COMPONENT_REGISTRY)}）" if unknown else "未选择任何组件")
+
+    from . import config_manager
+
+    api_config = config_manager.get_request_config(config_manager.load_api_config())
+    if not api_config.get("api_key"):
+        parser.error("请先在 api_config.json 中配置 API Key（或在图形界面的【API 配置】中保存）")
+
+    inputs = collect_inputs(args.inputs, recursive=args.recursive)
+    if not inputs:
+        parser.error("没有找到 .docx / .md / .txt 文件")
+
+    runner = BatchRunner(
+        inputs,
+        components,
+        api_config,
+        output_dir=args.out,
+        export_docx=not args.no_docx,
+        export_pdf=args.pdf,
+        use_ai_cache=not args.no_cache,
+        concurrency=args.concurrency,
+        build_workers=args.build_workers,
+        backend=args.backend,
+    )
+    summary = runner.run()
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,10 +1,44 @@
+import importlib.util
 import os
 import subprocess
-import win32com.client as win32
-import pythoncom
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 
+from . import cache, pandoc_runner
+from .cancel import Cancelled, CancelToken
+from .trace import NULL_TRACER
+
+# Word COM 仅在 Windows + Office 环境可用；缺失时自动使用 OOXML 后端。
+# pywin32 导入较慢，只在真正启动 Word 时导入（见 load_win32），判断是否可用用 word_available
+win32 = None
+pythoncom = None
+_win32_checked = False
+
+
+def word_available():
+    """是否安装了 pywin32（不导入，只查找模块）"""
+    if _win32_checked:
+        return win32 is not None
+    try:
+        return importlib.util.find_spec("win32com") is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def load_win32():
+    """按需导入 (win32com.client, pythoncom)；未安装时为 (None, None)"""
+    global win32, pythoncom, _win32_checked
+    if not _win32_checked:
+        try:
+            import win32com.client as win32_client
+            import pythoncom as pythoncom_mod
+        except ImportError:
+            win32_client = pythoncom_mod = None
+        win32, pythoncom, _win32_checked = win32_client, pythoncom_mod, True
+    return win32, pythoncom
+
 # ================= 1. 配置与资源注册表 =================
 class Config:
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -30,6 +64,30 @@ class Config:
     # Word 导出常量
     WD_EXPORT_FORMAT_PDF = 17
 
+    # 组装后端："word" (每次构建启动 Word) | "word-pool" (常驻 Word 实例池)
+    #          | "ooxml" (纯 Python，无需 Office) | "auto" (有 pywin32 用实例池，否则 OOXML)
+    BUILD_BACKEND = "auto"
+
+    # Word 实例池：常驻实例数、单实例最多构建文档数（之后回收重建）、单次 COM 调用超时（秒）、
+    # 构建时等待空闲实例的最长时间（秒）
+    WORD_POOL_SIZE = 1
+    WORD_POOL_MAX_DOCS = 20
+    WORD_CALL_TIMEOUT = 300
+    WORD_LEASE_TIMEOUT = 600
+    # 提前组装（DocumentBuilder.warm_up）时最多等待空闲实例的时间（秒），等不到则组装时再租用
+    WORD_WARM_UP_LEASE_TIMEOUT = 5
+
+    # Markdown 组件并行转换的最大 Pandoc 进程数
+    PANDOC_WORKERS = max(2, min(4, os.cpu_count() or 1))
+
+    # Pandoc 转换缓存（键 = Markdown 内容 + reference.docx + Pandoc 版本），超出上限按 LRU 淘汰
+    PANDOC_CACHE_ENABLED = True
+    PANDOC_CACHE_DIR = os.path.join(TEMP_DIR, "pandoc_cache")
+    PANDOC_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+    # 使用常驻 pandoc server 转换（Pandoc >= 3.0），不可用时自动回退到命令行
+    PANDOC_SERVER = True
+
 # 组件注册表：定义所有可用的模块
 # type: 'static' (Word文件) | 'md' (Markdown文件)
 COMPONENT_REGISTRY = {
@@ -43,11 +101,103 @@ COMPONENT_REGISTRY = {
     "body":        {"type": "md",     "path": os.path.join(Config.MD_DIR, "body.md"), "desc": "正文内容"},
 }
 
-# ================= 2. 核心构建器类 =================
+# 组件预设：界面上的"毕业论文 / 小论文 / 实验报告"，批量模式的 --preset
+PRESETS = {
+    "thesis": ["cover", "originality", "abs_cn", "abs_en", "symbols", "toc", "body"],
+    "paper": ["cover", "abs_cn", "body"],
+    "report": ["cover_exp", "toc", "body"],
+}
+
+# ================= 2. Pandoc 转换缓存 =================
+_pandoc_version = None
+_ref_doc_hash = (None, None)
+_pandoc_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_pandoc_version():
+    """Pandoc 版本字符串（进程内只查询一次）"""
+    global _pandoc_version
+    with _cache_lock:
+        if _pandoc_version is None:
+            try:
+                out = subprocess.run(
+                    ["pandoc", "--version"], capture_output=True, text=True, check=True
+                ).stdout
+                _pandoc_version = out.splitlines()[0].strip() if out else "unknown"
+            except (OSError, subprocess.CalledProcessError):
+                _pandoc_version = "unknown"
+        return _pandoc_version
+
+
+def _reference_doc_hash():
+    """reference.docx 的内容哈希（按修改时间与大小缓存）"""
+    global _ref_doc_hash
+    st = os.stat(Config.REF_DOC)
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _cache_lock:
+        if _ref_doc_hash[0] != stamp:
+            _ref_doc_hash = (stamp, cache.hash_file(Config.REF_DOC))
+        return _ref_doc_hash[1]
+
+
+def get_pandoc_cache():
+    global _pandoc_cache
+    with _cache_lock:
+        if _pandoc_cache is None:
+            _pandoc_cache = cache.DiskCache(
+                Config.PANDOC_CACHE_DIR, Config.PANDOC_CACHE_MAX_BYTES, suffix=".docx"
+            )
+        return _pandoc_cache
+
+
+def referenced_images(input_md, md_bytes=None):
+    """Markdown 中引用的本地图片路径（查找规则同 pandoc_runner.find_local_images）"""
+    if md_bytes is None:
+        with open(input_md, "rb") as f:
+            md_bytes = f.read()
+    markdown = md_bytes.decode("utf-8", errors="ignore")
+    return list(pandoc_runner.find_local_images(markdown, input_md).values())
+
+
+def pandoc_cache_key(input_md):
+    """缓存键：Markdown 内容 + reference.docx + Pandoc 版本 + 引用的本地图片（路径/大小/修改时间）"""
+    with open(input_md, "rb") as f:
+        md_bytes = f.read()
+
+    images = []
+    for path in referenced_images(input_md, md_bytes):
+        st = os.stat(path)
+        images.append(f"{path}|{st.st_size}|{st.st_mtime_ns}")
+
+    return cache.hash_parts(md_bytes, _reference_doc_hash(), get_pandoc_version(), *images)
+
+
+# ================= 3. 核心构建器类 =================
 class DocumentBuilder:
-    def __init__(self):
+    def __init__(self, backend=None, temp_dir=None, tracer=None, cancel_token=None):
+        """
+        Args:
+            backend: 组装后端名称（"word" / "word-pool" / "ooxml" / "auto"）、backends.BuildBackend 实例
+                     或返回实例的工厂函数，默认取 Config.BUILD_BACKEND
+            temp_dir: 中间 docx 的存放目录，默认 Config.TEMP_DIR；多个文档同时构建时须各用各的目录
+            tracer: 记录每次 Pandoc 转换与后端调用耗时的 trace.Tracer（可选）
+            cancel_token: 任务的取消令牌（见 core.cancel）；被取消时结束 Pandoc 进程、
+                          中止后端调用并丢弃未保存的文档，build() 抛出 Cancelled
+        """
+        from . import backends
+
         self._ensure_dirs()
-        self.word_app = None
+        self.backend = backends.create_backend(backend)
+        self.temp_dir = temp_dir or Config.TEMP_DIR
+        self.tracer = tracer or NULL_TRACER
+        self.cancel_token = cancel_token or CancelToken()
+        # 提前转换的 Markdown 组件：绝对路径 -> future（见 preconvert）
+        self._preconverted = {}
+        self._preconvert_pool = None
+        self._preconvert_lock = threading.Lock()
+        self._backend_started = False  # 后端已由 warm_up() 提前启动，build() 直接使用
+        self._prefilled = None  # warm_up() 已新建的文档中提前插入的静态组件（None 表示未新建文档）
 
     def _ensure_dirs(self):
         if not os.path.exists(Config.TEMP_DIR):
@@ -61,75 +211,328 @@ class DocumentBuilder:
             print(f"[Error] Markdown 文件未找到: {input_md}")
             return None
 
-        cmd = f'pandoc "{input_md}" --reference-doc="{Config.REF_DOC}" -o "{output_docx}"'
+        runner = pandoc_runner.get_default_runner(use_server=Config.PANDOC_SERVER)
         try:
-            subprocess.run(cmd, shell=True, check=True)
-            return output_docx
-        except subprocess.CalledProcessError:
-            print(f"[Error] Pandoc 转换失败: {input_md}")
+            return runner.convert(
+                input_md, "docx", output_path=output_docx, options={"reference-doc": Config.REF_DOC},
+                cancel=self.cancel_token,
+            )
+        except pandoc_runner.PandocError as e:
+            print(f"[Error] Pandoc 转换失败: {input_md}\n{e}")
             return None
 
-    def _process_styles(self, doc):
-        """样式后处理：图片居中 & 三线表 & 语言修正"""
-        print("   -> [Style] 执行样式精修与语言校正...")
+    def _cached_convert(self, input_md, output_docx):
+        """带内容寻址缓存的转换，返回 (结果路径, 是否命中缓存)"""
+        if not Config.PANDOC_CACHE_ENABLED or not os.path.exists(input_md):
+            return self._pandoc_convert(input_md, output_docx), False
+
+        store = get_pandoc_cache()
+        key = pandoc_cache_key(input_md)
+        if store.get_file(key, output_docx):
+            return output_docx, True
+
+        result = self._pandoc_convert(input_md, output_docx)
+        if result:
+            try:
+                store.put_file(key, result)
+            except OSError as e:
+                print(f"[Warning] 写入 Pandoc 缓存失败: {e}")
+        return result, False
+
+    def _timed_convert(self, input_md, output_docx):
+        t0 = time.perf_counter()
+        with self.tracer.span("pandoc", cat="build", file=os.path.basename(input_md)) as args:
+            result, hit = self._cached_convert(input_md, output_docx)
+            args["cache_hit"] = hit
+        return result, time.perf_counter() - t0, hit
 
-        # ==========================================
-        # 新增：修复红色波浪线 (语言设置)
-        # ==========================================
+    def _temp_docx_path(self, key):
+        return os.path.join(self.temp_dir, f"temp_{key}.docx")
+
+    def preconvert(self, key, input_md):
+        """在后台提前转换一个 Markdown 组件，build() 时直接取用结果
+
+        用于流式 AI 回复：摘要已生成完毕、正文仍在生成时，先把摘要交给 Pandoc。
+        """
+        with self._preconvert_lock:
+            if self._preconvert_pool is None:
+                self._preconvert_pool = ThreadPoolExecutor(
+                    max_workers=Config.PANDOC_WORKERS, thread_name_prefix="pandoc-pre"
+                )
+            future = self._preconvert_pool.submit(self._timed_convert, input_md, self._temp_docx_path(key))
+            self._preconverted[os.path.abspath(input_md)] = future
+        return future
+
+    def reuse_converted(self, key, input_md):
+        """沿用临时目录中已转换好的 temp_<key>.docx（如从任务日志恢复时），build() 不再调用 Pandoc
+
+        Returns:
+            是否找到了已转换的文件
+        """
+        path = self._temp_docx_path(key)
+        if not os.path.exists(path):
+            return False
+        future = Future()
+        future.set_result((path, 0.0, True))
+        with self._preconvert_lock:
+            self._preconverted[os.path.abspath(input_md)] = future
+        return True
+
+    def _take_preconverted(self, input_md):
+        with self._preconvert_lock:
+            return self._preconverted.pop(os.path.abspath(input_md), None)
+
+    def _shutdown_preconvert(self):
+        with self._preconvert_lock:
+            pool, self._preconvert_pool = self._preconvert_pool, None
+            self._preconverted.clear()
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def warm_up(self, component_keys, component_registry=None, prefill=True, stop=None):
+        """提前完成与组件内容无关的准备（如网页模式等待用户粘贴 AI 回复时），返回已完成的事项列表
+
+        - 预读静态组件，缺失时提前报出
+        - 需要转换 Markdown 时：查询 Pandoc 版本与 reference.docx 哈希（缓存键要用），
+          启动 pandoc server 并预先编码 reference.docx
+        - 启动组装后端（Word / 实例池 / OOXML），build() 不再重复启动；实例池中没有空闲实例时
+          最多等 Config.WORD_WARM_UP_LEASE_TIMEOUT 秒，等不到则留到组装时再租用
+        - prefill 时基于 reference.docx 新建文档，并插入第一个 Markdown 组件之前的静态组件（封面、原创性声明等），
+          build() 只需接着插入其余组件
+
+        须在之后调用 build() 的同一线程中调用（Word COM 对象不能跨线程使用）；最终不调用 build() 时
+        用 close() 释放后端。失败只打印警告，build() 时照常重试；被取消时抛出 Cancelled。
+        stop（threading.Event）置位后不再开始后续步骤，已完成的部分照常由 build() 使用。
+        """
+        registry = component_registry or COMPONENT_REGISTRY
+        items = [registry[key] for key in component_keys if key in registry]
+        done = []
+
+        static = [item for item in items if item["type"] == "static"]
+        for item in static:
+            try:
+                with open(item["path"], "rb") as f:
+                    while f.read(1 << 20):  # 读入系统文件缓存，插入时不再等磁盘
+                        pass
+            except OSError:
+                print(f"[Error] 静态资源丢失: {item['path']}")
+        if static:
+            done.append(f"预读静态组件 {len(static)} 个")
+
+        if any(item["type"] == "md" for item in items):
+            self.cancel_token.check()
+            with self.tracer.span("pandoc.warm_up", cat="build"):
+                try:
+                    get_pandoc_version()
+                    _reference_doc_hash()
+                    runner = pandoc_runner.get_default_runner(use_server=Config.PANDOC_SERVER)
+                    mode = runner.warm_up(files=[Config.REF_DOC])
+                    done.append(f"Pandoc 就绪（{mode}）")
+                except OSError as e:
+                    print(f"[Warning] 预热 Pandoc 失败: {e}")
+
+        self.cancel_token.check()
+        if not self._backend_started and not (stop is not None and stop.is_set()):
+            backend = self.backend
+            try:
+                with self.cancel_token.watching(backend.abort):
+                    with self.tracer.span("backend.start", cat="build", backend=backend.name):
+                        self._backend_started = backend.try_start(Config.WORD_WARM_UP_LEASE_TIMEOUT)
+                if self._backend_started:
+                    done.append(f"已启动 {backend.display_name}")
+                else:
+                    print(f"[Merge] {backend.display_name} 暂无空闲实例，组装时再租用")
+            except Exception as e:
+                try:
+                    backend.shutdown()
+                except Exception:
+                    pass
+                self.cancel_token.check()
+                print(f"[Warning] 提前启动 {backend.display_name} 失败，组装时重试: {e}")
+
+        stopped = stop is not None and stop.is_set()
+        if prefill and self._backend_started and self._prefilled is None and not stopped:
+            if self._prefill(self._leading_static(component_keys, registry), stop):
+                count = len(self._prefilled)
+                done.append(f"已新建文档并插入 {count} 个静态组件" if count else "已新建文档")
+        return done
+
+    @staticmethod
+    def _leading_static(component_keys, registry):
+        """第一个 Markdown 组件之前的静态组件（与 _prepare_files 相同的跳过规则），即最终待合并列表的开头"""
+        leading = []
+        for key in component_keys:
+            item = registry.get(key)
+            if item is None:
+                continue
+            if item["type"] != "static":
+                break
+            if os.path.exists(item["path"]):
+                leading.append(item["path"])
+        return leading
+
+    def _prefill(self, files, stop=None):
+        """新建文档并依次插入 files（stop 置位后不再插入，已插入的开头部分照常使用），
+        成功返回 True；失败时丢弃文档，build() 重新新建"""
+        backend = self.backend
+        span = self.tracer.span
+        inserted = []
         try:
-            # 2052 是 "中文(中国)" 的 Locale ID
-            # 1033 是 "英语(美国)"
-            doc.Content.LanguageID = 2052
-            doc.Content.NoProofing = False  # 允许校对，但现在是按中文校对
-
-            # 为了保险，直接关闭文档的拼写检查显示（眼不见为净）
-            doc.ShowSpellingErrors = False
-            doc.ShowGrammaticalErrors = False
+            with self.cancel_token.watching(backend.abort):
+                with span("Documents.Add", cat="build"):
+                    backend.new_document(Config.REF_DOC)
+                self._prefilled = inserted
+                for file_path in files:
+                    self.cancel_token.check()
+                    if stop is not None and stop.is_set():
+                        break
+                    if inserted:
+                        backend.insert_page_break()
+                    with span("InsertFile", cat="build", file=os.path.basename(file_path)):
+                        backend.insert_file(file_path)
+                    inserted.append(file_path)
+            return True
         except Exception as e:
-            print(f"   -> [Warning] 语言设置失败: {e}")
-
-        # ==========================================
-        # 原有逻辑：图片处理
-        # ==========================================
-        if doc.InlineShapes.Count > 0:
-            for shape in doc.InlineShapes:
-                shape.Range.ParagraphFormat.Alignment = Config.WD_ALIGN_PARAGRAPH_CENTER
-                shape.Range.ParagraphFormat.FirstLineIndent = 0
-                shape.Range.ParagraphFormat.CharacterUnitFirstLineIndent = 0
-
-        # ==========================================
-        # 原有逻辑：表格处理 (三线表)
-        # ==========================================
-        if doc.Tables.Count > 0:
-            for tbl in doc.Tables:
-                # 边框清除与重设
-                tbl.Borders.Enable = False
-                tbl.Borders(Config.WD_BORDER_TOP).LineStyle = Config.WD_LINE_STYLE_SINGLE
-                tbl.Borders(Config.WD_BORDER_TOP).LineWidth = Config.WD_LINE_WIDTH_150PT
-                tbl.Borders(Config.WD_BORDER_TOP).Color = Config.WD_COLOR_BLACK
-                tbl.Borders(Config.WD_BORDER_BOTTOM).LineStyle = Config.WD_LINE_STYLE_SINGLE
-                tbl.Borders(Config.WD_BORDER_BOTTOM).LineWidth = Config.WD_LINE_WIDTH_150PT
-                tbl.Borders(Config.WD_BORDER_BOTTOM).Color = Config.WD_COLOR_BLACK
-
-                if tbl.Rows.Count > 1:
-                    header = tbl.Rows(1)
-                    header.Borders(Config.WD_BORDER_BOTTOM).LineStyle = Config.WD_LINE_STYLE_SINGLE
-                    header.Borders(Config.WD_BORDER_BOTTOM).LineWidth = Config.WD_LINE_WIDTH_075PT
-                    header.Borders(Config.WD_BORDER_BOTTOM).Color = Config.WD_COLOR_BLACK
-
-                # 对齐修正
-                tbl.Range.ParagraphFormat.LeftIndent = 0
-                tbl.Range.ParagraphFormat.FirstLineIndent = 0
-                tbl.Range.ParagraphFormat.Alignment = Config.WD_ALIGN_PARAGRAPH_CENTER
-                tbl.Rows.Alignment = Config.WD_ALIGN_ROW_CENTER
-                tbl.AutoFitBehavior(Config.WD_AUTO_FIT_WINDOW)
-
-    def _update_toc(self, doc):
-        """刷新目录域"""
-        if doc.TablesOfContents.Count > 0:
-            print("   -> [TOC] 正在刷新目录页码...")
-            for toc in doc.TablesOfContents:
-                toc.Update()
+            self._prefilled = None
+            try:
+                backend.close_document(save_changes=False)
+            except Exception:
+                pass
+            self.cancel_token.check()
+            print(f"[Warning] 提前插入静态组件失败，组装时重新插入: {e}")
+            return False
+
+    def close(self):
+        """释放 warm_up() 提前启动、但没有用于 build() 的后端（如任务在组装前失败或被取消），提前新建的文档不保存"""
+        if self._backend_started:
+            self._backend_started = False
+            try:
+                if self._prefilled is not None:
+                    self._prefilled = None
+                    self.backend.close_document(save_changes=False)
+                self.backend.shutdown()
+            except Exception as e:
+                print(f"[Warning] 关闭 {self.backend.display_name} 失败: {e}")
+
+    def _prepare_files(self, component_keys, registry):
+        """准备待合并文件列表：静态资源直接使用，Markdown 并行转为 docx
+
+        各 Markdown 组件互不依赖，在有界线程池中同时调用 Pandoc；
+        结果仍按 component_keys 的顺序合并，总耗时取决于最慢的一个转换。
+        """
+        slots = []  # 每项为文件路径，或 (key, item, future) 待转换占位
+        md_jobs = []
+        for key in component_keys:
+            if key not in registry:
+                print(f"[Warning] 未知组件 key: {key}，已跳过")
+                continue
+
+            item = registry[key]
+
+            if item["type"] == "static":
+                if os.path.exists(item["path"]):
+                    slots.append(item["path"])
+                else:
+                    print(f"[Error] 静态资源丢失: {item['path']}")
+
+            elif item["type"] == "md":
+                job = [key, item, self._temp_docx_path(key), self._take_preconverted(item["path"])]
+                md_jobs.append(job)
+                slots.append(job)
+
+        if md_jobs:
+            pending = [job for job in md_jobs if job[3] is None]
+            workers = max(1, min(Config.PANDOC_WORKERS, len(pending) or 1))
+            print(f"   -> 并行转换 Markdown: {len(md_jobs)} 个组件 (并发 {workers})")
+            if len(pending) < len(md_jobs):
+                print(f"   -> 已提前转换: {len(md_jobs) - len(pending)} 个组件")
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pandoc") as pool:
+                for job in pending:
+                    job[3] = pool.submit(self._timed_convert, job[1]["path"], job[2])
+
+                serial_total = 0.0
+                hits = 0
+                for _key, item, _path, future in md_jobs:
+                    _result, elapsed, hit = future.result()
+                    serial_total += elapsed
+                    hits += hit
+                    note = ", 缓存命中" if hit else ""
+                    print(f"   -> 转换 Markdown: {item['desc']} ({elapsed:.2f}s{note})")
+            wall = time.perf_counter() - t0
+            print(f"   -> [Metrics] Markdown 转换耗时 {wall:.2f}s (逐个转换合计 {serial_total:.2f}s)")
+            if Config.PANDOC_CACHE_ENABLED:
+                print(f"   -> [Metrics] Pandoc 缓存: 命中 {hits} / 未命中 {len(md_jobs) - hits}")
+
+        files_to_merge = []
+        for slot in slots:
+            if isinstance(slot, str):
+                files_to_merge.append(slot)
+                continue
+            result, _elapsed, _hit = slot[3].result()
+            if result:
+                files_to_merge.append(result)
+        return files_to_merge
+
+    @staticmethod
+    def _abs_path(path):
+        if not os.path.isabs(path):
+            return os.path.join(Config.BASE_DIR, path)
+        return path
+
+    def _assemble(self, backend, files_to_merge, output_filename, output_pdf_filename=None):
+        """按顺序插入组件、后处理并保存（与具体后端无关的编排逻辑）"""
+        span = self.tracer.span
+        check = self.cancel_token.check
+        prefilled, self._prefilled = self._prefilled, None
+        if prefilled is not None and files_to_merge[:len(prefilled)] == prefilled:
+            # warm_up() 已新建文档并插入了开头的静态组件，接着插入其余组件
+            for file_path in prefilled:
+                print(f"   -> 已提前插入: {os.path.basename(file_path)}")
+        else:
+            if prefilled is not None:
+                backend.close_document(save_changes=False)
+            prefilled = []
+            # 新建文档（基于 reference 模板）
+            with span("Documents.Add", cat="build"):
+                backend.new_document(Config.REF_DOC)
+
+        for i in range(len(prefilled), len(files_to_merge)):
+            file_path = files_to_merge[i]
+            check()
+            # 组件之间插入分页符（最后一个文件之后不插）
+            if i > 0:
+                backend.insert_page_break()
+            print(f"   -> 插入: {os.path.basename(file_path)}")
+            with span("InsertFile", cat="build", file=os.path.basename(file_path)):
+                backend.insert_file(file_path)
+
+        # 后处理
+        check()
+        with span("update_toc", cat="build"):
+            backend.update_toc()
+        check()
+        with span("process_styles", cat="build"):
+            backend.process_styles()
+
+        # 保存
+        check()
+        abs_output_path = self._abs_path(output_filename)
+        with span("SaveAs", cat="build"):
+            backend.save_as(abs_output_path)
+
+        # 可选：导出 PDF
+        if output_pdf_filename:
+            abs_pdf_path = self._abs_path(output_pdf_filename)
+            try:
+                with span("ExportAsFixedFormat", cat="build"):
+                    backend.export_pdf(abs_pdf_path)
+                print(f"[Success] PDF 导出完成: {abs_pdf_path}")
+            except Exception as e:
+                print(f"[Warning] PDF 导出失败: {e}")
+
+        backend.close_document()
+        print(f"\n[Success] 文档生成完毕: {abs_output_path}")
 
     def build(
         self,
@@ -137,150 +540,73 @@ class DocumentBuilder:
         output_filename="Final_Output.docx",
         output_pdf_filename=None,
         component_registry=None,
+        on_prepared=None,
     ):
         """主入口：根据传入的 keys 列表组装文档（支持线程内调用）
 
         output_filename: 目标 docx 路径（可为绝对路径）
         output_pdf_filename: 可选，目标 pdf 路径（可为绝对路径）
+        on_prepared: 可选，全部组件转换完成、开始合并前的回调 on_prepared(待合并文件列表)
+
+        被取消（cancel_token）时抛出 Cancelled，其他失败只打印日志（调用方按输出文件是否存在判断）。
         """
+        print("=" * 50)
+        print(f"开始构建文档: {output_filename}")
+        print(f"包含组件: {component_keys}")
+        print("=" * 50)
 
-        # 1. 初始化线程 COM 环境 (必须！)
-        pythoncom.CoInitialize()
+        registry = component_registry or COMPONENT_REGISTRY
 
-        new_doc = None
+        # 1. 准备文件列表
         try:
-            print("=" * 50)
-            print(f"开始构建文档: {output_filename}")
-            print(f"包含组件: {component_keys}")
-            print("=" * 50)
-
-            registry = component_registry or COMPONENT_REGISTRY
-
-            # 2. 准备文件列表
-            files_to_merge = []
-            for key in component_keys:
-                if key not in registry:
-                    print(f"[Warning] 未知组件 key: {key}，已跳过")
-                    continue
-
-                item = registry[key]
-
-                if item["type"] == "static":
-                    if os.path.exists(item["path"]):
-                        files_to_merge.append(item["path"])
-                    else:
-                        print(f"[Error] 静态资源丢失: {item['path']}")
-
-                elif item["type"] == "md":
-                    # 动态转换 Markdown
-                    print(f"   -> 转换 Markdown: {item['desc']}")
-                    temp_docx_name = f"temp_{key}.docx"
-                    temp_path = os.path.join(Config.TEMP_DIR, temp_docx_name)
-                    result = self._pandoc_convert(item["path"], temp_path)
-                    if result:
-                        files_to_merge.append(result)
-
-            if not files_to_merge:
-                print("[Error] 没有文件可合并")
-                return
-
-            # 3. 启动 Word 进行合并
-            print(f"[Merge] 正在启动 Word 进行合并...")
-            self.word_app = None
-
-            try:
-                # === 健壮的 Word 启动逻辑 ===
-                try:
-                    self.word_app = win32.DispatchEx("Word.Application")
-                except Exception as e:
-                    # 捕获“服务器运行失败”，通常是因为此时屏幕上有个 Word 弹窗
-                    if "服务器运行失败" in str(e) or "-2146959355" in str(e):
-                        raise Exception(
-                            "Word 启动失败。请检查：\n"
-                            "1. 屏幕上是否有 Word 的安全弹窗或报错？请手动关闭它们。\n"
-                            "2. 后台是否卡死了 WINWORD.EXE 进程？\n"
-                            "3. 建议先打开一个空白 Word 文档，确保没有弹窗后再运行本工具。"
-                        ) from e
-                    raise
-
-                # 稍等一下让 Word 完成初始化（减少偶发 COM 抖动）
-                time.sleep(0.2)
-
-                # 设置不可见，避免闪烁
-                self.word_app.Visible = False
-
-                # === 关键：尝试禁止弹窗 ===
-                # 0 = wdAlertsNone
-                self.word_app.DisplayAlerts = 0
-
-                # 新建文档（基于 reference 模板）
-                new_doc = self.word_app.Documents.Add(Template=Config.REF_DOC)
-                if new_doc.Content.End > 1:
-                    new_doc.Content.Delete()
-
-                selection = self.word_app.Selection
-
-                for i, file_path in enumerate(files_to_merge):
-                    print(f"   -> 插入: {os.path.basename(file_path)}")
-                    selection.InsertFile(FileName=file_path)
-
-                    # 只有当不是最后一个文件时，才插入分页符
-                    if i < len(files_to_merge) - 1:
-                        selection.InsertBreak(Type=Config.WD_PAGE_BREAK)
-
-                # 后处理
-                self._update_toc(new_doc)
-                self._process_styles(new_doc)
-
-                # 保存
-                abs_output_path = output_filename
-                if not os.path.isabs(abs_output_path):
-                    abs_output_path = os.path.join(Config.BASE_DIR, abs_output_path)
-
-                new_doc.SaveAs(abs_output_path)
-
-                # 可选：导出 PDF
-                if output_pdf_filename:
-                    abs_pdf_path = output_pdf_filename
-                    if not os.path.isabs(abs_pdf_path):
-                        abs_pdf_path = os.path.join(Config.BASE_DIR, abs_pdf_path)
-                    try:
-                        new_doc.ExportAsFixedFormat(
-                            abs_pdf_path,
-                            ExportFormat=Config.WD_EXPORT_FORMAT_PDF,
-                        )
-                        print(f"[Success] PDF 导出完成: {abs_pdf_path}")
-                    except Exception as e:
-                        print(f"[Warning] PDF 导出失败: {e}")
-
-                new_doc.Close()
-                new_doc = None
-                print(f"\n[Success] 文档生成完毕: {abs_output_path}")
-
-            except Exception as e:
+            with self.tracer.span("prepare_files", cat="build"):
+                files_to_merge = self._prepare_files(component_keys, registry)
+        finally:
+            self._shutdown_preconvert()
+        if not files_to_merge:
+            print("[Error] 没有文件可合并")
+            return
+        if on_prepared:
+            on_prepared(files_to_merge)
+
+        # 2. 启动后端进行合并
+        self.cancel_token.check()
+        backend = self.backend
+        warmed, self._backend_started = self._backend_started, False
+        if warmed:
+            print(f"[Merge] 使用已提前启动的 {backend.display_name} 进行合并...")
+        else:
+            print(f"[Merge] 正在启动 {backend.display_name} 进行合并...")
+        try:
+            # 合并期间被取消时从取消线程中止后端（放弃卡住的 Word 调用），本线程随即进入清理
+            with self.cancel_token.watching(backend.abort):
+                if not warmed:
+                    with self.tracer.span("backend.start", cat="build", backend=backend.name):
+                        backend.start()
+                self.cancel_token.check()
+                self._assemble(backend, files_to_merge, output_filename, output_pdf_filename)
+        except Exception as e:
+            cancelled = self.cancel_token.is_set()
+            if cancelled:
+                print("[Cancelled] 已取消合并，未保存的文档已丢弃")
+            else:
                 print(f"\n[Fatal Error] {e}")
-                # 如果是 GUI 调用，这个 print 会被重定向到日志框，用户能看到提示
-                if new_doc is not None:
-                    try:
-                        new_doc.Close(SaveChanges=False)
-                    except Exception:
-                        pass
-                    new_doc = None
-
-            finally:
-                if self.word_app:
-                    try:
-                        self.word_app.Quit()
-                    except Exception:
-                        pass
-                self.word_app = None
-
+            # 如果是 GUI 调用，这个 print 会被重定向到日志框，用户能看到提示
+            try:
+                backend.close_document(save_changes=False)
+            except Exception:
+                pass
+            if cancelled:
+                raise Cancelled("合并已取消") from e
         finally:
-            # 释放 COM 环境
-            pythoncom.CoUninitialize()
+            self._prefilled = None
+            backend.shutdown()
+
+        for name, value in backend.stats().items():
+            print(f"   -> [Metrics] {name}: {value}")
 
 
-# ================= 3. 用户调用层 (CLI 模拟) =================
+# ================= 4. 用户调用层 (CLI 模拟) =================
 
 def main():
     builder = DocumentBuilder()
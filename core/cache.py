@@ -0,0 +1,144 @@
+"""内容寻址的磁盘缓存
+
+以内容哈希为键保存中间产物（如 Pandoc 转换出的 docx），
+按总大小做 LRU 淘汰：命中时刷新文件修改时间，超出上限时先删最久未用的条目。
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+
+def hash_parts(*parts):
+    """对若干 bytes / str 片段计算 sha256（片段间带长度前缀，避免拼接歧义）"""
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        h.update(len(part).to_bytes(8, "little"))
+        h.update(part)
+    return h.hexdigest()
+
+
+def hash_file(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class DiskCache:
+    def __init__(self, root, max_bytes, suffix=""):
+        """
+        Args:
+            root: 缓存目录
+            max_bytes: 缓存总大小上限，超出后按最近使用时间淘汰
+            suffix: 缓存文件扩展名（仅便于人工查看）
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, key):
+        # 两级目录，避免单目录文件过多
+        return os.path.join(self.root, key[:2], f"{key}{self.suffix}")
+
+    def _touch(self, path):
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    # ---------- 文件接口 ----------
+    def get_file(self, key, dest):
+        """命中时把缓存内容复制到 dest 并返回 True"""
+        path = self.path_for(key)
+        try:
+            shutil.copyfile(path, dest)
+        except OSError:
+            self._count(False)
+            return False
+        self._touch(path)
+        self._count(True)
+        return True
+
+    def put_file(self, key, src):
+        with open(src, "rb") as f:
+            self.put_bytes(key, f.read())
+
+    # ---------- 字节接口 ----------
+    def get_bytes(self, key):
+        path = self.path_for(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            self._count(False)
+            return None
+        self._touch(path)
+        self._count(True)
+        return data
+
+    def put_bytes(self, key, data):
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再原子替换，避免并发构建读到半个文件
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        self.evict()
+
+    # ---------- 淘汰 ----------
+    def _entries(self):
+        for folder, _dirs, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(folder, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield st.st_mtime, st.st_size, path
+
+    def size(self):
+        return sum(size for _mtime, size, _path in self._entries())
+
+    def evict(self):
+        """总大小超过上限时，按最近使用时间从旧到新删除"""
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _mtime, size, _path in entries)
+            for _mtime, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(self.root, exist_ok=True)
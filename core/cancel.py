@@ -0,0 +1,100 @@
+"""排版任务的取消令牌
+
+点击【取消】时置位任务的 CancelToken，各阶段据此尽快退出：
+
+    token = CancelToken()
+    with token.watching(proc.kill):   # 阻塞期间被取消时，从取消线程调用 proc.kill()
+        out, err = proc.communicate()
+    token.check()                     # 已取消时抛出 Cancelled
+
+- 阶段之间、Pandoc 转换与 Word 调用之前用 check() 检查
+- 阻塞在子进程 / 网络读取 / Word 调用上时，用 watching() 登记"中止动作"：
+  结束 pandoc 进程、关闭 HTTP 连接的 socket、放弃正在等待的 Word 实例
+- 取消后抛出的异常（被结束的进程、被关闭的连接）由调用方按 token 是否已置位统一视为取消
+
+CancelToken 是 threading.Event 的子类，可直接传给只接受 Event 的接口（如 ratelimit 的 slot）；
+linked() 派生的子令牌随父令牌一起取消（如对冲请求中的每一路），子令牌单独取消不影响父令牌。
+"""
+import itertools
+import threading
+from contextlib import contextmanager, nullcontext
+
+
+class Cancelled(Exception):
+    """操作已被取消"""
+
+
+class CancelToken(threading.Event):
+    def __init__(self):
+        super().__init__()
+        self.reason = None
+        self._callbacks = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def cancel(self, reason=None):
+        """请求取消（可在任意线程调用，重复调用无效果）"""
+        if reason and self.reason is None:
+            self.reason = reason
+        self.set()
+
+    def set(self):
+        with self._lock:
+            if self.is_set():
+                return
+            super().set()
+            callbacks, self._callbacks = list(self._callbacks.values()), {}
+        for fn in callbacks:
+            try:
+                fn()
+            except Exception as e:  # noqa: BLE001 - 中止动作失败不影响其他动作
+                print(f"[Warning] 取消时执行中止动作失败: {e}")
+
+    def check(self):
+        """已取消时抛出 Cancelled"""
+        if self.is_set():
+            raise Cancelled(self.reason or "已取消")
+
+    def on_cancel(self, fn):
+        """登记取消时要执行的中止动作（已取消时立即执行），返回注销函数"""
+        with self._lock:
+            if not self.is_set():
+                key = next(self._ids)
+                self._callbacks[key] = fn
+
+                def remove():
+                    with self._lock:
+                        self._callbacks.pop(key, None)
+
+                return remove
+        fn()
+        return lambda: None
+
+    @contextmanager
+    def watching(self, fn):
+        """with 块执行期间被取消时调用 fn()（在取消线程中执行，须线程安全）"""
+        remove = self.on_cancel(fn)
+        try:
+            yield self
+        finally:
+            remove()
+
+    @contextmanager
+    def linked(self):
+        """派生子令牌：本令牌取消时子令牌随之取消，with 块结束后解除关联"""
+        child = CancelToken()
+        with self.watching(lambda: child.cancel(self.reason)):
+            yield child
+
+
+def watching(cancel, fn):
+    """cancel 为 CancelToken 时同 cancel.watching(fn)；为 None 或普通 Event 时什么都不做"""
+    if isinstance(cancel, CancelToken):
+        return cancel.watching(fn)
+    return nullcontext()
+
+
+def check(cancel):
+    """cancel（CancelToken / threading.Event / None）已置位时抛出 Cancelled"""
+    if cancel is not None and cancel.is_set():
+        raise Cancelled(getattr(cancel, "reason", None) or "已取消")
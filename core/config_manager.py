@@ -1,6 +1,5 @@
 import json
 import os
-from PyQt6.QtCore import QSettings
 
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CONFIG_FILE = os.path.join(ROOT_DIR, "api_config.json")
@@ -80,12 +79,58 @@ def get_selected_provider_config(raw_config: dict):
     return raw_config
 
 
+# 请求选项：可写在配置顶层（对所有提供商生效），也可写在单个提供商条目中覆盖
+REQUEST_OPTIONS = (
+    "retries",
+    "hedge_after",
+    "stream",
+    "shard",
+    "shard_concurrency",
+    "pool_size",
+    "connect_timeout",
+    "read_timeout",
+    "completion_timeout",
+)
+
+
+def get_request_config(raw_config: dict):
+    """发起请求用的配置：当前提供商 + 顶层请求选项 + 备用提供商
+
+    备用提供商按顶层 "backup_providers"（提供商名称列表）的顺序取自 providers，
+    未配置 API Key 的跳过；结果放在 "backups" 中，供 Preprocessor 失败切换 / 对冲请求使用。
+    顶层 "auto_provider": true 时所有已配置的提供商都放入 backups，并标记 "auto_provider"。
+    """
+    api_config = {k: raw_config[k] for k in REQUEST_OPTIONS if k in raw_config}
+    api_config.update(get_selected_provider_config(raw_config))
+    if raw_config.get("provider"):
+        api_config.setdefault("provider", raw_config["provider"])
+
+    providers = raw_config.get("providers") or {}
+    names = list(raw_config.get("backup_providers") or [])
+    if raw_config.get("auto_provider"):
+        # 自动模式：所有已配置 Key 的提供商都参与选路，由 Preprocessor 按测速统计排序
+        api_config["auto_provider"] = True
+        names += [name for name in providers if name not in names]
+    backups = []
+    for name in names:
+        cfg = providers.get(name) or {}
+        if name != api_config.get("provider") and cfg.get("api_key"):
+            backups.append(dict(cfg, provider=name))
+    api_config["backups"] = backups
+    return api_config
+
+
 def get_theme(default="light"):
+    # QSettings 只在界面里用到；延迟导入，命令行 / 批量模式读取 API 配置时不加载 Qt
+    from PyQt6.QtCore import QSettings
+
     settings = QSettings("AutoFormatter", "AutoFormatter")
     theme = settings.value("theme", default) or default
     return str(theme).lower()
 
 
 def set_theme(theme: str):
+    from PyQt6.QtCore import QSettings
+
     settings = QSettings("AutoFormatter", "AutoFormatter")
     settings.setValue("theme", theme)
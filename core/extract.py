@@ -0,0 +1,316 @@
+"""原文读取（替代预处理阶段的 pandoc -t plain）
+
+1. DOCX：直接从 docx 压缩包中流式读取 word/document.xml，用增量 XML 解析逐段产出：
+
+    for para in iter_paragraphs("论文.docx"):
+        print(para.heading, para.list_level, para.table_row, para.text)
+
+- 标题级别：段落直接设置的大纲级别，或段落样式（含 basedOn 继承）的大纲级别 / "heading N" 名称
+- 列表：numPr 的层级与编号类型（项目符号 "-" / 有序 "1."，按层级计数）
+- 表格：每行产出一个段落，单元格以 " | " 分隔
+- 已处理完的顶层元素立即从树中移除，内存占用与文档长度无关；全程不落临时文件
+
+2. TXT / Markdown：不做任何格式转换，原样读入（保留 Markdown 结构），见 read_text_file()
+- 编码：BOM（UTF-8 / UTF-16）优先；否则按块增量解码 UTF-8，遇到非法字节改用 GB18030（GBK 超集）
+- 大文件用 mmap 映射后分块解码，不额外读出一份完整的 bytes
+"""
+import codecs
+import collections
+import io
+import mmap
+import os
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_MC = "{http://schemas.openxmlformats.org/markup-compatibility/2006}"
+
+Paragraph = collections.namedtuple("Paragraph", "text heading list_level list_marker table_row")
+Paragraph.__doc__ = """提取出的段落
+
+heading: 标题级别 (1-9)，正文为 0
+list_level: 列表层级（从 0 开始），非列表为 None
+list_marker: 列表标记，如 "-"、"3."
+table_row: 是否为表格行（text 为以 " | " 连接的单元格文本）
+"""
+
+_HEADING_NAME = re.compile(r"^(?:heading|标题)\s*(\d)$", re.IGNORECASE)
+_BULLET_FORMATS = {"bullet", "none"}
+# 这些元素内的文字不属于正文（修订删除、域代码、兼容性回退内容等）
+_SKIP = {f"{_W}delText", f"{_W}instrText", f"{_MC}Fallback"}
+
+# 逐事件比较的标签预先拼好，避免在热循环里反复格式化
+_P, _PPR, _T, _TAB, _BR, _CR, _NB_HYPHEN = (
+    f"{_W}{name}" for name in ("p", "pPr", "t", "tab", "br", "cr", "noBreakHyphen")
+)
+_TBL, _TR, _TC, _BODY, _SDT = (f"{_W}{name}" for name in ("tbl", "tr", "tc", "body", "sdt"))
+_BR_TYPE = f"{_W}type"
+
+
+def _val(el, path):
+    node = el.find(path)
+    return None if node is None else node.get(f"{_W}val")
+
+
+def _load_styles(zf):
+    """样式 id -> (标题级别, numPr)，沿 basedOn 继承"""
+    try:
+        root = ET.fromstring(zf.read("word/styles.xml"))
+    except KeyError:
+        return {}
+
+    raw = {}
+    for style in root.iter(f"{_W}style"):
+        if style.get(f"{_W}type") != "paragraph":
+            continue
+        style_id = style.get(f"{_W}styleId")
+        level = None
+        outline = _val(style, f"{_W}pPr/{_W}outlineLvl")
+        if outline is not None and outline.isdigit() and int(outline) < 9:
+            level = int(outline) + 1
+        else:
+            m = _HEADING_NAME.match(_val(style, f"{_W}name") or "")
+            if m:
+                level = int(m.group(1))
+        num = style.find(f"{_W}pPr/{_W}numPr")
+        num_pr = None
+        if num is not None:
+            num_pr = (_val(num, f"{_W}numId"), _val(num, f"{_W}ilvl") or "0")
+        raw[style_id] = (level, num_pr, _val(style, f"{_W}basedOn"))
+
+    resolved = {}
+
+    def resolve(style_id, seen=()):
+        if style_id in resolved:
+            return resolved[style_id]
+        level, num_pr, based_on = raw.get(style_id, (None, None, None))
+        if based_on and based_on not in seen and (level is None or num_pr is None):
+            parent_level, parent_num = resolve(based_on, seen + (style_id,))
+            level = parent_level if level is None else level
+            num_pr = parent_num if num_pr is None else num_pr
+        resolved[style_id] = (level, num_pr)
+        return resolved[style_id]
+
+    for style_id in raw:
+        resolve(style_id)
+    return resolved
+
+
+def _load_numbering(zf):
+    """(numId, ilvl) -> 是否为有序编号"""
+    try:
+        root = ET.fromstring(zf.read("word/numbering.xml"))
+    except KeyError:
+        return {}
+
+    abstract = {}
+    for node in root.iter(f"{_W}abstractNum"):
+        levels = {}
+        for lvl in node.iter(f"{_W}lvl"):
+            levels[lvl.get(f"{_W}ilvl")] = (_val(lvl, f"{_W}numFmt") or "decimal") not in _BULLET_FORMATS
+        abstract[node.get(f"{_W}abstractNumId")] = levels
+
+    ordered = {}
+    for num in root.iter(f"{_W}num"):
+        levels = abstract.get(_val(num, f"{_W}abstractNumId"), {})
+        for ilvl, is_ordered in levels.items():
+            ordered[(num.get(f"{_W}numId"), ilvl)] = is_ordered
+    return ordered
+
+
+class _ListCounter:
+    """按 numId 与层级计数，出现上级条目时重置下级"""
+
+    def __init__(self, ordered):
+        self.ordered = ordered
+        self.counts = collections.defaultdict(dict)
+
+    def marker(self, num_id, ilvl):
+        if not self.ordered.get((num_id, ilvl), False):
+            return "-"
+        level = int(ilvl)
+        counts = self.counts[num_id]
+        for deeper in [k for k in counts if k > level]:
+            del counts[deeper]
+        counts[level] = counts.get(level, 0) + 1
+        return f"{counts[level]}."
+
+
+def iter_paragraphs(path):
+    """流式产出 docx 正文中的段落（Paragraph），表格按行产出"""
+    with zipfile.ZipFile(path) as zf:
+        styles = _load_styles(zf)
+        lists = _ListCounter(_load_numbering(zf))
+
+        with zf.open("word/document.xml") as fp:
+            body = None
+            skip_depth = 0
+            in_ppr = False
+            para_stack = []  # 每个未闭合段落的 [文本片段, pPr 信息]
+            table_stack = []  # 每个未闭合表格的 [当前行单元格, 当前单元格文本片段]
+
+            for event, el in ET.iterparse(fp, events=("start", "end")):
+                tag = el.tag
+
+                if tag in _SKIP:
+                    skip_depth += 1 if event == "start" else -1
+                    continue
+                if skip_depth:
+                    continue
+                if event == "start":
+                    if tag == _P:
+                        para_stack.append([[], None])
+                    elif tag == _TBL:
+                        table_stack.append([[], None])
+                    elif tag == _TC and table_stack:
+                        table_stack[-1][1] = []
+                    elif tag == _PPR:
+                        in_ppr = True
+                    elif tag == _BODY:
+                        body = el
+                    continue
+
+                # ---------- end 事件 ----------
+                if tag == _T:
+                    if para_stack and el.text:
+                        para_stack[-1][0].append(el.text)
+                elif tag == _TAB:
+                    # pPr/tabs 下的 tab 是制表位定义，不是文字
+                    if para_stack and not in_ppr:
+                        para_stack[-1][0].append("\t")
+                elif tag in (_BR, _CR):
+                    if para_stack and el.get(_BR_TYPE) not in ("page", "column"):
+                        para_stack[-1][0].append("\n")
+                elif tag == _NB_HYPHEN:
+                    if para_stack:
+                        para_stack[-1][0].append("-")
+                elif tag == _PPR:
+                    in_ppr = False
+                    if para_stack:
+                        para_stack[-1][1] = el
+                elif tag == _P:
+                    parts, ppr = para_stack.pop()
+                    text = "".join(parts).strip()
+                    if table_stack and table_stack[-1][1] is not None:
+                        if text:
+                            table_stack[-1][1].append(text)
+                    elif text:
+                        yield _make_paragraph(text, ppr, styles, lists)
+                elif tag == _TC:
+                    if table_stack:
+                        row, cell = table_stack[-1]
+                        row.append(" ".join(cell or []))
+                        table_stack[-1][1] = None
+                elif tag == _TR:
+                    if table_stack:
+                        row = table_stack[-1][0]
+                        table_stack[-1][0] = []
+                        if any(row):
+                            text = " | ".join(row)
+                            if len(table_stack) > 1 and table_stack[-2][1] is not None:
+                                # 嵌套表格并入外层单元格
+                                table_stack[-2][1].append(text)
+                            else:
+                                yield Paragraph(text, 0, None, None, True)
+                elif tag == _TBL:
+                    if table_stack:
+                        table_stack.pop()
+
+                # 顶层元素处理完毕后从树中移除，避免整棵树常驻内存
+                if body is not None and not para_stack and not table_stack and tag in (_P, _TBL, _SDT):
+                    el.clear()
+                    if len(body) and body[0] is el:
+                        del body[0]
+
+
+def _make_paragraph(text, ppr, styles, lists):
+    heading = 0
+    num_pr = None
+    if ppr is not None:
+        style_level, num_pr = styles.get(_val(ppr, f"{_W}pStyle"), (None, None))
+        outline = _val(ppr, f"{_W}outlineLvl")
+        if outline is not None and outline.isdigit() and int(outline) < 9:
+            heading = int(outline) + 1
+        elif style_level:
+            heading = style_level
+        num = ppr.find(f"{_W}numPr")
+        if num is not None:
+            num_pr = (_val(num, f"{_W}numId"), _val(num, f"{_W}ilvl") or "0")
+
+    if num_pr and num_pr[0] not in (None, "0") and not heading:
+        num_id, ilvl = num_pr
+        return Paragraph(text, 0, int(ilvl), lists.marker(num_id, ilvl), False)
+    return Paragraph(text, heading, None, None, False)
+
+
+def render(paragraph):
+    """将段落渲染为带结构标记的纯文本（标题用 #，列表用缩进 + 标记）"""
+    if paragraph.heading:
+        return f"{'#' * paragraph.heading} {paragraph.text}"
+    if paragraph.list_level is not None:
+        return f"{'  ' * paragraph.list_level}{paragraph.list_marker} {paragraph.text}"
+    return paragraph.text
+
+
+def extract_text(path):
+    """提取整篇 docx 为纯文本（段落间空一行），只在最后拼接一次"""
+    return "\n\n".join(render(p) for p in iter_paragraphs(path)) + "\n"
+
+
+# ================= 纯文本 / Markdown =================
+# 超过该大小的文件用 mmap 读取
+MMAP_THRESHOLD = 4 * 1024 * 1024
+TEXT_CHUNK_SIZE = 1 << 20
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+# 无 BOM 时依次尝试的编码；GB18030 能解码任意字节序列，作为兜底
+FALLBACK_ENCODINGS = ("utf-8", "gb18030")
+
+
+def _open_bytes(f, size):
+    """小文件直接读入，大文件返回 mmap（调用方负责关闭）"""
+    if size >= MMAP_THRESHOLD:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return f.read()
+
+
+def _decode(data, start, encoding, chunk_size):
+    """按块增量解码（同时统一换行符为 \n），只在最后拼接一次"""
+    decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder(encoding)(), translate=True)
+    view = memoryview(data)
+    try:
+        pieces = [decoder.decode(view[i:i + chunk_size]) for i in range(start, len(data), chunk_size)]
+        pieces.append(decoder.decode(b"", final=True))
+    finally:
+        view.release()
+    return "".join(pieces)
+
+
+def read_text_file(path, chunk_size=TEXT_CHUNK_SIZE):
+    """读取 .txt / .md 原文，返回 (文本, 编码)"""
+    size = os.path.getsize(path)
+    if size == 0:
+        return "", "utf-8"
+
+    with open(path, "rb") as f:
+        data = _open_bytes(f, size)
+        try:
+            head = data[:4]
+            for bom, encoding in _BOMS:
+                if head.startswith(bom):
+                    return _decode(data, len(bom), encoding, chunk_size), encoding
+
+            for encoding in FALLBACK_ENCODINGS:
+                try:
+                    return _decode(data, 0, encoding, chunk_size), encoding
+                except UnicodeDecodeError:
+                    continue
+            raise UnicodeDecodeError(encoding, b"", 0, 0, "无法识别的文本编码")
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
@@ -0,0 +1,324 @@
+"""Word.Application 的本地替身（仅用于测试与基准）
+
+实现 DocumentBuilder / WordComBackend 用到的 Word 对象模型子集，
+记录每一次 COM 调用（方法调用、属性读写都算一次往返），并支持按调用注入延迟或异常：
+
+    app = FakeWordApplication(latency={"Selection.InsertFile": 0.05})
+    builder = DocumentBuilder(backend=WordComBackend(app_factory=lambda: app, startup_delay=0))
+    builder.build([...], "out.docx")
+    print(app.com_calls, app.call_counts())
+
+插入真实 docx 时会解析其中的表格、内嵌图片与目录域数量，
+使 _process_styles 的循环次数与真实文档一致。
+"""
+import collections
+import threading
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_WP = "{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}"
+
+FakeCall = collections.namedtuple("FakeCall", "name args kwargs thread_id timestamp")
+
+
+class FakeComError(RuntimeError):
+    """模拟 COM 调用失败（如 RPC 服务器不可用）"""
+
+
+def inspect_docx(path):
+    """统计 docx 中的顶层表格（及行数）、内嵌图片、目录域数量"""
+    tables, inline_shapes, tocs = [], 0, 0
+    try:
+        with zipfile.ZipFile(path) as zf, zf.open("word/document.xml") as fp:
+            depth = 0
+            rows = 0
+            for event, el in ET.iterparse(fp, events=("start", "end")):
+                if el.tag == f"{_W}tbl":
+                    if event == "start":
+                        depth += 1
+                        if depth == 1:
+                            rows = 0
+                    else:
+                        depth -= 1
+                        if depth == 0:
+                            tables.append(rows)
+                elif el.tag == f"{_W}tr" and event == "start" and depth == 1:
+                    rows += 1
+                elif event == "end" and el.tag == f"{_WP}inline":
+                    inline_shapes += 1
+                elif event == "end" and el.tag == f"{_W}instrText":
+                    if (el.text or "").strip().startswith("TOC"):
+                        tocs += 1
+                elif event == "end" and el.tag == f"{_W}fldSimple":
+                    if (el.get(f"{_W}instr") or "").strip().startswith("TOC"):
+                        tocs += 1
+    except (OSError, KeyError, zipfile.BadZipFile, ET.ParseError):
+        pass
+    return tables, inline_shapes, tocs
+
+
+class _FakeComObject:
+    """属性读写与方法调用均记录为一次 COM 往返"""
+
+    _com_name = "Object"
+
+    def __init__(self, app, **props):
+        object.__setattr__(self, "_app", app)
+        object.__setattr__(self, "_props", dict(props))
+
+    def __getattr__(self, name):
+        props = self.__dict__.get("_props", {})
+        if name.startswith("_") or name not in props:
+            raise AttributeError(name)
+        self._app._record(f"{self._com_name}.{name}")
+        return props[name]
+
+    def __setattr__(self, name, value):
+        self._app._record(f"{self._com_name}.{name}", value)
+        self._props[name] = value
+
+    def _call(self, method, *args, **kwargs):
+        self._app._record(f"{self._com_name}.{method}", *args, **kwargs)
+
+
+class _FakeCollection(_FakeComObject):
+    _com_name = "Collection"
+
+    def __init__(self, app, com_name, items=None, **props):
+        super().__init__(app, **props)
+        object.__setattr__(self, "_com_name", com_name)
+        object.__setattr__(self, "_items", list(items or []))
+
+    def __getattr__(self, name):
+        if name == "Count":
+            self._app._record(f"{self._com_name}.Count")
+            return len(self._items)
+        return super().__getattr__(name)
+
+    def __iter__(self):
+        self._call("_NewEnum")
+        for item in list(self._items):
+            self._call("Item")
+            yield item
+
+    def __call__(self, index):
+        self._call("Item", index)
+        return self._items[index - 1]
+
+
+def _paragraph_format(app):
+    fmt = _FakeComObject(app, Alignment=0, FirstLineIndent=0, CharacterUnitFirstLineIndent=0, LeftIndent=0)
+    object.__setattr__(fmt, "_com_name", "ParagraphFormat")
+    return fmt
+
+
+def _range(app, **props):
+    rng = _FakeComObject(app, ParagraphFormat=_paragraph_format(app), **props)
+    object.__setattr__(rng, "_com_name", "Range")
+    return rng
+
+
+def _border(app):
+    border = _FakeComObject(app, LineStyle=0, LineWidth=0, Color=0)
+    object.__setattr__(border, "_com_name", "Border")
+    return border
+
+
+class _FakeBorders(_FakeCollection):
+    def __init__(self, app):
+        super().__init__(app, "Borders", Enable=True)
+        object.__setattr__(self, "_by_index", collections.defaultdict(lambda: _border(app)))
+
+    def __call__(self, index):
+        self._call("Item", index)
+        return self._by_index[index]
+
+
+class _FakeRow(_FakeComObject):
+    _com_name = "Row"
+
+    def __init__(self, app):
+        super().__init__(app, Borders=_FakeBorders(app))
+
+
+class _FakeTable(_FakeComObject):
+    _com_name = "Table"
+
+    def __init__(self, app, rows):
+        super().__init__(
+            app,
+            Borders=_FakeBorders(app),
+            Rows=_FakeCollection(app, "Rows", [_FakeRow(app) for _ in range(rows)], Alignment=0),
+            Range=_range(app),
+        )
+
+    def AutoFitBehavior(self, behavior):
+        self._call("AutoFitBehavior", behavior)
+
+
+class _FakeInlineShape(_FakeComObject):
+    _com_name = "InlineShape"
+
+    def __init__(self, app):
+        super().__init__(app, Range=_range(app))
+
+
+class _FakeTableOfContents(_FakeComObject):
+    _com_name = "TableOfContents"
+
+    def Update(self):
+        self._call("Update")
+
+
+class _FakeContent(_FakeComObject):
+    _com_name = "Content"
+
+    def Delete(self):
+        self._call("Delete")
+        self._props["End"] = 1
+
+
+class FakeDocument(_FakeComObject):
+    _com_name = "Document"
+
+    def __init__(self, app, template=None):
+        super().__init__(
+            app,
+            Content=_FakeContent(app, End=100 if template else 1, LanguageID=1033, NoProofing=False),
+            ShowSpellingErrors=True,
+            ShowGrammaticalErrors=True,
+            InlineShapes=_FakeCollection(app, "InlineShapes"),
+            Tables=_FakeCollection(app, "Tables"),
+            TablesOfContents=_FakeCollection(app, "TablesOfContents"),
+        )
+        object.__setattr__(self, "template", template)
+        object.__setattr__(self, "inserted_files", [])
+        object.__setattr__(self, "saved_path", None)
+        object.__setattr__(self, "closed", False)
+
+    def _insert(self, path):
+        app = self._app
+        tables, inline_shapes, tocs = inspect_docx(path)
+        self._props["Tables"]._items.extend(_FakeTable(app, rows) for rows in tables)
+        self._props["InlineShapes"]._items.extend(_FakeInlineShape(app) for _ in range(inline_shapes))
+        self._props["TablesOfContents"]._items.extend(_FakeTableOfContents(app) for _ in range(tocs))
+        self._props["Content"]._props["End"] += 100
+        self.inserted_files.append(path)
+
+    def SaveAs(self, path, *args, **kwargs):
+        self._call("SaveAs", path, *args, **kwargs)
+        object.__setattr__(self, "saved_path", path)
+        self._app._write_output(path)
+
+    def ExportAsFixedFormat(self, path, *args, **kwargs):
+        self._call("ExportAsFixedFormat", path, *args, **kwargs)
+        self._app._write_output(path)
+
+    def Close(self, *args, **kwargs):
+        self._call("Close", *args, **kwargs)
+        object.__setattr__(self, "closed", True)
+        self._app._props["Documents"]._items.remove(self)
+
+
+class _FakeDocuments(_FakeCollection):
+    def __init__(self, app):
+        super().__init__(app, "Documents")
+
+    def Add(self, Template=None, *args, **kwargs):
+        self._call("Add", Template=Template, *args, **kwargs)
+        doc = FakeDocument(self._app, Template)
+        self._items.append(doc)
+        self._app._props["ActiveDocument"] = doc
+        return doc
+
+
+class _FakeSelection(_FakeComObject):
+    _com_name = "Selection"
+
+    def _active(self):
+        return self._app._props.get("ActiveDocument")
+
+    def InsertFile(self, FileName, *args, **kwargs):
+        self._call("InsertFile", FileName=FileName, *args, **kwargs)
+        doc = self._active()
+        if doc is not None:
+            doc._insert(FileName)
+
+    def InsertBreak(self, Type=None, *args, **kwargs):
+        self._call("InsertBreak", Type=Type, *args, **kwargs)
+
+
+class FakeWordApplication(_FakeComObject):
+    """记录所有调用的 Word.Application 替身"""
+
+    _com_name = "Application"
+
+    def __init__(self, latency=0.0, startup_latency=0.0, fail_on=None, write_outputs=False):
+        """
+        Args:
+            latency: 每次调用注入的延迟（秒）；也可传 {调用名: 秒}，
+                     调用名可写 "Selection.InsertFile" 或 "InsertFile"，"*" 为默认值
+            startup_latency: 构造时的延迟，模拟 DispatchEx 启动 Word 的耗时
+            fail_on: {调用名: 异常实例}，调用时抛出，用于模拟 COM 故障
+            write_outputs: SaveAs / ExportAsFixedFormat 时是否写出占位文件
+        """
+        object.__setattr__(self, "_lock", threading.Lock())
+        object.__setattr__(self, "calls", [])
+        object.__setattr__(self, "latency", latency)
+        object.__setattr__(self, "fail_on", dict(fail_on or {}))
+        object.__setattr__(self, "write_outputs", write_outputs)
+        object.__setattr__(self, "quit", False)
+        super().__init__(self, Visible=True, DisplayAlerts=-1)
+        self._props["Documents"] = _FakeDocuments(self)
+        self._props["Selection"] = _FakeSelection(self)
+        self._props["ActiveDocument"] = None
+        if startup_latency:
+            time.sleep(startup_latency)
+
+    # ---------- 记录与注入 ----------
+    def _delay_for(self, name):
+        if isinstance(self.latency, dict):
+            method = name.rsplit(".", 1)[-1]
+            for key in (name, method, "*"):
+                if key in self.latency:
+                    return self.latency[key]
+            return 0.0
+        return self.latency or 0.0
+
+    def _record(self, name, *args, **kwargs):
+        if self.quit:
+            raise FakeComError("RPC 服务器不可用 (Word 已退出)")
+        with self._lock:
+            self.calls.append(FakeCall(name, args, kwargs, threading.get_ident(), time.perf_counter()))
+        error = self.fail_on.get(name) or self.fail_on.get(name.rsplit(".", 1)[-1])
+        delay = self._delay_for(name)
+        if delay:
+            time.sleep(delay)
+        if error is not None:
+            raise error
+
+    def _write_output(self, path):
+        if self.write_outputs:
+            with open(path, "wb") as f:
+                f.write(b"FakeWordApplication output\n")
+
+    # ---------- 统计 ----------
+    @property
+    def com_calls(self):
+        """COM 往返总次数"""
+        return len(self.calls)
+
+    def call_counts(self):
+        with self._lock:
+            return collections.Counter(call.name for call in self.calls)
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls.clear()
+
+    # ---------- Application 方法 ----------
+    def Quit(self, *args, **kwargs):
+        self._call("Quit", *args, **kwargs)
+        object.__setattr__(self, "quit", True)
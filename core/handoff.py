@@ -0,0 +1,72 @@
+"""工作线程与界面之间的一次性交接
+
+网页模式下工作线程把提示词交给用户，然后等用户把 AI 网页端的回复粘贴回来：
+
+    handoff = Handoff()
+    # 工作线程
+    text = handoff.wait(timeout=7200, cancel=token)   # 超时抛出 HandoffTimeout，被取消抛出 Cancelled
+    # 界面线程（弹窗点击确定）
+    handoff.put(text)                                 # 等待方已超时 / 被取消时返回 False
+
+put() 后等待方立即被唤醒（Condition 通知，无轮询延迟）；等待方放弃后交接关闭，之后的 put() 不再生效。
+"""
+import threading
+import time
+
+from .cancel import Cancelled, watching
+
+
+class HandoffTimeout(TimeoutError):
+    """等待超时"""
+
+
+class Handoff:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._ready = False
+        self._closed = False
+        self.value = None
+
+    @property
+    def closed(self):
+        """等待方已放弃（超时 / 被取消）"""
+        return self._closed
+
+    def is_set(self):
+        """已交出结果（与 threading.Event 同名，可作为 stop 传给 FormatJob.warm_up 等）"""
+        return self._ready
+
+    def put(self, value):
+        """交出结果（可在任意线程调用）；已交接过或等待方已放弃时返回 False"""
+        with self._cond:
+            if self._ready or self._closed:
+                return False
+            self.value = value
+            self._ready = True
+            self._cond.notify_all()
+            return True
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def wait(self, timeout=None, cancel=None):
+        """等待 put() 交出的结果
+
+        Args:
+            timeout: 最长等待秒数，None 表示一直等待
+            cancel: CancelToken，被取消时立即返回并抛出 Cancelled
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with watching(cancel, self._wake):
+            with self._cond:
+                while not self._ready:
+                    if cancel is not None and cancel.is_set():
+                        self._closed = True
+                        raise Cancelled(getattr(cancel, "reason", None) or "已取消")
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._closed = True
+                        raise HandoffTimeout(f"等待 {timeout:g}s 仍未收到结果")
+                    self._cond.wait(remaining)
+                return self.value
@@ -0,0 +1,323 @@
+"""AI 接口的共享 HTTP 客户端
+
+urllib.request 每次请求都新建连接（TCP + TLS 握手），分片 / 批量场景下大量小请求的耗时主要花在握手上。
+这里按 Base URL 的源（scheme + host + port）维护连接池，keep-alive 连接在调用与线程之间复用：
+
+    pool = get_pool("https://api.deepseek.com/v1")
+    with pool.request("POST", url, body=data, headers=headers) as resp:
+        result = json.loads(resp.read())
+    print(pool.stats())  # {"requests": 3, "created": 1, "reused": 2, ...}
+
+传入 cancel（core.cancel.CancelToken）时，请求期间被取消会直接关闭连接的 socket：
+阻塞在等待响应头或读取流式响应中的线程立即返回并抛出 RequestCancelled，不必等到读取超时。
+
+OpenAI SDK 的客户端同样按 (api_key, base_url) 缓存复用（见 get_openai_client），
+SDK 内部的 httpx 连接池大小与超时取自同一组配置。
+"""
+import collections
+import http.client
+import socket
+import threading
+import urllib.parse
+
+from .cancel import watching
+from .scheduler import RequestCancelled
+
+# 每个源最多保留的空闲连接数；连接 / 读取超时（秒，读取超时作用于每次读，流式响应即两块数据的最长间隔）
+POOL_SIZE = 4
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 60
+# 非流式请求整篇生成完才返回第一个字节，读取超时须覆盖整个生成时间（与 OpenAI SDK 默认的 600 秒相同）
+COMPLETION_TIMEOUT = 600
+
+# 复用的空闲连接可能已被服务端关闭，发送时遇到这些错误换新连接重试一次
+_STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionResetError, BrokenPipeError)
+
+
+class HTTPStatusError(RuntimeError):
+    """服务端返回 4xx / 5xx"""
+
+    def __init__(self, status, body, retry_after=None):
+        super().__init__(f"HTTP {status}: {body}")
+        self.status = status
+        self.body = body
+        self.retry_after = retry_after  # 响应头 Retry-After（秒），供重试退避参考
+
+
+def _abort(conn):
+    """从其他线程中止连接上阻塞的读写（shutdown 使阻塞的 recv 立即返回，close 留给持有连接的线程）"""
+    sock = conn.sock
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class PooledResponse:
+    """借出连接上的一次响应；读完（或 close）后连接自动归还连接池"""
+
+    def __init__(self, pool, conn, resp, cancel=None):
+        self._pool = pool
+        self._conn = conn
+        self._resp = resp
+        self._cancel = cancel
+        self._watch = watching(cancel, lambda: _abort(conn))
+        self._watch.__enter__()
+        self.status = resp.status
+        self.headers = resp.headers
+
+    def _read(self, read):
+        try:
+            return read()
+        except (OSError, http.client.HTTPException) as e:
+            if self._cancel is not None and self._cancel.is_set():
+                raise RequestCancelled() from e
+            raise
+
+    def read(self):
+        try:
+            return self._read(self._resp.read)
+        finally:
+            self.close()
+
+    def __iter__(self):
+        """逐行读取（用于 SSE 流）"""
+        try:
+            while True:
+                line = self._read(self._resp.readline)
+                if not line:
+                    break
+                yield line
+        finally:
+            self.close()
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        self._watch.__exit__(None, None, None)
+        if self._cancel is not None and self._cancel.is_set():
+            # 已被 shutdown 的连接不能再复用
+            self._resp.close()
+            self._pool._release(conn, False)
+            return
+        # 只有响应体已完整读完、且服务端未要求关闭时连接才可复用
+        reusable = self._resp.isclosed() and not self._resp.will_close
+        if not reusable:
+            self._resp.close()
+        self._pool._release(conn, reusable)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc):
+        self.close()
+
+
+class HttpPool:
+    """单个源（scheme://host:port）的 keep-alive 连接池，线程安全"""
+
+    def __init__(self, origin, pool_size=POOL_SIZE, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT):
+        parts = urllib.parse.urlsplit(origin)
+        self.scheme = parts.scheme or "https"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._idle = collections.deque()
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "created": 0, "reused": 0, "discarded": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, idle=len(self._idle))
+
+    # ---------- 连接管理 ----------
+    def _new_connection(self):
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        conn = cls(self.host, self.port, timeout=self.connect_timeout)
+        self._count("created")
+        return conn
+
+    def _acquire(self):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is not None:
+            self._count("reused")
+            return conn, True
+        return self._new_connection(), False
+
+    def _release(self, conn, reusable):
+        if reusable:
+            with self._lock:
+                if len(self._idle) < self.pool_size:
+                    self._idle.append(conn)
+                    return
+        conn.close()
+        self._count("discarded")
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), collections.deque()
+        for conn in idle:
+            conn.close()
+
+    # ---------- 请求 ----------
+    def request(self, method, url, body=None, headers=None, timeout=None, cancel=None):
+        """发送请求，返回 PooledResponse；状态码 >= 400 时读取错误信息并抛出 HTTPStatusError
+
+        Args:
+            url: 完整 URL 或路径（须属于本连接池的源）
+            timeout: 本次请求的读取超时，默认 read_timeout
+            cancel: CancelToken，请求或读取响应期间被取消时关闭连接并抛出 RequestCancelled
+        """
+        parts = urllib.parse.urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        headers = dict(headers or {})
+        headers.setdefault("Connection", "keep-alive")
+
+        self._count("requests")
+        while True:
+            if cancel is not None and cancel.is_set():
+                raise RequestCancelled()
+            conn, reused = self._acquire()
+            try:
+                with watching(cancel, lambda: _abort(conn)):
+                    if conn.sock is None:
+                        conn.connect()
+                        # 请求头与请求体分两次发送，关闭 Nagle 避免与对端延迟 ACK 叠加出约 40ms 的等待
+                        conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    if cancel is not None and cancel.is_set():
+                        raise RequestCancelled()  # 连接建立期间被取消（此时还没有可关闭的 socket）
+                    conn.sock.settimeout(timeout or self.read_timeout)
+                    conn.request(method, path, body=body, headers=headers)
+                    resp = conn.getresponse()
+                break
+            except _STALE_ERRORS as e:
+                conn.close()
+                self._count("discarded")
+                if cancel is not None and cancel.is_set():
+                    raise RequestCancelled() from e
+                if not reused:
+                    raise
+                # 空闲连接已被服务端关闭：换一条连接重试
+            except BaseException as e:
+                conn.close()
+                self._count("discarded")
+                if cancel is not None and cancel.is_set() and not isinstance(e, RequestCancelled):
+                    raise RequestCancelled() from e
+                raise
+
+        response = PooledResponse(self, conn, resp, cancel)
+        if resp.status >= 400:
+            retry_after = resp.headers.get("Retry-After")
+            detail = response.read().decode("utf-8", errors="ignore")
+            raise HTTPStatusError(resp.status, detail, retry_after=retry_after)
+        return response
+
+
+# ================= 进程级共享实例 =================
+_pools = {}
+_openai_clients = {}
+_registry_lock = threading.Lock()
+
+
+def _origin(url):
+    parts = urllib.parse.urlsplit(url)
+    return f"{parts.scheme or 'https'}://{parts.netloc}"
+
+
+def get_pool(base_url, pool_size=None, connect_timeout=None, read_timeout=None):
+    """按源共享的连接池（参数仅在首次创建时生效）"""
+    origin = _origin(base_url)
+    with _registry_lock:
+        pool = _pools.get(origin)
+        if pool is None:
+            pool = HttpPool(
+                origin,
+                pool_size=pool_size or POOL_SIZE,
+                connect_timeout=connect_timeout or CONNECT_TIMEOUT,
+                read_timeout=read_timeout or READ_TIMEOUT,
+            )
+            _pools[origin] = pool
+        return pool
+
+
+def pool_for(api_config):
+    """按 api_config 取连接池（可选键 pool_size / connect_timeout / read_timeout）"""
+    return get_pool(
+        api_config.get("base_url", ""),
+        pool_size=api_config.get("pool_size"),
+        connect_timeout=api_config.get("connect_timeout"),
+        read_timeout=api_config.get("read_timeout"),
+    )
+
+
+def get_openai_client(openai_cls, api_config):
+    """按 (api_key, base_url) 缓存的 OpenAI 客户端，SDK 自带的 httpx 连接池在调用与线程之间复用
+
+    SDK 自身的重试被关闭（max_retries=0），重试与退避统一由 scheduler.RequestScheduler 负责。
+    """
+    api_key = api_config.get("api_key", "")
+    base_url = api_config.get("base_url", "")
+    with _registry_lock:
+        client = _openai_clients.get((api_key, base_url))
+        if client is None:
+            client = openai_cls(
+                api_key=api_key,
+                base_url=base_url,
+                max_retries=0,
+                http_client=_httpx_client(api_config),
+            )
+            _openai_clients[(api_key, base_url)] = client
+        return client
+
+
+def completion_timeout(api_config):
+    """非流式请求的读取超时（秒，可选键 completion_timeout）"""
+    return api_config.get("completion_timeout") or COMPLETION_TIMEOUT
+
+
+def stream_timeout(api_config):
+    """SDK 流式请求的超时：读取超时即两块数据的最长间隔（read_timeout）；httpx 不可用时返回 None（客户端默认）"""
+    try:
+        import httpx
+    except ImportError:
+        return None
+    return httpx.Timeout(
+        api_config.get("read_timeout") or READ_TIMEOUT,
+        connect=api_config.get("connect_timeout") or CONNECT_TIMEOUT,
+    )
+
+
+def _httpx_client(api_config):
+    """与 HttpPool 相同配置的 httpx 客户端；httpx 不可用时返回 None（使用 SDK 默认客户端）
+
+    客户端默认超时按非流式请求设置（completion_timeout），流式请求逐次传入 stream_timeout()。
+    """
+    try:
+        import httpx
+    except ImportError:
+        return None
+    size = api_config.get("pool_size") or POOL_SIZE
+    return httpx.Client(
+        limits=httpx.Limits(max_connections=size * 4, max_keepalive_connections=size),
+        timeout=httpx.Timeout(
+            completion_timeout(api_config),
+            connect=api_config.get("connect_timeout") or CONNECT_TIMEOUT,
+        ),
+    )
+
+
+def all_stats():
+    with _registry_lock:
+        pools = dict(_pools)
+    return {origin: pool.stats() for origin, pool in pools.items()}
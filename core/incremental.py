@@ -0,0 +1,177 @@
+"""增量构建：按输入指纹跳过未变化的阶段
+
+排版流水线可看作一张依赖图（FormatJob 中各阶段按此记录节点）：
+
+    原文 ──> extract ──> ai ──> split ──> pandoc:<组件> ──┐
+                  prompt.txt / 模型配置          静态组件 ──┼──> assemble ──> docx / pdf
+                                   reference.docx / Pandoc ──┘
+
+每个节点的指纹（key）= 其全部输入的哈希：上游节点产物的哈希、相关文件的内容哈希与配置。
+上次运行的指纹与产物哈希记录在输出文件旁的 <文件名>.build.json 中，本次指纹一致且产物
+仍可取回时直接复用上次的结果：
+
+- 什么都没变：只比对各文件的大小与修改时间，不读原文、不调 AI、不启动 Word
+- 只换了静态组件或改了导出选项：复用提取结果与 AI 回复，只重新组装
+- 改了 prompt.txt 或模型：复用提取结果，从 AI 阶段开始重跑
+
+文件哈希按 (大小, 修改时间) 缓存在清单中，未变化的文件不重复读取。
+中间产物（提取的纯文本、AI 回复）按内容哈希存放在 ARTIFACT_DIR，超出上限按 LRU 淘汰，
+被淘汰的节点视为需要重跑。清单只在任务成功后写入，失败的运行不会留下"已完成"的记录。
+"""
+import json
+import os
+import threading
+import zlib
+
+from . import cache
+from .build_engine import Config
+
+# 阶段的处理逻辑变化时递增，使旧清单中的指纹全部失效
+GRAPH_VERSION = 1
+MANIFEST_SUFFIX = ".build.json"
+ARTIFACT_DIR = os.path.join(Config.TEMP_DIR, "build_artifacts")
+ARTIFACT_MAX_BYTES = 300 * 1024 * 1024
+
+_artifact_store = None
+_artifact_lock = threading.Lock()
+
+
+def get_artifact_store():
+    global _artifact_store
+    with _artifact_lock:
+        if _artifact_store is None:
+            _artifact_store = cache.DiskCache(ARTIFACT_DIR, ARTIFACT_MAX_BYTES, suffix=".z")
+        return _artifact_store
+
+
+def text_hash(text):
+    return cache.hash_parts(text)
+
+
+class BuildManifest:
+    def __init__(self, path):
+        """
+        Args:
+            path: 清单文件路径（一般为 <输出目录>/<文件名>.build.json）
+        """
+        self.path = path
+        self.nodes = {}  # 本次运行记录的节点：名称 -> {"key", "outputs"}
+        self.files = {}  # 本次用到的文件：路径 -> [大小, 修改时间, 哈希]
+        self.reused = []  # 复用了上次结果的节点
+        self.rebuilt = []  # 重新执行的节点
+        self._previous = {"nodes": {}, "files": {}}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == GRAPH_VERSION:
+                self._previous = {"nodes": data.get("nodes", {}), "files": data.get("files", {})}
+        except (OSError, ValueError):
+            pass
+
+    # ---------- 指纹 ----------
+    @staticmethod
+    def key(name, *parts):
+        return cache.hash_parts(str(GRAPH_VERSION), name, *parts)
+
+    def file_hash(self, path):
+        """文件内容哈希；大小与修改时间和上次记录一致时沿用记录值，不重新读取"""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        stamp = [st.st_size, st.st_mtime_ns]
+        known = self.files.get(path) or self._previous["files"].get(path)
+        if known and known[:2] == stamp:
+            digest = known[2]
+        else:
+            digest = cache.hash_file(path)
+        self.files[path] = stamp + [digest]
+        return digest
+
+    def previous(self, name):
+        """上次记录的节点产物（不比较指纹），没有记录时为 None"""
+        node = self._previous["nodes"].get(name)
+        return None if node is None else node["outputs"]
+
+    def lookup(self, name, key):
+        """上次同名节点指纹一致时返回其产物，否则 None"""
+        node = self._previous["nodes"].get(name)
+        if node is None or node.get("key") != key:
+            return None
+        return node["outputs"]
+
+    def record(self, name, key, outputs, reused=False):
+        self.nodes[name] = {"key": key, "outputs": outputs}
+        (self.reused if reused else self.rebuilt).append(name)
+        return outputs
+
+    # ---------- 输出文件 ----------
+    @staticmethod
+    def stamp_outputs(paths):
+        """输出文件的 {路径: [大小, 修改时间]}"""
+        stamps = {}
+        for path in paths:
+            st = os.stat(path)
+            stamps[os.path.abspath(path)] = [st.st_size, st.st_mtime_ns]
+        return stamps
+
+    @staticmethod
+    def outputs_intact(stamps):
+        """上次的输出文件都还在且未被改动"""
+        if not stamps:
+            return False
+        for path, stamp in stamps.items():
+            try:
+                st = os.stat(path)
+            except OSError:
+                return False
+            if [st.st_size, st.st_mtime_ns] != stamp:
+                return False
+        return True
+
+    # ---------- 中间产物 ----------
+    @staticmethod
+    def put_text(text):
+        """保存文本产物，返回其哈希"""
+        digest = text_hash(text)
+        store = get_artifact_store()
+        if not os.path.exists(store.path_for(digest)):
+            try:
+                store.put_bytes(digest, zlib.compress(text.encode("utf-8"), 6))
+            except OSError as e:
+                print(f"[Warning] 写入增量构建产物失败: {e}")
+        return digest
+
+    @staticmethod
+    def get_text(digest):
+        """按哈希取回文本产物，已被淘汰或损坏时返回 None"""
+        data = get_artifact_store().get_bytes(digest) if digest else None
+        if data is None:
+            return None
+        try:
+            text = zlib.decompress(data).decode("utf-8")
+        except (zlib.error, UnicodeDecodeError):
+            return None
+        return text if text_hash(text) == digest else None
+
+    # ---------- 读写 ----------
+    def save(self):
+        """合并上次的记录（本次未经过的节点保留原样）后原子写入"""
+        nodes = dict(self._previous["nodes"])
+        nodes.update(self.nodes)
+        files = {p: v for p, v in self._previous["files"].items() if os.path.exists(p)}
+        files.update(self.files)
+        data = {"version": GRAPH_VERSION, "nodes": nodes, "files": files}
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[Warning] 写入增量构建清单失败: {e}")
+
+    def summary(self):
+        parts = []
+        if self.reused:
+            parts.append("复用 " + ", ".join(self.reused))
+        if self.rebuilt:
+            parts.append("重新执行 " + ", ".join(self.rebuilt))
+        return "；".join(parts)
@@ -0,0 +1,202 @@
+"""任务日志：排版任务的断点续做
+
+每个任务在 JOURNAL_DIR 下有一个目录，既是任务的工作目录，也是断点：
+
+    temp/journals/20250101-120000_论文_ab12cd/
+        journal.json     任务设置（输入文件、组件、导出选项、模式）与已完成的阶段
+        raw.txt          extract 完成后：提取的纯文本
+        response.md      ai 完成后：AI 回复（API 返回或网页模式粘贴的内容）
+        md/              split 完成后：拆分出的 Markdown；convert 完成后：Pandoc 转换出的 temp_<组件>.docx
+
+每个阶段完成后把产物写入目录，再更新 journal.json（原子替换），因此 Word 在 InsertFile 时崩溃、
+进程被结束或用户取消时，已付费的 AI 回复与已转换的组件都还在。"继续上次任务"用 latest()
+取回最近一个未完成的日志，FormatJob.from_journal() 按其中的设置重建任务，已完成的阶段直接读取产物。
+
+任务成功后日志目录被删除；失败的日志保留，超过 JOURNAL_MAX_AGE 或总大小超过
+JOURNAL_MAX_BYTES 时（按最后更新时间从旧到新）在创建新日志时清理。
+"""
+import json
+import os
+import shutil
+import time
+import uuid
+
+from .build_engine import Config
+
+JOURNAL_DIR = os.path.join(Config.TEMP_DIR, "journals")
+JOURNAL_MAX_AGE = 7 * 24 * 3600
+JOURNAL_MAX_BYTES = 500 * 1024 * 1024
+JOURNAL_FILE = "journal.json"
+
+# 可断点续做的阶段（按先后顺序）；组装完成即任务成功，日志随之删除
+STAGES = ("extract", "ai", "split", "convert")
+STAGE_NAMES = {"extract": "读取原文", "ai": "AI 排版", "split": "拆分 Markdown", "convert": "转换组件", "warm_up": "预热组装", "build": "组装文档"}
+
+
+def _dir_size(path):
+    total = 0
+    for folder, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(folder, name))
+            except OSError:
+                pass
+    return total
+
+
+class JobJournal:
+    def __init__(self, path, state):
+        self.path = path
+        self.state = state
+
+    @classmethod
+    def create(cls, settings, root=None):
+        """为新任务创建日志（顺带清理过期的旧日志）
+
+        Args:
+            settings: 重建任务所需的设置（input_path、components、mode、导出选项等，须可 JSON 序列化）
+        """
+        root = root or JOURNAL_DIR
+        collect_garbage(root)
+        base = os.path.splitext(os.path.basename(settings.get("input_path", "")))[0][:40] or "job"
+        path = os.path.join(root, f"{time.strftime('%Y%m%d-%H%M%S')}_{base}_{uuid.uuid4().hex[:6]}")
+        os.makedirs(os.path.join(path, "md"))
+        now = time.time()
+        journal = cls(path, {"version": 1, "created": now, "updated": now, "settings": settings, "stages": {}})
+        journal._save()
+        return journal
+
+    @classmethod
+    def load(cls, path):
+        """读取已有日志，日志文件缺失或损坏时返回 None"""
+        try:
+            with open(os.path.join(path, JOURNAL_FILE), "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get("version") != 1 or "settings" not in state:
+            return None
+        return cls(path, state)
+
+    # ---------- 属性 ----------
+    @property
+    def settings(self):
+        return self.state["settings"]
+
+    @property
+    def md_dir(self):
+        """任务的 Markdown / 中间 docx 目录（即 FormatJob.temp_md_dir）"""
+        return os.path.join(self.path, "md")
+
+    def done(self, stage):
+        return stage in self.state["stages"]
+
+    def info(self, stage):
+        return self.state["stages"].get(stage) or {}
+
+    def next_stage(self):
+        """下一个要执行的阶段（全部可续做的阶段都已完成时为 "build"）"""
+        for stage in STAGES:
+            if not self.done(stage):
+                return stage
+        return "build"
+
+    def describe(self):
+        done = [STAGE_NAMES[s] for s in STAGES if self.done(s)]
+        return f"已完成: {'、'.join(done) or '无'}；将从「{STAGE_NAMES[self.next_stage()]}」继续"
+
+    # ---------- 读写 ----------
+    def _save(self):
+        self.state["updated"] = time.time()
+        tmp = os.path.join(self.path, f"{JOURNAL_FILE}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, os.path.join(self.path, JOURNAL_FILE))
+
+    def write_text(self, name, text):
+        tmp = os.path.join(self.path, f"{name}.tmp")
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        os.replace(tmp, os.path.join(self.path, name))
+
+    def read_text(self, name):
+        try:
+            with open(os.path.join(self.path, name), "r", encoding="utf-8", newline="") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def checkpoint(self, stage, **info):
+        """标记阶段完成（产物须已写入日志目录）"""
+        self.state["stages"][stage] = dict(info, at=time.time())
+        self._save()
+
+    def reset_from(self, stage):
+        """从某阶段起作废（如重新请求 AI 时，之后的拆分 / 转换结果都已过时）"""
+        stages = self.state["stages"]
+        for name in STAGES[STAGES.index(stage):]:
+            stages.pop(name, None)
+        self._save()
+
+    def discard(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def list_journals(root=None):
+    """全部可读取的日志，按最后更新时间从新到旧"""
+    root = root or JOURNAL_DIR
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return []
+    journals = [JobJournal.load(os.path.join(root, name)) for name in names]
+    journals = [j for j in journals if j is not None]
+    journals.sort(key=lambda j: j.state.get("updated", 0), reverse=True)
+    return journals
+
+
+def latest(root=None):
+    """最近一个未完成的任务日志（"继续上次任务"），没有时返回 None"""
+    journals = list_journals(root)
+    return journals[0] if journals else None
+
+
+def collect_garbage(root=None, max_age=None, max_bytes=None):
+    """删除超过保留时间的日志，总大小仍超上限时从最旧的开始删除；返回删除的个数"""
+    root = root or JOURNAL_DIR
+    max_age = JOURNAL_MAX_AGE if max_age is None else max_age
+    max_bytes = JOURNAL_MAX_BYTES if max_bytes is None else max_bytes
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return 0
+
+    now = time.time()
+    entries = []
+    for name in names:
+        path = os.path.join(root, name)
+        if not os.path.isdir(path):
+            continue
+        journal = JobJournal.load(path)
+        try:
+            updated = journal.state.get("updated", 0) if journal else os.path.getmtime(path)
+        except OSError:
+            continue
+        entries.append((updated, path))
+
+    removed = 0
+    kept = []
+    for updated, path in sorted(entries):
+        if now - updated > max_age:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+        else:
+            kept.append((path, _dir_size(path)))
+    total = sum(size for _path, size in kept)
+    for path, size in kept:
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
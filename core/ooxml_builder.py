@@ -0,0 +1,708 @@
+"""纯 Python 的 OOXML 组装后端
+
+不依赖 Word：直接在 docx 包（zip + XML）层面把静态资源与 Pandoc 产出的组件
+合并到 reference.docx 母版中，并完成与 Word 后处理等价的样式精修：
+三线表、图片居中、中文(中国)语言校正、目录域刷新标记。
+
+可在 Linux 等无 Office 的环境中无头运行，且无需启动 Word 进程。
+"""
+import copy
+import os
+import posixpath
+import shutil
+import subprocess
+import tempfile
+import zipfile
+
+from lxml import etree
+
+# ================= 命名空间与常量 =================
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+WP_NS = "http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CT_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+
+REL_TYPE_BASE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/"
+REL_OFFICE_DOCUMENT = REL_TYPE_BASE + "officeDocument"
+REL_STYLES = REL_TYPE_BASE + "styles"
+REL_NUMBERING = REL_TYPE_BASE + "numbering"
+REL_SETTINGS = REL_TYPE_BASE + "settings"
+REL_FOOTNOTES = REL_TYPE_BASE + "footnotes"
+REL_ENDNOTES = REL_TYPE_BASE + "endnotes"
+
+CT_MAIN = "application/vnd.openxmlformats-officedocument.wordprocessingml"
+CT_NUMBERING = CT_MAIN + ".numbering+xml"
+CT_FOOTNOTES = CT_MAIN + ".footnotes+xml"
+CT_ENDNOTES = CT_MAIN + ".endnotes+xml"
+
+# 2052 = 中文(中国)，与 Word 后端的 Content.LanguageID 保持一致
+LANG_ZH_CN = "zh-CN"
+
+# 边框宽度（单位：1/8 磅），与 Config.WD_LINE_WIDTH_150PT / 075PT 对应
+BORDER_SZ_150PT = "12"
+BORDER_SZ_075PT = "6"
+
+# OOXML 对子元素顺序有严格要求（顺序错误时 Word 会提示“无法读取的内容”）
+PPR_ORDER = [
+    "pStyle", "keepNext", "keepLines", "pageBreakBefore", "framePr", "widowControl",
+    "numPr", "suppressLineNumbers", "pBdr", "shd", "tabs", "suppressAutoHyphens",
+    "kinsoku", "wordWrap", "overflowPunct", "topLinePunct", "autoSpaceDE", "autoSpaceDN",
+    "bidi", "adjustRightInd", "snapToGrid", "spacing", "ind", "contextualSpacing",
+    "mirrorIndents", "suppressOverlap", "jc", "textDirection", "textAlignment",
+    "textboxTightWrap", "outlineLvl", "divId", "cnfStyle", "rPr", "sectPr", "pPrChange",
+]
+RPR_ORDER = [
+    "rStyle", "rFonts", "b", "bCs", "i", "iCs", "caps", "smallCaps", "strike", "dstrike",
+    "outline", "shadow", "emboss", "imprint", "noProof", "snapToGrid", "vanish",
+    "webHidden", "color", "spacing", "w", "kern", "position", "sz", "szCs", "highlight",
+    "u", "effect", "bdr", "shd", "fitText", "vertAlign", "rtl", "cs", "em", "lang",
+    "eastAsianLayout", "specVanish", "oMath",
+]
+TBLPR_ORDER = [
+    "tblStyle", "tblpPr", "tblOverlap", "bidiVisual", "tblStyleRowBandSize",
+    "tblStyleColBandSize", "tblW", "jc", "tblCellSpacing", "tblInd", "tblBorders", "shd",
+    "tblLayout", "tblCellMar", "tblLook", "tblCaption", "tblDescription",
+]
+TCPR_ORDER = [
+    "cnfStyle", "tcW", "gridSpan", "hMerge", "vMerge", "tcBorders", "shd", "noWrap",
+    "tcMar", "textDirection", "tcFitText", "vAlign", "hideMark",
+]
+BORDERS_ORDER = ["top", "left", "start", "bottom", "right", "end", "insideH", "insideV"]
+SETTINGS_ORDER = [
+    "writeProtection", "view", "zoom", "removePersonalInformation", "removeDateAndTime",
+    "doNotDisplayPageBoundaries", "displayBackgroundShape", "printPostScriptOverText",
+    "printFractionalCharacterWidth", "printFormsData", "embedTrueTypeFonts",
+    "embedSystemFonts", "saveSubsetFonts", "saveFormsData", "mirrorMargins",
+    "alignBordersAndEdges", "bordersDoNotSurroundHeader", "bordersDoNotSurroundFooter",
+    "gutterAtTop", "hideSpellingErrors", "hideGrammaticalErrors", "activeWritingStyle",
+    "proofState", "formsDesign", "attachedTemplate", "linkStyles",
+    "stylePaneFormatFilter", "stylePaneSortMethod", "documentType", "mailMerge",
+    "revisionView", "trackRevisions", "doNotTrackMoves", "doNotTrackFormatting",
+    "documentProtection", "autoFormatOverride", "styleLockTheme", "styleLockQFSet",
+    "defaultTabStop", "autoHyphenation", "consecutiveHyphenLimit", "hyphenationZone",
+    "doNotHyphenateCaps", "showEnvelope", "summaryLength", "clickAndTypeStyle",
+    "defaultTableStyle", "evenAndOddHeaders", "bookFoldRevPrinting", "bookFoldPrinting",
+    "bookFoldPrintingSheets", "drawingGridHorizontalSpacing",
+    "drawingGridVerticalSpacing", "displayHorizontalDrawingGridEvery",
+    "displayVerticalDrawingGridEvery", "doNotUseMarginsForDrawingGridOrigin",
+    "drawingGridHorizontalOrigin", "drawingGridVerticalOrigin", "doNotShadeFormData",
+    "noPunctuationKerning", "characterSpacingControl", "printTwoOnOne",
+    "strictFirstAndLastChars", "noLineBreaksAfter", "noLineBreaksBefore",
+    "savePreviewPicture", "doNotValidateAgainstSchema", "saveInvalidXml",
+    "ignoreMixedContent", "alwaysShowPlaceholderText", "doNotDemarcateInvalidXml",
+    "saveXmlDataOnly", "useXSLTWhenSaving", "saveThroughXslt", "showXMLTags",
+    "alwaysMergeEmptyNamespace", "updateFields", "hdrShapeDefaults", "footnotePr",
+    "endnotePr", "compat", "docVars", "rsids", "mathPr", "attachedSchema",
+    "themeFontLang", "clrSchemeMapping", "doNotIncludeSubdocsInStats",
+    "doNotAutoCompressPictures", "forceUpgrade", "captions", "readModeInkLockDown",
+    "smartTagType", "schemaLibrary", "shapeDefaults", "doNotEmbedSmartTags",
+    "decimalSymbol", "listSeparator",
+]
+
+_PARSER = etree.XMLParser(huge_tree=True)
+
+
+def w(tag):
+    """生成 w: 命名空间下的限定名"""
+    return f"{{{W_NS}}}{tag}"
+
+
+def _local(tag):
+    if not isinstance(tag, str):
+        return None
+    return tag.rsplit("}", 1)[-1]
+
+
+def _child(parent, tag, order=None):
+    """获取子元素，不存在时按 schema 顺序创建"""
+    node = parent.find(w(tag))
+    if node is None:
+        node = etree.Element(w(tag))
+        _insert_ordered(parent, node, order)
+    return node
+
+
+def _insert_ordered(parent, node, order=None):
+    """按 schema 规定的顺序插入子元素（未知元素保持原位）"""
+    if not order or _local(node.tag) not in order:
+        parent.append(node)
+        return
+    rank = order.index(_local(node.tag))
+    for idx, existing in enumerate(parent):
+        name = _local(existing.tag)
+        if name in order and order.index(name) > rank:
+            parent.insert(idx, node)
+            return
+    parent.append(node)
+
+
+def _set_border(borders, side, style, size=None, color="000000"):
+    node = _child(borders, side, BORDERS_ORDER)
+    node.attrib.clear()
+    node.set(w("val"), style)
+    if style not in ("nil", "none"):
+        node.set(w("sz"), size)
+        node.set(w("space"), "0")
+        node.set(w("color"), color)
+
+
+def _clear_indent(ppr, keep_left=True):
+    """首行缩进清零（含字符单位缩进），可选清除左缩进"""
+    ind = _child(ppr, "ind", PPR_ORDER)
+    for attr in ("hanging", "hangingChars"):
+        ind.attrib.pop(w(attr), None)
+    ind.set(w("firstLine"), "0")
+    ind.set(w("firstLineChars"), "0")
+    if not keep_left:
+        ind.set(w("left"), "0")
+        ind.set(w("leftChars"), "0")
+        for attr in ("start", "startChars"):
+            if ind.get(w(attr)) is not None:
+                ind.set(w(attr), "0")
+
+
+def _serialize(root):
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+
+# ================= docx 包读写 =================
+class DocxPackage:
+    """加载到内存的 docx（OPC）包，XML 部件按需解析并缓存"""
+
+    def __init__(self, path):
+        self.path = path
+        with zipfile.ZipFile(path) as zf:
+            self.parts = {name: zf.read(name) for name in zf.namelist() if not name.endswith("/")}
+        self._xml = {}
+
+    # ---------- 部件访问 ----------
+    def has(self, name):
+        return name in self.parts or name in self._xml
+
+    def xml(self, name):
+        if name not in self._xml:
+            self._xml[name] = etree.fromstring(self.parts[name], _PARSER)
+        return self._xml[name]
+
+    def set_xml(self, name, root):
+        self._xml[name] = root
+        self.parts[name] = b""
+
+    def read(self, name):
+        if name in self._xml:
+            return _serialize(self._xml[name])
+        return self.parts[name]
+
+    def write_bytes(self, name, data):
+        self._xml.pop(name, None)
+        self.parts[name] = data
+
+    def names(self):
+        return set(self.parts) | set(self._xml)
+
+    # ---------- 关系 ----------
+    @staticmethod
+    def rels_name(part):
+        folder, base = posixpath.split(part)
+        return posixpath.join(folder, "_rels", f"{base}.rels")
+
+    def rels(self, part, create=False):
+        name = self.rels_name(part)
+        if not self.has(name):
+            if not create:
+                return None
+            self.set_xml(name, etree.Element(f"{{{PKG_REL_NS}}}Relationships", nsmap={None: PKG_REL_NS}))
+        return self.xml(name)
+
+    @staticmethod
+    def resolve_target(part, target):
+        if target.startswith("/"):
+            return target.lstrip("/")
+        return posixpath.normpath(posixpath.join(posixpath.dirname(part), target))
+
+    def related_part(self, part, rel_type):
+        """按关系类型查找关联部件名（如 styles / numbering）"""
+        rels = self.rels(part)
+        if rels is None:
+            return None
+        for rel in rels:
+            if rel.get("Type") == rel_type and rel.get("TargetMode") != "External":
+                return self.resolve_target(part, rel.get("Target"))
+        return None
+
+    def main_part(self):
+        return self.related_part("", REL_OFFICE_DOCUMENT) or "word/document.xml"
+
+    def add_rel(self, part, rel_type, target, external=False):
+        rels = self.rels(part, create=True)
+        used = {rel.get("Id") for rel in rels}
+        n = len(used) + 1
+        while f"rId{n}" in used:
+            n += 1
+        rel = etree.SubElement(rels, f"{{{PKG_REL_NS}}}Relationship")
+        rel.set("Id", f"rId{n}")
+        rel.set("Type", rel_type)
+        rel.set("Target", target)
+        if external:
+            rel.set("TargetMode", "External")
+        return f"rId{n}"
+
+    # ---------- Content Types ----------
+    def content_type(self, part):
+        types = self.xml("[Content_Types].xml")
+        for node in types.iter(f"{{{CT_NS}}}Override"):
+            if node.get("PartName") == "/" + part:
+                return node.get("ContentType")
+        ext = posixpath.splitext(part)[1].lstrip(".").lower()
+        for node in types.iter(f"{{{CT_NS}}}Default"):
+            if node.get("Extension", "").lower() == ext:
+                return node.get("ContentType")
+        return None
+
+    def ensure_content_type(self, part, content_type, source_default=False):
+        """登记部件的 Content Type：源包用扩展名默认值的，目标也尽量走 Default"""
+        if not content_type or self.content_type(part) == content_type:
+            return
+        types = self.xml("[Content_Types].xml")
+        ext = posixpath.splitext(part)[1].lstrip(".").lower()
+        has_default = any(
+            n.get("Extension", "").lower() == ext for n in types.iter(f"{{{CT_NS}}}Default")
+        )
+        if source_default and ext and not has_default:
+            node = etree.Element(f"{{{CT_NS}}}Default")
+            node.set("Extension", ext)
+            node.set("ContentType", content_type)
+            types.insert(0, node)
+            return
+        node = etree.SubElement(types, f"{{{CT_NS}}}Override")
+        node.set("PartName", "/" + part)
+        node.set("ContentType", content_type)
+
+    def is_default_type(self, part):
+        types = self.xml("[Content_Types].xml")
+        return not any(n.get("PartName") == "/" + part for n in types.iter(f"{{{CT_NS}}}Override"))
+
+    def unique_name(self, name):
+        if not self.has(name):
+            return name
+        folder, base = posixpath.split(name)
+        stem, ext = posixpath.splitext(base)
+        stem = stem.rstrip("0123456789") or stem
+        n = 1
+        while True:
+            candidate = posixpath.join(folder, f"{stem}{n}{ext}")
+            if not self.has(candidate):
+                return candidate
+            n += 1
+
+    def save(self, path):
+        names = self.names()
+        order = ["[Content_Types].xml"] + sorted(n for n in names if n != "[Content_Types].xml")
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name in order:
+                zf.writestr(name, self.read(name))
+
+
+# ================= 文档组装 =================
+class OoxmlDocument:
+    """以 reference.docx 为母版的新文档，等价于 Documents.Add(Template=REF_DOC)"""
+
+    def __init__(self, template_path):
+        self.pkg = DocxPackage(template_path)
+        self.main = self.pkg.main_part()
+        self.root = self.pkg.xml(self.main)
+        self.body = self.root.find(w("body"))
+
+        # 等价于 new_doc.Content.Delete()：只保留末尾的节属性
+        self.final_sect = None
+        for node in list(self.body):
+            if node.tag == w("sectPr"):
+                self.final_sect = node
+            else:
+                self.body.remove(node)
+
+        self._next_docpr_id = 1
+        self._next_bookmark_id = 1
+
+    # ---------- 插入 ----------
+    def _append_block(self, node):
+        if self.final_sect is not None:
+            self.final_sect.addprevious(node)
+        else:
+            self.body.append(node)
+
+    def append_page_break(self):
+        p = etree.Element(w("p"))
+        r = etree.SubElement(p, w("r"))
+        br = etree.SubElement(r, w("br"))
+        br.set(w("type"), "page")
+        self._append_block(p)
+
+    def append_file(self, path):
+        """等价于 Selection.InsertFile：合并样式/编号/脚注/关系后追加正文"""
+        src = DocxPackage(path)
+        src_main = src.main_part()
+        src_body = src.xml(src_main).find(w("body"))
+
+        blocks = [copy.deepcopy(n) for n in src_body if n.tag != w("sectPr")]
+        if not blocks:
+            return
+
+        num_map = self._merge_numbering(src, src_main)
+        self._merge_styles(src, src_main, num_map)
+
+        part_cache = {}
+        for node in blocks:
+            self._remap_numbering(node, num_map)
+            self._remap_relationships(src, src_main, self.main, node, part_cache)
+            self._remap_notes(src, src_main, node, part_cache)
+            self._renumber_ids(node)
+            self._append_block(node)
+
+    # ---------- 关系与部件复制 ----------
+    def _remap_relationships(self, src, src_part, dst_part, node, part_cache):
+        """复制节点引用的 r:id/r:embed 等关系（图片、超链接、页眉页脚…）"""
+        src_rels = src.rels(src_part)
+        if src_rels is None:
+            return
+        rel_by_id = {rel.get("Id"): rel for rel in src_rels}
+        id_map = {}
+        for el in node.iter():
+            for attr, value in list(el.attrib.items()):
+                if not attr.startswith(f"{{{R_NS}}}") or value not in rel_by_id:
+                    continue
+                if value not in id_map:
+                    rel = rel_by_id[value]
+                    if rel.get("TargetMode") == "External":
+                        id_map[value] = self.pkg.add_rel(
+                            dst_part, rel.get("Type"), rel.get("Target"), external=True
+                        )
+                    else:
+                        target = src.resolve_target(src_part, rel.get("Target"))
+                        new_part = self._copy_part(src, target, part_cache)
+                        rel_target = posixpath.relpath(new_part, posixpath.dirname(dst_part))
+                        id_map[value] = self.pkg.add_rel(dst_part, rel.get("Type"), rel_target)
+                el.set(attr, id_map[value])
+
+    def _copy_part(self, src, part, part_cache):
+        if part in part_cache:
+            return part_cache[part]
+        new_part = self.pkg.unique_name(part)
+        part_cache[part] = new_part
+        self.pkg.write_bytes(new_part, src.read(part))
+        self.pkg.ensure_content_type(
+            new_part, src.content_type(part), source_default=src.is_default_type(part)
+        )
+
+        # 部件自身的关系（如页眉中的图片）递归复制
+        src_rels = src.rels(part)
+        if src_rels is not None and len(src_rels):
+            if new_part.endswith(".xml"):
+                root = etree.fromstring(src.read(part), _PARSER)
+                self._remap_relationships(src, part, new_part, root, part_cache)
+                self.pkg.set_xml(new_part, root)
+            else:
+                for rel in src_rels:
+                    self.pkg.add_rel(new_part, rel.get("Type"), rel.get("Target"),
+                                     external=rel.get("TargetMode") == "External")
+        return new_part
+
+    # ---------- 样式 ----------
+    def _merge_styles(self, src, src_main, num_map):
+        """目标中已存在的样式优先（与 Word 插入文件时的行为一致），仅补充缺失样式"""
+        src_styles_part = src.related_part(src_main, REL_STYLES)
+        dst_styles_part = self.pkg.related_part(self.main, REL_STYLES)
+        if not src_styles_part or not dst_styles_part:
+            return
+        dst_styles = self.pkg.xml(dst_styles_part)
+        existing = {s.get(w("styleId")) for s in dst_styles.iter(w("style"))}
+        for style in src.xml(src_styles_part).iter(w("style")):
+            if style.get(w("styleId")) in existing:
+                continue
+            copied = copy.deepcopy(style)
+            self._remap_numbering(copied, num_map)
+            dst_styles.append(copied)
+            existing.add(style.get(w("styleId")))
+
+    # ---------- 编号（列表） ----------
+    def _merge_numbering(self, src, src_main):
+        src_part = src.related_part(src_main, REL_NUMBERING)
+        if not src_part:
+            return {}
+        src_root = src.xml(src_part)
+        if src_root.find(w("num")) is None:
+            return {}
+
+        dst_part = self.pkg.related_part(self.main, REL_NUMBERING)
+        if not dst_part:
+            dst_part = posixpath.join(posixpath.dirname(self.main), "numbering.xml")
+            dst_part = self.pkg.unique_name(dst_part)
+            self.pkg.set_xml(dst_part, etree.Element(w("numbering"), nsmap={"w": W_NS}))
+            self.pkg.add_rel(self.main, REL_NUMBERING, posixpath.basename(dst_part))
+            self.pkg.ensure_content_type(dst_part, CT_NUMBERING)
+        dst_root = self.pkg.xml(dst_part)
+
+        def _max_id(tag, attr):
+            ids = [int(n.get(w(attr))) for n in dst_root.iter(w(tag)) if (n.get(w(attr)) or "").isdigit()]
+            return max(ids, default=0)
+
+        next_abs = _max_id("abstractNum", "abstractNumId") + 1
+        next_num = _max_id("num", "numId") + 1
+
+        abs_map = {}
+        last_abs = None
+        for abs_num in dst_root.iter(w("abstractNum")):
+            last_abs = abs_num
+        for abs_num in src_root.findall(w("abstractNum")):
+            copied = copy.deepcopy(abs_num)
+            abs_map[abs_num.get(w("abstractNumId"))] = str(next_abs)
+            copied.set(w("abstractNumId"), str(next_abs))
+            nsid = copied.find(w("nsid"))
+            if nsid is not None:
+                nsid.set(w("val"), f"{0x5C000000 + next_abs:08X}")
+            next_abs += 1
+            # abstractNum 必须整体位于 num 之前
+            if last_abs is not None:
+                last_abs.addnext(copied)
+            else:
+                first_num = dst_root.find(w("num"))
+                if first_num is not None:
+                    first_num.addprevious(copied)
+                else:
+                    dst_root.append(copied)
+            last_abs = copied
+
+        num_map = {}
+        for num in src_root.findall(w("num")):
+            copied = copy.deepcopy(num)
+            num_map[num.get(w("numId"))] = str(next_num)
+            copied.set(w("numId"), str(next_num))
+            abs_ref = copied.find(w("abstractNumId"))
+            if abs_ref is not None:
+                abs_ref.set(w("val"), abs_map.get(abs_ref.get(w("val")), abs_ref.get(w("val"))))
+            next_num += 1
+            dst_root.append(copied)
+        return num_map
+
+    @staticmethod
+    def _remap_numbering(node, num_map):
+        if not num_map:
+            return
+        for num_id in node.iter(w("numId")):
+            val = num_id.get(w("val"))
+            if val in num_map:
+                num_id.set(w("val"), num_map[val])
+
+    # ---------- 脚注 / 尾注 ----------
+    def _remap_notes(self, src, src_main, node, part_cache):
+        for kind, rel_type, content_type in (
+            ("footnote", REL_FOOTNOTES, CT_FOOTNOTES),
+            ("endnote", REL_ENDNOTES, CT_ENDNOTES),
+        ):
+            refs = list(node.iter(w(f"{kind}Reference")))
+            if not refs:
+                continue
+            src_part = src.related_part(src_main, rel_type)
+            if not src_part:
+                continue
+            src_notes = {n.get(w("id")): n for n in src.xml(src_part).iter(w(kind))}
+
+            dst_part = self.pkg.related_part(self.main, rel_type)
+            if not dst_part:
+                dst_part = self.pkg.unique_name(
+                    posixpath.join(posixpath.dirname(self.main), posixpath.basename(src_part))
+                )
+                root = etree.Element(w(f"{kind}s"), nsmap={"w": W_NS})
+                for note in src_notes.values():
+                    if note.get(w("type")) in ("separator", "continuationSeparator"):
+                        root.append(copy.deepcopy(note))
+                self.pkg.set_xml(dst_part, root)
+                self.pkg.add_rel(self.main, rel_type, posixpath.basename(dst_part))
+                self.pkg.ensure_content_type(dst_part, content_type)
+            dst_root = self.pkg.xml(dst_part)
+            next_id = max((int(n.get(w("id"))) for n in dst_root.iter(w(kind))), default=0) + 1
+
+            for ref in refs:
+                note = src_notes.get(ref.get(w("id")))
+                if note is None:
+                    continue
+                copied = copy.deepcopy(note)
+                copied.set(w("id"), str(next_id))
+                ref.set(w("id"), str(next_id))
+                next_id += 1
+                self._remap_relationships(src, src_part, dst_part, copied, part_cache)
+                dst_root.append(copied)
+
+    # ---------- ID 去重 ----------
+    def _renumber_ids(self, node):
+        """图片 docPr id 与书签 id 在整篇文档内必须唯一"""
+        for doc_pr in node.iter(f"{{{WP_NS}}}docPr"):
+            doc_pr.set("id", str(self._next_docpr_id))
+            self._next_docpr_id += 1
+
+        bookmark_map = {}
+        for el in node.iter(w("bookmarkStart"), w("bookmarkEnd")):
+            old = el.get(w("id"))
+            if old not in bookmark_map:
+                bookmark_map[old] = str(self._next_bookmark_id)
+                self._next_bookmark_id += 1
+            el.set(w("id"), bookmark_map[old])
+
+    # ---------- 后处理 ----------
+    def update_toc(self):
+        """无 Word 时无法计算页码：标记域需刷新，打开文档时由 Word 更新目录"""
+        has_toc = any(
+            "TOC" in (node.text or "") for node in self.body.iter(w("instrText"))
+        ) or any(
+            "TOC" in (node.get(w("instr")) or "") for node in self.body.iter(w("fldSimple"))
+        )
+        if not has_toc:
+            return False
+        settings = self._settings()
+        if settings is not None:
+            _child(settings, "updateFields", SETTINGS_ORDER).set(w("val"), "true")
+        return True
+
+    def _settings(self):
+        part = self.pkg.related_part(self.main, REL_SETTINGS)
+        return self.pkg.xml(part) if part else None
+
+    def process_styles(self):
+        """样式后处理：图片居中 & 三线表 & 语言修正（与 Word 后端一致）"""
+        self._fix_language()
+        self._center_images()
+        for tbl in self._top_level_tables():
+            self._three_line_table(tbl)
+
+    def _fix_language(self):
+        styles_part = self.pkg.related_part(self.main, REL_STYLES)
+        if styles_part:
+            styles = self.pkg.xml(styles_part)
+            doc_defaults = _child(styles, "docDefaults")
+            if styles.index(doc_defaults) != 0:
+                styles.remove(doc_defaults)
+                styles.insert(0, doc_defaults)
+            rpr = _child(_child(doc_defaults, "rPrDefault"), "rPr")
+            _child(rpr, "lang", RPR_ORDER).set(w("val"), LANG_ZH_CN)
+            rpr.find(w("lang")).set(w("eastAsia"), LANG_ZH_CN)
+            for lang in styles.iter(w("lang")):
+                self._set_lang(lang)
+
+        for lang in self.body.iter(w("lang")):
+            self._set_lang(lang)
+
+        # 关闭拼写/语法错误的波浪线显示
+        settings = self._settings()
+        if settings is not None:
+            _child(settings, "hideSpellingErrors", SETTINGS_ORDER)
+            _child(settings, "hideGrammaticalErrors", SETTINGS_ORDER)
+
+    @staticmethod
+    def _set_lang(lang):
+        lang.set(w("val"), LANG_ZH_CN)
+        if lang.get(w("eastAsia")) is not None:
+            lang.set(w("eastAsia"), LANG_ZH_CN)
+
+    def _center_images(self):
+        for p in self.body.iter(w("p")):
+            if next(p.iter(f"{{{WP_NS}}}inline"), None) is None:
+                continue
+            ppr = p.find(w("pPr"))
+            if ppr is None:
+                ppr = etree.Element(w("pPr"))
+                p.insert(0, ppr)
+            _child(ppr, "jc", PPR_ORDER).set(w("val"), "center")
+            _clear_indent(ppr)
+
+    def _top_level_tables(self):
+        return [t for t in self.body.iter(w("tbl")) if next(t.iterancestors(w("tc")), None) is None]
+
+    def _three_line_table(self, tbl):
+        tbl_pr = tbl.find(w("tblPr"))
+        if tbl_pr is None:
+            tbl_pr = etree.Element(w("tblPr"))
+            tbl.insert(0, tbl_pr)
+
+        # 边框清除与重设：仅保留上下 1.5 磅粗线
+        old = tbl_pr.find(w("tblBorders"))
+        if old is not None:
+            tbl_pr.remove(old)
+        borders = _child(tbl_pr, "tblBorders", TBLPR_ORDER)
+        _set_border(borders, "top", "single", BORDER_SZ_150PT)
+        _set_border(borders, "left", "nil")
+        _set_border(borders, "bottom", "single", BORDER_SZ_150PT)
+        _set_border(borders, "right", "nil")
+        _set_border(borders, "insideH", "nil")
+        _set_border(borders, "insideV", "nil")
+
+        rows = tbl.findall(w("tr"))
+        for tr in rows:
+            for tc_pr in tr.iter(w("tcPr")):
+                cell_borders = tc_pr.find(w("tcBorders"))
+                if cell_borders is not None:
+                    tc_pr.remove(cell_borders)
+
+        # 表头下方 0.75 磅细线
+        if len(rows) > 1:
+            for tc in rows[0].findall(w("tc")):
+                tc_pr = tc.find(w("tcPr"))
+                if tc_pr is None:
+                    tc_pr = etree.Element(w("tcPr"))
+                    tc.insert(0, tc_pr)
+                cell_borders = _child(tc_pr, "tcBorders", TCPR_ORDER)
+                _set_border(cell_borders, "bottom", "single", BORDER_SZ_075PT)
+
+        # 对齐修正：段落无缩进居中、表格居中、自适应窗口宽度
+        for p in tbl.iter(w("p")):
+            ppr = p.find(w("pPr"))
+            if ppr is None:
+                ppr = etree.Element(w("pPr"))
+                p.insert(0, ppr)
+            _clear_indent(ppr, keep_left=False)
+            _child(ppr, "jc", PPR_ORDER).set(w("val"), "center")
+
+        _child(tbl_pr, "jc", TBLPR_ORDER).set(w("val"), "center")
+        ind = tbl_pr.find(w("tblInd"))
+        if ind is not None:
+            tbl_pr.remove(ind)
+        tbl_w = _child(tbl_pr, "tblW", TBLPR_ORDER)
+        tbl_w.attrib.clear()
+        tbl_w.set(w("w"), "5000")
+        tbl_w.set(w("type"), "pct")
+        _child(tbl_pr, "tblLayout", TBLPR_ORDER).set(w("type"), "autofit")
+
+    # ---------- 保存 ----------
+    def save(self, path):
+        if not any(node.tag != w("sectPr") for node in self.body):
+            self._append_block(etree.Element(w("p")))
+        self.pkg.save(path)
+
+
+def find_office_converter():
+    """查找可用于 docx -> pdf 的 LibreOffice 可执行文件"""
+    for name in ("soffice", "libreoffice"):
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+
+def export_pdf(docx_path, pdf_path):
+    """无 Word 环境下借助 LibreOffice 无头导出 PDF"""
+    converter = find_office_converter()
+    if not converter:
+        raise RuntimeError("未找到 LibreOffice (soffice)，无法在无 Word 环境下导出 PDF")
+
+    out_dir = tempfile.mkdtemp(prefix="autoformatter_pdf_")
+    try:
+        subprocess.run(
+            [converter, "--headless", "--convert-to", "pdf", "--outdir", out_dir, docx_path],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        produced = os.path.join(out_dir, os.path.splitext(os.path.basename(docx_path))[0] + ".pdf")
+        shutil.move(produced, pdf_path)
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
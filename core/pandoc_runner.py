@@ -0,0 +1,401 @@
+"""Pandoc 调用层
+
+每次转换都通过 shell 启动一个 pandoc 进程，要重复付出 Haskell 运行时启动与 shell 的开销。
+这里优先使用常驻的本地 `pandoc server`（Pandoc >= 3.0，HTTP + JSON 接口），
+所有转换请求都发给同一个进程；server 不可用（旧版本、启动失败、请求出错）时自动回退到命令行。
+
+    runner = get_default_runner()
+    runner.convert("a.md", "docx", output_path="a.docx", options={"reference-doc": "reference.docx"})
+    text = runner.convert("a.docx", "plain", options={"wrap": "none"})
+
+注意：pandoc server 不读写本地文件系统，reference-doc、Markdown 中引用的本地图片
+都需随请求以 base64 一并发送（见 PandocRunner._server_request）；reference-doc 这类每次都要发送的文件
+编码一次后按修改时间缓存，warm_up() 可在转换开始前提前启动 server 并完成编码。
+
+convert() 可传入 cancel（core.cancel.CancelToken）：被取消时命令行模式直接结束 pandoc 进程，
+server 模式关闭本次请求的连接（常驻 server 由多个任务共用，不结束进程，其 --timeout 会回收该请求），
+随后抛出 Cancelled，不再回退到命令行重试。
+"""
+import atexit
+import base64
+import http.client
+import json
+import os
+import re
+import socket
+import subprocess
+import threading
+import time
+
+from .cancel import Cancelled, watching
+
+# 扩展名 -> Pandoc 输入格式（server 模式必须显式指定 from）
+INPUT_FORMATS = {
+    ".md": "markdown",
+    ".markdown": "markdown",
+    ".txt": "markdown",
+    ".docx": "docx",
+    ".odt": "odt",
+    ".epub": "epub",
+    ".html": "html",
+    ".htm": "html",
+    ".rst": "rst",
+    ".tex": "latex",
+}
+# 二进制格式：输入需 base64 编码，输出以 base64 返回
+BINARY_FORMATS = {"docx", "odt", "epub", "pptx"}
+# 取值为文件路径的选项，server 模式下随请求发送文件内容
+FILE_OPTIONS = {"reference-doc"}
+
+_IMAGE_REF = re.compile(r"!\[[^\]]*\]\(\s*<?([^)\s>]+)")
+
+# Windows 下启动子进程时不弹出控制台窗口
+_NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+
+class PandocError(RuntimeError):
+    """Pandoc 转换失败"""
+
+
+class PandocServer:
+    """本机常驻的 `pandoc server` 进程"""
+
+    def __init__(self, executable="pandoc", port=None, start_timeout=10, request_timeout=120):
+        """
+        Args:
+            executable: pandoc 可执行文件
+            port: 监听端口，默认自动选择空闲端口
+            start_timeout: 等待 server 就绪的秒数
+            request_timeout: 单次转换的超时（秒），同时作为 server 端的 --timeout
+        """
+        self.executable = executable
+        self.port = port
+        self.start_timeout = start_timeout
+        self.request_timeout = request_timeout
+        self.proc = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}/"
+
+    @property
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def start(self):
+        """启动 server 并等待健康检查通过，失败时抛出 PandocError"""
+        if self.port is None:
+            with socket.socket() as s:
+                s.bind(("127.0.0.1", 0))
+                self.port = s.getsockname()[1]
+
+        try:
+            self.proc = subprocess.Popen(
+                [self.executable, "server", "--port", str(self.port), "--timeout", str(int(self.request_timeout))],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                creationflags=_NO_WINDOW,
+            )
+        except OSError as e:
+            raise PandocError(f"无法启动 pandoc server: {e}") from e
+
+        deadline = time.monotonic() + self.start_timeout
+        last_error = None
+        while time.monotonic() < deadline:
+            if not self.alive:
+                break
+            try:
+                # 用一次真实的小转换做健康检查（部分构建版本能监听端口，但处理请求时崩溃）
+                if self.request({"text": "ok", "from": "markdown", "to": "plain"}, timeout=2).strip() == "ok":
+                    return self
+                last_error = "健康检查输出不符"
+                break
+            except ConnectionRefusedError as e:
+                # 连接被拒绝说明还在启动，继续等待；其他错误说明已监听但无法处理请求
+                last_error = e
+            except (OSError, http.client.HTTPException, PandocError) as e:
+                last_error = e
+                break
+            time.sleep(0.05)
+
+        self.stop()
+        raise PandocError(f"pandoc server 未就绪: {last_error or '进程已退出'}")
+
+    def request(self, payload, timeout=None, cancel=None):
+        """发送一次转换请求，返回 output 字段（二进制输出时为 base64 字符串）
+
+        Args:
+            cancel: CancelToken，等待期间被取消时关闭连接并抛出 Cancelled
+        """
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=timeout or self.request_timeout)
+
+        def abort():
+            sock = conn.sock
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+        try:
+            with watching(cancel, abort):
+                conn.request(
+                    "POST", "/", body=json.dumps(payload).encode("utf-8"),
+                    headers={"Content-Type": "application/json", "Accept": "application/json"},
+                )
+                resp = conn.getresponse()
+                status = resp.status
+                body = resp.read().decode("utf-8", errors="replace")
+        except (OSError, http.client.HTTPException) as e:
+            if cancel is not None and cancel.is_set():
+                raise Cancelled("Pandoc 转换已取消") from e
+            raise
+        finally:
+            conn.close()
+        if status >= 400:
+            raise PandocError(f"HTTP {status}: {body.strip()}")
+
+        try:
+            result = json.loads(body)
+        except ValueError:
+            # 转换出错时 server 可能直接返回纯文本错误信息
+            raise PandocError(body.strip()) from None
+        if isinstance(result, dict) and result.get("error"):
+            raise PandocError(result["error"])
+        return result["output"]
+
+    def stop(self):
+        proc, self.proc = self.proc, None
+        if proc is None or proc.poll() is not None:
+            return
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+class PandocRunner:
+    def __init__(self, executable="pandoc", use_server=True, server_factory=PandocServer):
+        """
+        Args:
+            executable: pandoc 可执行文件
+            use_server: 是否优先使用常驻 pandoc server（首次转换时才启动）
+            server_factory: 创建 PandocServer 的可调用对象
+        """
+        self.executable = executable
+        self.use_server = use_server
+        self.server_factory = server_factory
+        self.server = None
+        self._server_failed = False
+        self._lock = threading.Lock()
+        self.counters = {"server": 0, "cli": 0, "fallback": 0}
+        # 随每次 server 请求发送的文件（如 reference.docx）：路径 -> ((大小, 修改时间), base64 内容)
+        self._encoded = {}
+
+    # ---------- server 生命周期 ----------
+    def _get_server(self):
+        if not self.use_server or self._server_failed:
+            return None
+        with self._lock:
+            if self.server is not None and self.server.alive:
+                return self.server
+            try:
+                self.server = self.server_factory(self.executable).start()
+                return self.server
+            except PandocError as e:
+                # 只尝试一次，之后直接走命令行，避免每次转换都等待启动超时
+                print(f"[Warning] pandoc server 不可用，改用命令行模式: {e}")
+                self._server_failed = True
+                self.server = None
+                return None
+
+    def shutdown(self):
+        with self._lock:
+            if self.server is not None:
+                self.server.stop()
+                self.server = None
+
+    @property
+    def mode(self):
+        server = self._get_server()
+        return "server" if server is not None else "cli"
+
+    def warm_up(self, files=()):
+        """提前启动 pandoc server，并预先编码之后每次请求都要随附的文件（如 reference.docx）
+
+        Returns:
+            "server" 或 "cli"
+        """
+        server = self._get_server()
+        if server is None:
+            return "cli"
+        for path in files:
+            self._encoded_file(path)
+        return "server"
+
+    def _encoded_file(self, path):
+        """文件的 base64 内容（按大小与修改时间缓存，文件变化后重新读取）"""
+        st = os.stat(path)
+        stamp = (st.st_size, st.st_mtime_ns)
+        with self._lock:
+            hit = self._encoded.get(path)
+        if hit is not None and hit[0] == stamp:
+            return hit[1]
+        with open(path, "rb") as f:
+            data = base64.b64encode(f.read()).decode("ascii")
+        with self._lock:
+            self._encoded[path] = (stamp, data)
+        return data
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    # ---------- 转换 ----------
+    def convert(self, input_path, to, output_path=None, from_=None, options=None, cancel=None):
+        """转换一个文件
+
+        Args:
+            input_path: 输入文件
+            to: 输出格式（如 "docx" / "plain"）
+            output_path: 输出文件；为 None 时以字符串返回转换结果（仅文本格式）
+            from_: 输入格式，默认按扩展名推断
+            options: 其他选项，键为命令行长参数名，如 {"reference-doc": "...", "wrap": "none"}
+            cancel: CancelToken，被取消时中止转换并抛出 Cancelled
+        Returns:
+            output_path 或转换出的文本
+        """
+        if cancel is not None:
+            cancel.check()
+        if not os.path.exists(input_path):
+            raise PandocError(f"输入文件不存在: {input_path}")
+        options = dict(options or {})
+        from_ = from_ or INPUT_FORMATS.get(os.path.splitext(input_path)[1].lower())
+
+        server = self._get_server() if from_ else None
+        if server is not None:
+            try:
+                result = self._server_request(server, input_path, from_, to, output_path, options, cancel)
+                self._count("server")
+                return result
+            except Cancelled:
+                raise
+            except (OSError, http.client.HTTPException, PandocError) as e:
+                if not server.alive:
+                    self._server_failed = True
+                print(f"[Warning] pandoc server 转换失败，改用命令行重试: {e}")
+                self._count("fallback")
+
+        result = self._cli(input_path, from_, to, output_path, options, cancel)
+        self._count("cli")
+        return result
+
+    def _server_request(self, server, input_path, from_, to, output_path, options, cancel=None):
+        with open(input_path, "rb") as f:
+            data = f.read()
+
+        payload = {"from": from_, "to": to}
+        files = {}
+        if from_ in BINARY_FORMATS:
+            payload["text"] = base64.b64encode(data).decode("ascii")
+        else:
+            try:
+                payload["text"] = data.decode("utf-8")
+            except UnicodeDecodeError as e:
+                # 交给命令行版 pandoc 处理（它会给出具体的编码错误）
+                raise PandocError(f"输入不是 UTF-8 文本: {e}") from e
+            files.update(_local_images(payload["text"], input_path))
+
+        for key, value in options.items():
+            if key in FILE_OPTIONS:
+                name = os.path.basename(value)
+                files[name] = self._encoded_file(value)
+                value = name
+            payload[key] = value
+        if files:
+            payload["files"] = files
+
+        output = server.request(payload, cancel=cancel)
+        if to in BINARY_FORMATS:
+            try:
+                content = base64.b64decode(output)
+            except ValueError as e:  # binascii.Error
+                raise PandocError(f"pandoc server 返回的内容无法解码: {e}") from e
+        else:
+            content = output.encode("utf-8")
+
+        if output_path is None:
+            return content.decode("utf-8")
+        with open(output_path, "wb") as f:
+            f.write(content)
+        return output_path
+
+    def _cli(self, input_path, from_, to, output_path, options, cancel=None):
+        cmd = [self.executable, input_path, "-t", to]
+        if from_:
+            cmd += ["-f", from_]
+        cmd += [f"--{key}={value}" for key, value in options.items()]
+        if output_path is not None:
+            cmd += ["-o", output_path]
+
+        try:
+            proc = subprocess.Popen(
+                cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                creationflags=_NO_WINDOW,
+            )
+        except OSError as e:
+            raise PandocError(f"无法运行 pandoc（是否已安装？）: {e}") from e
+        # 被取消时从取消线程结束进程，communicate() 随即返回
+        with watching(cancel, proc.kill):
+            stdout, stderr = proc.communicate()
+        if cancel is not None and cancel.is_set():
+            raise Cancelled("Pandoc 转换已取消")
+        if proc.returncode != 0:
+            raise PandocError(stderr.decode("utf-8", errors="replace").strip() or f"退出码 {proc.returncode}")
+
+        if output_path is None:
+            return stdout.decode("utf-8", errors="replace")
+        return output_path
+
+
+def find_local_images(markdown, input_path):
+    """Markdown 中引用的本地图片 {引用路径: 文件路径}
+
+    按 Pandoc 的查找顺序（当前目录、Markdown 所在目录）定位，网址与找不到的文件不计。
+    """
+    images = {}
+    for ref in _IMAGE_REF.findall(markdown):
+        if "://" in ref or ref in images:
+            continue
+        for base in (os.getcwd(), os.path.dirname(os.path.abspath(input_path))):
+            path = os.path.join(base, ref)
+            if os.path.isfile(path):
+                images[ref] = path
+                break
+    return images
+
+
+def _local_images(markdown, input_path):
+    """收集 Markdown 中引用的本地图片，供 server 模式随请求发送"""
+    files = {}
+    for ref, path in find_local_images(markdown, input_path).items():
+        with open(path, "rb") as f:
+            files[ref] = base64.b64encode(f.read()).decode("ascii")
+    return files
+
+
+# ================= 进程级默认实例 =================
+_default_runner = None
+_default_runner_lock = threading.Lock()
+
+
+def get_default_runner(use_server=True):
+    """进程内共享的 PandocRunner（use_server 仅在首次创建时生效），进程退出时关闭 server"""
+    global _default_runner
+    with _default_runner_lock:
+        if _default_runner is None:
+            _default_runner = PandocRunner(use_server=use_server)
+            atexit.register(_default_runner.shutdown)
+        return _default_runner
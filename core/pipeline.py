@@ -0,0 +1,703 @@
+"""排版流水线（不依赖 Qt）：读取原文 → AI 排版 → 拆分 Markdown → 组装文档
+
+GUI 的 WorkerThread 与批量模式（core.batch）共用这里的各个阶段：
+
+    job = FormatJob("论文.docx", ["cover", "abs_cn", "body"], api_config, log=print)
+    try:
+        job.run()  # API 模式全流程；网页模式由调用方拿到回复后调用 set_response()，再 split() / build()
+    except JobError as e:
+        print(e)
+    finally:
+        job.cleanup()
+    print(job.outputs, job.timings)
+
+API 模式下可先调用 job.up_to_date()：与上次成功运行相比输入均未变化、输出仍在时直接返回 True，
+无需执行任何阶段。其余情况下各阶段也按增量构建清单（输出文件旁的 <文件名>.build.json，见 core.incremental）
+复用未变化的部分：原文未变时不再提取，组件与导出设置未变时不再组装。
+
+传入任务日志（core.journal.JobJournal）时，任务在日志目录中进行，每个阶段完成后记一次断点；
+失败时日志保留，FormatJob.from_journal(journal) 重建任务后已完成的阶段直接读取产物（"继续上次任务"）。
+
+每个阶段的耗时记录在 job.timings（秒）。更细的分段（提示词拼接、每次 AI 请求及其首字节、
+每次 Pandoc 转换、每次插入文件、目录刷新、样式处理、保存与导出 PDF）记录在 job.tracer 中，
+组装结束后写到输出文件旁的 <文件名>.trace.json（Chrome trace 格式），并在日志中输出汇总表。
+
+调用 AI 期间（通常要几分钟）任务线程提前启动组装后端、基于 reference.docx 新建文档并插入第一个
+Markdown 组件之前的静态组件，AI 请求改在辅助线程中进行；拆分与转换完成后 build() 接着插入其余组件。
+
+任务可以从其他线程取消：job.cancel() 置位任务的 CancelToken（见 core.cancel），进行中的 Pandoc 进程被结束、
+AI 请求的连接被关闭、Word 调用被放弃且文档不保存，当前阶段随即抛出 JobCancelled。已完成的阶段仍留在任务日志中，
+可稍后继续。
+
+可预期的失败抛出 JobError（日志已写好原因；取消为其子类 JobCancelled），其他异常原样抛出。
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from . import build_engine, cache
+from .cancel import CancelToken
+from .incremental import MANIFEST_SUFFIX, BuildManifest, text_hash
+from .journal import STAGE_NAMES
+from .preprocess import Preprocessor, report_split_issues
+from .splitter import FileSplitter
+from .trace import Tracer
+
+# 组装结束后是否在输出文件旁写出 <文件名>.trace.json
+WRITE_TRACE = True
+# 增量构建：输入未变化的阶段复用上次的结果（见 core.incremental）
+INCREMENTAL = True
+# 等待 AI 回复期间在任务线程中提前启动组装后端、新建文档并插入开头的静态组件（见 FormatJob.warm_up）
+SPECULATIVE_BUILD = True
+
+
+class JobError(Exception):
+    """可预期的失败（如 API 调用失败、拆分失败、输出文件被占用）
+
+    Attributes:
+        title / detail: 界面弹窗的标题与正文（可选）
+    """
+
+    def __init__(self, message, title=None, detail=None):
+        super().__init__(message)
+        self.title = title
+        self.detail = detail
+
+
+class JobCancelled(JobError):
+    """任务被取消（见 FormatJob.cancel）"""
+
+    def __init__(self, message="任务已取消"):
+        super().__init__(message)
+
+
+def sanitize_filename(name: str) -> str:
+    """Windows 文件名清理：去掉不允许字符"""
+    invalid = '<>:/\\|?*"'
+    cleaned = "".join(("_" if ch in invalid else ch) for ch in (name or ""))
+    cleaned = cleaned.strip().strip(".")
+    return cleaned
+
+
+def is_file_locked(filepath: str) -> bool:
+    if not filepath or not os.path.exists(filepath):
+        return False
+    try:
+        with open(filepath, "a"):
+            pass
+        return False
+    except PermissionError:
+        return True
+    except Exception:
+        return False
+
+
+class FormatJob:
+    def __init__(
+        self,
+        input_path,
+        components,
+        api_config=None,
+        output_dir: str | None = None,
+        output_basename: str | None = None,
+        export_docx: bool = True,
+        export_pdf: bool = False,
+        use_ai_cache: bool = True,
+        backend=None,
+        incremental: bool = INCREMENTAL,
+        speculative_build: bool = SPECULATIVE_BUILD,
+        journal=None,
+        cancel_token=None,
+        log=print,
+    ):
+        """
+        Args:
+            components: 组件 key 列表（见 build_engine.COMPONENT_REGISTRY）
+            output_dir: 导出目录，留空为 outputs，相对路径放在 outputs 下
+            output_basename: 导出文件名（不含扩展名），留空取输入文件名
+            use_ai_cache: 是否复用 AI 回复缓存（关闭时仍会用新回复刷新缓存）
+            backend: 组装后端（见 DocumentBuilder），默认 Config.BUILD_BACKEND
+            incremental: 是否按增量构建清单跳过输入未变化的阶段
+            speculative_build: 调用 AI 期间是否提前准备组装（AI 请求改在辅助线程中进行，本线程执行 warm_up()）；
+                               组装不在 run_ai() 的线程中执行时（如批量模式）须关闭
+            journal: 任务日志（core.journal.JobJournal），None 表示不记录断点、结束后删除临时目录
+            cancel_token: 取消令牌（core.cancel.CancelToken），默认新建；批量模式下多个任务可共用一个
+            log: 日志输出函数
+        """
+        self.input_path = input_path
+        self.components = list(components)
+        self.api_config = api_config or {}
+        self.output_dir = (output_dir or "").strip() or None
+        self.output_basename = (output_basename or "").strip() or None
+        self.export_docx = bool(export_docx)
+        self.export_pdf = bool(export_pdf)
+        self.use_ai_cache = bool(use_ai_cache)
+        self.backend = backend
+        self.incremental = bool(incremental)
+        self.speculative_build = bool(speculative_build)
+        self.journal = journal
+        self.cancel_token = cancel_token or CancelToken()
+        self.log = log
+
+        self.processor = None
+        self.builder = None
+        self.registry = None
+        self.temp_md_dir = None
+        self.raw_text = None
+        self.formatted_md = None
+        self.split_done = False  # 流式模式下边接收边拆分，无需再执行拆分阶段
+        self.fresh_response = False  # 本次是否真正调用了 API（拆分成功后写入缓存）
+        self.final_docx = None
+        self.final_pdf = None
+        self.outputs = []
+        self.timings = {}
+        self.tracer = Tracer(os.path.basename(input_path))
+        self.trace_path = None
+        self.manifest = None  # 增量构建清单（见 _manifest）
+        self.text_hash = None  # 各节点产物的哈希，用于下游节点的指纹
+        self.response_hash = None
+        self.md_hashes = {}
+
+    @classmethod
+    def from_journal(cls, journal, api_config=None, log=print, **kwargs):
+        """按任务日志中记录的设置重建任务（新任务也可先建日志再用此方法创建）"""
+        settings = journal.settings
+        return cls(
+            settings["input_path"],
+            settings["components"],
+            api_config,
+            output_dir=settings.get("output_dir"),
+            output_basename=settings.get("output_basename"),
+            export_docx=settings.get("export_docx", True),
+            export_pdf=settings.get("export_pdf", False),
+            use_ai_cache=settings.get("use_ai_cache", True),
+            journal=journal,
+            log=log,
+            **kwargs,
+        )
+
+    def cancel(self, reason=None):
+        """取消任务（可在任意线程调用）：正在执行的阶段尽快中止并抛出 JobCancelled"""
+        self.cancel_token.cancel(reason)
+
+    @contextmanager
+    def _stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            self.cancel_token.check()
+            with self.tracer.span(name):
+                yield
+        except JobCancelled:
+            raise
+        except SystemExit as e:
+            if self.cancel_token.is_set():
+                raise JobCancelled() from e
+            # Preprocessor 在命令行场景下出错会 sys.exit，这里只让当前任务失败
+            raise JobError(f"{name} 阶段失败 (exit {e.code})") from e
+        except Exception as e:
+            # 被取消后各处抛出的异常（被结束的进程、被关闭的连接、Cancelled）统一视为取消
+            if self.cancel_token.is_set():
+                self.log(f"⏹️ 已取消（{STAGE_NAMES.get(name, name)}）")
+                raise JobCancelled() from e
+            raise
+        finally:
+            self.timings[name] = round(self.timings.get(name, 0.0) + time.perf_counter() - t0, 3)
+
+    # ---------- 各阶段 ----------
+    def prepare(self):
+        """创建临时目录、预处理器、构建器与局部组件表"""
+        with self.tracer.span("prepare"):
+            self._prepare()
+
+    def _prepare(self):
+        self.processor = Preprocessor(api_config=self.api_config)
+        self.processor.tracer = self.tracer
+        self.processor.cancel_token = self.cancel_token
+
+        if self.journal is not None:
+            # 任务日志目录即工作目录；尚未拆分时清掉上次中断留下的半截文件
+            self.temp_md_dir = self.journal.md_dir
+            os.makedirs(self.temp_md_dir, exist_ok=True)
+            if not self.journal.done("split"):
+                for name in os.listdir(self.temp_md_dir):
+                    os.remove(os.path.join(self.temp_md_dir, name))
+            self.log(f"📒 任务日志: {self.journal.path}")
+            if self.journal.state["stages"]:
+                self.log(f"↩️ 继续上次任务（{self.journal.describe()}）")
+        else:
+            # 创建临时目录用于存放拆分的 markdown 文件
+            self.temp_md_dir = tempfile.mkdtemp(prefix="autoformatter_")
+            self.log(f"📁 已创建临时目录: {self.temp_md_dir}")
+        self.builder = build_engine.DocumentBuilder(
+            self.backend, temp_dir=self.temp_md_dir, tracer=self.tracer, cancel_token=self.cancel_token
+        )
+
+        # 构造局部 registry，覆盖 markdown 文件路径（避免修改全局 COMPONENT_REGISTRY，线程更安全）
+        self.registry = {k: dict(v) for k, v in build_engine.COMPONENT_REGISTRY.items()}
+        for key in ["abs_cn", "abs_en", "body"]:
+            if key in self.registry:
+                original_path = self.registry[key].get("path", "")
+                filename = os.path.basename(original_path) if original_path else ""
+                if filename:
+                    self.registry[key]["path"] = os.path.join(self.temp_md_dir, filename)
+
+    def extract(self):
+        """转纯文本"""
+        self.log(f"📄 正在读取文件: {os.path.basename(self.input_path)}...")
+        with self._stage("extract"):
+            manifest = self._manifest()
+            key = self._extract_key() if manifest is not None else None
+            text = self._restore("extract", "raw.txt")
+            if text is None and manifest is not None:
+                done = manifest.lookup("extract", key)
+                text = manifest.get_text(done["text"]) if done else None
+                if text is not None:
+                    self.log("♻️ 原文未变化，复用上次的提取结果")
+            self.raw_text = text if text is not None else self.processor.convert_to_plain_text(self.input_path)
+            self._checkpoint("extract", "raw.txt", self.raw_text)
+
+            if manifest is not None:
+                outputs = {"text": manifest.put_text(self.raw_text)}
+                self.text_hash = manifest.record("extract", key, outputs, reused=text is not None)["text"]
+        return self.raw_text
+
+    def run_ai(self):
+        """API 模式的 AI 处理：命中缓存直接复用，否则分片 / 流式 / 整篇请求"""
+        with self._stage("ai"):
+            if not self.restore_response():
+                self._run_ai()
+                self._checkpoint("ai", "response.md", self.formatted_md, fresh=self.fresh_response)
+            manifest = self._manifest()
+            if manifest is not None:
+                outputs = {"response": text_hash(self.formatted_md)}
+                self.response_hash = outputs["response"]
+                # 按实际给出回复的提供商记录；分片回复来自不同模型时不记录，下次不会被当作可复用
+                provider = self.processor.served_provider()
+                if provider is not None:
+                    manifest.record("ai", self._ai_key(provider), outputs, reused=not self.fresh_response)
+
+    def _run_ai(self):
+        cached = self.processor.load_cached_response(self.raw_text) if self.use_ai_cache else None
+        if cached:
+            self.log("⚡ [API模式] 命中 AI 回复缓存，跳过 API 调用")
+            self.formatted_md = cached
+            return
+
+        self.log("🤖 [API模式] 正在调用 AI 进行排版 (请耐心等待)...")
+        self.fresh_response = True
+        try:
+            if self.speculative_build:
+                self._call_ai_while_warming_up()
+            else:
+                self._call_ai()
+        except Exception as e:
+            if self.cancel_token.is_set():
+                raise
+            self.log(f"❌ API 调用失败: {e}")
+            raise JobError(f"API 调用失败: {e}") from e
+
+    def _call_ai(self):
+        # 如果你没有配置 API Key，这里会报错
+        if self.processor.use_sharding(self.raw_text):
+            self.formatted_md = self.processor.call_ai_api_sharded(self.raw_text, log=self.log)
+        if self.formatted_md is None and self.api_config.get("stream", True):
+            self.split_done, self.formatted_md = self._stream_and_split()
+        elif self.formatted_md is None:
+            self.formatted_md = self.processor.call_ai_api(self.raw_text)
+
+    def _call_ai_while_warming_up(self):
+        """AI 请求在辅助线程中进行，本线程（之后执行 build() 的线程）同时提前准备组装；AI 失败时停止准备"""
+        error = []
+        failed = threading.Event()
+
+        def target():
+            try:
+                self._call_ai()
+            except BaseException as e:  # noqa: BLE001 - 交回任务线程抛出（含 Preprocessor 的 SystemExit）
+                error.append(e)
+                failed.set()
+
+        thread = threading.Thread(target=target, name="ai", daemon=True)
+        thread.start()
+        try:
+            self.warm_up(stop=failed)
+        finally:
+            thread.join()
+        if error:
+            raise error[0]
+
+    def _stream_and_split(self):
+        """流式接收 AI 回复，每个 ===FILE: 段落结束即写入临时目录，并立即交给 Pandoc 提前转换
+
+        Returns:
+            (是否拆分出了至少一个文件, 完整回复)
+        """
+        md_keys = {
+            os.path.basename(item["path"]): key
+            for key, item in self.registry.items()
+            if item["type"] == "md" and key in self.components
+        }
+        t0 = time.perf_counter()
+
+        def on_file(name, path):
+            self.log(f"   -> 已生成 {name} ({time.perf_counter() - t0:.1f}s)")
+            key = md_keys.get(name)
+            if key:
+                self.builder.preconvert(key, path)
+
+        splitter = FileSplitter(self.temp_md_dir, on_file=on_file, expected=self.md_files())
+        response = self.processor.stream_ai_api(self.raw_text, on_text=splitter.feed, log=self.log)
+        saved = splitter.close()
+        report_split_issues(splitter, self.log)
+        return bool(saved), response
+
+    def md_files(self):
+        """组件表中所有 Markdown 组件的文件名（拆分时只接受这些文件）"""
+        return [os.path.basename(item["path"]) for item in self.registry.values() if item["type"] == "md"]
+
+    def set_response(self, text):
+        """网页模式：使用用户粘贴的 AI 回复"""
+        self.formatted_md = (text or "").strip()
+        if not self.formatted_md or len(self.formatted_md) < 10:
+            self.log("❌ 输入内容为空或无效，流程终止。")
+            raise JobError("输入内容为空或无效")
+        self._checkpoint("ai", "response.md", self.formatted_md, fresh=False)
+        if self.incremental:
+            self.response_hash = text_hash(self.formatted_md)
+
+    def restore_response(self):
+        """从任务日志恢复 AI 回复（API 返回或网页模式粘贴的内容）；日志中没有时返回 False"""
+        text = self._restore("ai", "response.md")
+        if text is None:
+            return False
+        self.formatted_md = text
+        # 上次拆分成功前就中断了的新回复，拆分成功后仍要写入 AI 回复缓存
+        self.fresh_response = bool(self.journal.info("ai").get("fresh"))
+        self.split_done = self.journal.done("split")
+        if self.incremental:
+            self.response_hash = text_hash(text)
+        return True
+
+    def split(self):
+        """拆分文件到临时目录；拆分成功且回复来自本次 API 调用时写入缓存"""
+        with self._stage("split"):
+            if not self.split_done:
+                self.log("✂️ 正在拆分 Markdown 文件到临时目录...")
+            if not (self.split_done or self.processor.split_and_save(
+                self.formatted_md, output_dir=self.temp_md_dir, expected=self.md_files()
+            )):
+                self.log("❌ 文件拆分失败，请检查 AI 返回格式是否包含 ===FILE: ...===")
+                raise JobError("文件拆分失败")
+            self.log("✅ Markdown 拆分完成。")
+            if self.fresh_response:
+                self.processor.save_cached_response(self.raw_text, self.formatted_md)
+            self._checkpoint("split", files=sorted(n for n in os.listdir(self.temp_md_dir) if n.endswith(".md")))
+
+            manifest = self._manifest()
+            if manifest is not None:
+                # 拆分很快（见 bench.splitter），总是重新执行，只记录各 Markdown 的哈希
+                self.md_hashes = {}
+                for name in self.md_files():
+                    path = os.path.join(self.temp_md_dir, name)
+                    if os.path.exists(path):
+                        self.md_hashes[name] = cache.hash_file(path)
+                manifest.record("split", self._split_key(), self.md_hashes)
+
+    def resolve_outputs(self):
+        """计算输出路径（可自定义目录；留空默认 outputs），并检查目标文件是否被占用"""
+        if not self.export_docx and not self.export_pdf:
+            self.log("❌ 未选择任何导出格式（docx/pdf），流程终止。")
+            raise JobError("未选择任何导出格式")
+
+        final_dir, base = self._output_location()
+        self.final_docx = os.path.join(final_dir, f"{base}.docx") if self.export_docx else None
+        self.final_pdf = os.path.join(final_dir, f"{base}.pdf") if self.export_pdf else None
+
+        # 输出占用检测
+        for target in [p for p in [self.final_docx, self.final_pdf] if p]:
+            if is_file_locked(target):
+                self.log(f"❌ 输出失败：目标文件被占用: {os.path.basename(target)}")
+                raise JobError(
+                    f"目标文件被占用: {target}",
+                    title="输出失败（文件被占用）",
+                    detail=(
+                        "检测到目标文件可能正在被 Word/其他程序占用：\n\n"
+                        f"{target}\n\n"
+                        "请先关闭占用程序后重试。"
+                    ),
+                )
+        return self.final_docx, self.final_pdf
+
+    def _output_location(self):
+        """输出目录（不存在时创建）与文件名（不含扩展名）"""
+        outputs_root = build_engine.Config.OUTPUTS_DIR
+        os.makedirs(outputs_root, exist_ok=True)
+
+        final_dir = self.output_dir or outputs_root
+        # 相对路径默认放到 outputs 下
+        if not os.path.isabs(final_dir):
+            final_dir = os.path.abspath(os.path.join(outputs_root, final_dir))
+        os.makedirs(final_dir, exist_ok=True)
+
+        base = self.output_basename
+        if not base:
+            base = os.path.splitext(os.path.basename(self.input_path))[0]
+        # 文件名每次都要一致，增量构建清单才能对得上
+        self.output_basename = base = sanitize_filename(base) or f"Output_{int(time.time())}"
+        return final_dir, base
+
+    def warm_up(self, stop=None):
+        """提前准备组装阶段（启动组装后端、新建文档并插入开头的静态组件等，见 DocumentBuilder.warm_up），失败不影响任务
+
+        用于等待 AI 的空闲时间：API 模式由 run_ai() 自动调用（speculative_build），网页模式由调用方在
+        等待用户粘贴回复时调用；须在之后执行 build() 的线程中调用。stop（threading.Event）置位后
+        不再开始后续准备（如 AI 已失败、用户已粘贴回复）。
+        """
+        if self.builder is None:
+            self.prepare()
+        with self._stage("warm_up"):
+            done = self.builder.warm_up(self.components, self.registry, stop=stop)
+        if done:
+            self.log(f"🔥 已提前准备组装: {'、'.join(done)}")
+
+    def build(self):
+        """组装文档：docx 可能是最终文件，也可能只是 pdf 的临时中间产物"""
+        if self.final_docx is None and self.final_pdf is None:
+            self.resolve_outputs()
+
+        manifest = self._manifest()
+        assemble_key = None
+        if manifest is not None:
+            assemble_key, pandoc_nodes = self._assemble_key(
+                self.md_hashes, lambda _key, path: build_engine.referenced_images(path)
+            )
+            for name, (key, outputs) in pandoc_nodes.items():
+                manifest.record(name, key, outputs, reused=manifest.lookup(name, key) is not None)
+            done = manifest.lookup("assemble", assemble_key)
+            if done is not None and manifest.outputs_intact(done["files"]):
+                manifest.record("assemble", assemble_key, done, reused=True)
+                manifest.save()
+                self.outputs = list(done["files"])
+                self.log("♻️ 各组件与导出设置均未变化，沿用上次的输出（跳过组装）：")
+                for p in self.outputs:
+                    self.log(f"- {p}")
+                return self.outputs
+        self.log(f"🔨 正在组装 Word 文档 (包含: {len(self.components)} 个组件)...")
+
+        base = os.path.splitext(os.path.basename(self.final_docx or self.final_pdf))[0]
+        docx_build_path = self.final_docx or os.path.join(self.temp_md_dir, f"{base}_temp.docx")
+        self.log("🔧 正在生成 Word 文档...")
+        if self.journal is not None and self.journal.done("convert"):
+            reused = [
+                key for key in self.components
+                if self.registry.get(key, {}).get("type") == "md"
+                and self.builder.reuse_converted(key, self.registry[key]["path"])
+            ]
+            if reused:
+                self.log(f"↩️ 从任务日志恢复已转换的组件: {', '.join(reused)}")
+        try:
+            with self._stage("build"):
+                self.builder.build(
+                    self.components,
+                    docx_build_path,
+                    output_pdf_filename=self.final_pdf,
+                    component_registry=self.registry,
+                    on_prepared=lambda files: self._checkpoint(
+                        "convert", files=[os.path.basename(f) for f in files]
+                    ),
+                )
+        finally:
+            self.report(os.path.join(os.path.dirname(self.final_docx or self.final_pdf), f"{base}.trace.json"))
+        if not os.path.exists(docx_build_path):
+            self.log("❌ 文档生成失败，请查看上方日志。")
+            raise JobError("文档生成失败")
+
+        # 兼容：如果仅导出 pdf，不保留中间 docx
+        if not self.export_docx:
+            try:
+                os.remove(docx_build_path)
+            except Exception:
+                pass
+
+        self.outputs = [p for p in [self.final_docx, self.final_pdf] if p and os.path.exists(p)]
+        if self.final_pdf and self.final_pdf not in self.outputs:
+            self.log("⚠️ PDF 未能导出，请查看上方日志。")
+        self.log("✅ 导出完成：")
+        for p in self.outputs:
+            self.log(f"- {os.path.abspath(p)}")
+
+        if manifest is not None and self.outputs:
+            manifest.record("assemble", assemble_key, {"files": manifest.stamp_outputs(self.outputs)})
+            manifest.save()
+            self.log(f"♻️ 增量构建: {manifest.summary()}")
+        return self.outputs
+
+    def report(self, trace_path=None):
+        """在日志中输出各分段耗时汇总表，并写出 Chrome trace 文件（WRITE_TRACE 关闭时只输出汇总表）"""
+        lines = self.tracer.summary_lines()
+        if lines:
+            self.log("⏱️ 耗时分段:")
+            for line in lines:
+                self.log(f"   {line}")
+        if WRITE_TRACE and trace_path:
+            try:
+                self.trace_path = self.tracer.save(trace_path)
+                self.log(f"⏱️ 分段耗时已写入: {os.path.abspath(trace_path)}（可在 chrome://tracing 中打开）")
+            except OSError as e:
+                self.log(f"⚠️ 写入耗时分段失败: {e}")
+
+    # ---------- 增量构建 ----------
+    def _manifest(self):
+        """本任务的增量构建清单（<输出目录>/<文件名>.build.json）；关闭增量构建时为 None"""
+        if not self.incremental:
+            return None
+        if self.manifest is None:
+            final_dir, base = self._output_location()
+            self.manifest = BuildManifest(os.path.join(final_dir, base + MANIFEST_SUFFIX))
+        return self.manifest
+
+    def _extract_key(self):
+        ext = os.path.splitext(self.input_path)[1].lower()
+        return self.manifest.key("extract", ext, self.manifest.file_hash(self.input_path))
+
+    def _ai_key(self, provider=None):
+        return self.manifest.key("ai", self.text_hash, *self.processor.ai_settings(provider))
+
+    def _split_key(self):
+        return self.manifest.key("split", self.response_hash, *self.md_files())
+
+    def _assemble_key(self, md_hashes, images_of):
+        """组装节点的指纹，及各 Markdown 组件的 Pandoc 节点 {名称: (指纹, 产物)}
+
+        Args:
+            md_hashes: 拆分出的 Markdown 文件名 -> 内容哈希
+            images_of: images_of(组件 key, Markdown 路径) 返回该组件引用的本地图片
+        """
+        manifest = self.manifest
+        ref = manifest.file_hash(build_engine.Config.REF_DOC)
+        parts = []
+        pandoc_nodes = {}
+        for key in self.components:
+            item = self.registry.get(key)
+            if item is None:
+                continue
+            if item["type"] == "static":
+                exists = os.path.exists(item["path"])
+                parts.append(f"{key}|{manifest.file_hash(item['path']) if exists else 'missing'}")
+                continue
+            md_hash = md_hashes.get(os.path.basename(item["path"]))
+            if md_hash is None:
+                parts.append(f"{key}|missing")
+                continue
+            images = images_of(key, item["path"])
+            node_key = manifest.key(
+                "pandoc", md_hash, ref, build_engine.get_pandoc_version(),
+                *(f"{path}|{manifest.file_hash(path)}" for path in images),
+            )
+            pandoc_nodes[f"pandoc:{key}"] = (node_key, {"images": images})
+            parts.append(f"{key}|{node_key}")
+
+        backend = self.backend if self.backend is None or isinstance(self.backend, str) else "custom"
+        key = manifest.key(
+            "assemble", ref, backend or build_engine.Config.BUILD_BACKEND,
+            str(self.final_docx), str(self.final_pdf), *parts,
+        )
+        return key, pandoc_nodes
+
+    def up_to_date(self):
+        """API 模式：与上次成功运行相比输入均未变化、上次的输出也未被改动时返回 True（无需执行任何阶段）
+
+        沿依赖图用清单中记录的产物哈希逐个推算指纹：只比对文件的大小与修改时间（变化时才计算哈希），
+        不读原文、不调用 AI、不启动组装后端。关闭 AI 回复缓存时总是返回 False。
+        """
+        if not self.incremental or not self.use_ai_cache:
+            return False
+        if self.processor is None:
+            self.prepare()
+        self.resolve_outputs()
+        manifest = self._manifest()
+        try:
+            extracted = manifest.lookup("extract", self._extract_key())
+            if extracted is None:
+                return False
+            self.text_hash = extracted["text"]
+            # 与 AI 回复缓存一致：上次由本次可用的任一提供商给出的回复都可沿用
+            for provider in self.processor.candidate_providers():
+                answered = manifest.lookup("ai", self._ai_key(provider))
+                if answered is not None:
+                    break
+            if answered is None:
+                return False
+            self.response_hash = answered["response"]
+            md_hashes = manifest.lookup("split", self._split_key())
+            if md_hashes is None:
+                return False
+            assemble_key, _nodes = self._assemble_key(
+                md_hashes, lambda key, _path: (manifest.previous(f"pandoc:{key}") or {}).get("images", [])
+            )
+            done = manifest.lookup("assemble", assemble_key)
+        except OSError:
+            return False
+        if done is None or not manifest.outputs_intact(done["files"]):
+            return False
+
+        self.outputs = list(done["files"])
+        self.log("♻️ 原文、AI 配置与各组件均未变化，沿用上次的输出（跳过全部阶段）：")
+        for p in self.outputs:
+            self.log(f"- {p}")
+        return True
+
+    def run(self):
+        """API 模式全流程"""
+        if self.processor is None:
+            self.prepare()
+        if self.up_to_date():
+            return self.outputs
+        self.extract()
+        self.run_ai()
+        self.split()
+        self.resolve_outputs()
+        return self.build()
+
+    # ---------- 任务日志 ----------
+    def _restore(self, stage, name):
+        """任务日志中该阶段已完成时读回其产物，否则返回 None"""
+        if self.journal is None or not self.journal.done(stage):
+            return None
+        text = self.journal.read_text(name)
+        if text is not None:
+            self.log(f"↩️ 从任务日志恢复: {STAGE_NAMES[stage]}")
+        return text
+
+    def _checkpoint(self, stage, name=None, text=None, **info):
+        """阶段完成：先写产物再记断点（已记过的不重复写）"""
+        if self.journal is None or self.journal.done(stage):
+            return
+        try:
+            if name is not None:
+                self.journal.write_text(name, text or "")
+            self.journal.checkpoint(stage, **info)
+        except OSError as e:
+            self.log(f"⚠️ 写入任务日志失败: {e}")
+
+    def cleanup(self):
+        """清理临时目录；有任务日志时，成功则删除日志，失败则保留以便继续"""
+        if self.builder is not None:
+            self.builder.close()  # 提前启动、但没等到组装的后端
+        if self.journal is not None:
+            if self.outputs:
+                self.journal.discard()
+            elif self.journal.state["stages"]:
+                self.log(f"📒 已保留任务日志，可点击【继续上次任务】接着做（{self.journal.describe()}）")
+            else:
+                self.journal.discard()  # 一个阶段都没完成，没有可续做的内容
+            return
+        if self.temp_md_dir and os.path.exists(self.temp_md_dir):
+            try:
+                shutil.rmtree(self.temp_md_dir)
+                self.log("🗑️ 已清理临时目录")
+            except Exception as e:
+                self.log(f"⚠️ 清理临时目录失败: {e}")
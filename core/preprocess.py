@@ -1,24 +1,39 @@
 import os
-import re
 import sys
 import subprocess
 import time
 import json
-import urllib.request
-import urllib.error
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+import zlib
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
 
-# 尝试导入剪切板库，如果没有安装则提示
+from . import cache, cancel, extract, http_client, pandoc_runner, provider_stats, ratelimit, scheduler, sharding
+from .splitter import EXPECTED_FILES, FileSplitter, parse_sections
+from .trace import NULL_TRACER
+
+# 剪切板库只在交互式网页模式下需要（命令行 / 服务器环境可不安装）
 try:
     import pyperclip
 except ImportError:
-    print("[Error] 缺少 pyperclip 库。请运行: pip install pyperclip")
-    sys.exit(1)
+    pyperclip = None
 
-# 尝试导入 OpenAI，如果只用网页版模式可以不需要，但为了兼容性保留
-try:
-    from openai import OpenAI
-except ImportError:
-    OpenAI = None
+# OpenAI SDK 导入较慢，且网页模式与兼容模式都用不到：首次创建客户端时才导入（见 load_openai）
+OpenAI = None
+_openai_checked = False
+
+
+def load_openai():
+    """按需导入 openai.OpenAI；未安装时返回 None"""
+    global OpenAI, _openai_checked
+    if not _openai_checked:
+        try:
+            from openai import OpenAI as openai_cls
+        except ImportError:
+            openai_cls = None
+        OpenAI, _openai_checked = openai_cls, True
+    return OpenAI
 
 # ================= 配置区域 =================
 # API 配置现在通过 GUI 传入，不再硬编码
@@ -35,6 +50,32 @@ if not os.path.exists(MD_DIR):
 if not os.path.exists(TEMP_DIR):
     os.makedirs(TEMP_DIR)
 
+# 生成温度（同时参与 AI 回复缓存的键）
+TEMPERATURE = 0.05
+
+# AI 回复缓存（键 = prompt.txt + 模型 + Base URL + 温度 + 原文，zlib 压缩存储），超出上限按 LRU 淘汰
+AI_CACHE_DIR = os.path.join(TEMP_DIR, "ai_cache")
+AI_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+_ai_cache = None
+_ai_cache_lock = threading.Lock()
+
+
+def get_ai_cache():
+    global _ai_cache
+    with _ai_cache_lock:
+        if _ai_cache is None:
+            _ai_cache = cache.DiskCache(AI_CACHE_DIR, AI_CACHE_MAX_BYTES, suffix=".md.z")
+        return _ai_cache
+
+
+def report_split_issues(splitter, log):
+    """提示拆分时被丢弃 / 重复出现的文件段落"""
+    if splitter.rejected:
+        log(f"[Warning] 忽略了预期之外的文件段落: {', '.join(splitter.rejected)}")
+    if splitter.duplicates:
+        log(f"[Warning] 以下文件段落重复出现，已按顺序合并: {', '.join(sorted(set(splitter.duplicates)))}")
+
 
 class Preprocessor:
     def __init__(self, api_config=None):
@@ -44,22 +85,103 @@ class Preprocessor:
         """
         self.client = None
         self.api_config = api_config or {}
+        # 耗时分段记录（见 trace），由 FormatJob 设置
+        self.tracer = NULL_TRACER
+        # 任务的取消令牌（见 cancel），由 FormatJob 设置；被取消时中止 Pandoc 与进行中的 AI 请求
+        self.cancel_token = cancel.CancelToken()
+        # 实际给出回复的提供商（失败切换 / 对冲 / 自动选择时未必是主提供商；分片时每片一项），见 served_provider
+        self._served = []
+        self._served_lock = threading.Lock()
+
+    def init_api(self, provider=None):
+        """仅在需要 API 时初始化，返回该提供商的 OpenAI 客户端
 
-    def init_api(self):
-        """仅在需要 API 时初始化"""
-        if OpenAI is None:
+        Args:
+            provider: 提供商配置，默认为 api_config（主提供商）
+        """
+        openai_cls = load_openai()
+        if openai_cls is None:
             print("[Error] 未安装 openai 库。请运行: pip install openai")
             sys.exit(1)
 
-        api_key = self.api_config.get("api_key", "")
-        base_url = self.api_config.get("base_url", "")
+        provider = provider or self.api_config
+        self._check_provider(provider)
+
+        # 同一提供商共用一个客户端（及其连接池），不再每次调用都新建
+        self.client = http_client.get_openai_client(openai_cls, provider)
+        return self.client
 
-        if not api_key:
+    def _check_provider(self, provider):
+        if not provider.get("api_key"):
             raise ValueError("API Key 未配置")
-        if not base_url:
+        if not provider.get("base_url"):
             raise ValueError("Base URL 未配置")
 
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
+    def _openai_client(self, provider):
+        """该提供商的 OpenAI 客户端；未安装 openai 或 SDK 与 httpx 版本不兼容（proxies）时返回 None，走兼容模式"""
+        self._check_provider(provider)
+        openai_cls = load_openai()
+        if openai_cls is None:
+            return None
+        try:
+            return http_client.get_openai_client(openai_cls, provider)
+        except Exception as e:
+            if "proxies" in str(e):
+                return None
+            raise
+
+    def providers(self):
+        """主提供商 + 备用提供商（api_config["backups"]），按失败切换顺序排列
+
+        自动模式（api_config["auto_provider"]）下按 provider_stats 的得分重新排序，每次请求都选当前最快的。
+        """
+        providers = [self.api_config] + list(self.api_config.get("backups") or [])
+        if self.api_config.get("auto_provider"):
+            providers = provider_stats.get_stats().rank(providers, scheduler.provider_name)
+        return providers
+
+    def _tracked(self, attempt, text_of=lambda result: result):
+        """包装单次请求函数：先按提供商限流（见 ratelimit），结束后把首字节耗时、输出速度与成败
+        记入 provider_stats（只记提供商一侧的失败；被取消的对冲请求与 Key 未配置等本地错误不计）
+        """
+        stats = provider_stats.get_stats()
+
+        def run(provider, ctx):
+            name = scheduler.provider_name(provider)
+            self._check_provider(provider)  # 配置不全时直接失败，不占限流名额
+            with ratelimit.limiter_for(provider).slot(ctx.cancelled):
+                ctx.started = time.perf_counter()  # 排队等待的时间不计入首字节耗时
+                try:
+                    with self.tracer.span("ai.request", cat="ai", provider=name):
+                        result = attempt(provider, ctx)
+                except Exception as e:
+                    if not ctx.cancelled.is_set() and scheduler.is_provider_error(e):
+                        stats.record(name, ok=False)
+                    raise
+                finally:
+                    if ctx.ttfb is not None:
+                        self.tracer.add("ai.ttfb", ctx.started, ctx.started + ctx.ttfb, cat="ai", provider=name)
+            elapsed = time.perf_counter() - ctx.started
+            tokens = provider_stats.estimate_tokens(text_of(result))
+            # 非流式请求没有单独的首字节时间，整段耗时即首字节耗时
+            stats.record(name, ok=True, ttfb=ctx.ttfb if ctx.ttfb is not None else elapsed, elapsed=elapsed, tokens=tokens)
+            return result
+
+        return run
+
+    def make_scheduler(self, log=print, cancel=None):
+        """按 api_config 的 retries / hedge_after 创建请求调度器
+
+        Args:
+            cancel: 取消令牌，默认 self.cancel_token（分片模式传入各分片共用的子令牌）
+        """
+        return scheduler.RequestScheduler(
+            self.providers(),
+            retries=self.api_config.get("retries", scheduler.RETRIES),
+            hedge_after=self.api_config.get("hedge_after"),
+            cancel=cancel if cancel is not None else self.cancel_token,
+            log=log,
+        )
 
     def _build_chat_url(self, base_url):
         base = (base_url or "").rstrip("/")
@@ -67,67 +189,71 @@ class Preprocessor:
             return f"{base}/chat/completions"
         return f"{base}/v1/chat/completions"
 
-    def _call_ai_api_simple(self, raw_text):
+    def _call_ai_api_simple(self, raw_text, note=None, provider=None, cancelled=None):
         """兼容模式：绕过 OpenAI SDK，直接 HTTP 调用"""
-        api_key = self.api_config.get("api_key", "")
-        base_url = self.api_config.get("base_url", "")
-        if not api_key:
-            raise ValueError("API Key 未配置")
-        if not base_url:
-            raise ValueError("Base URL 未配置")
+        provider = provider or self.api_config
+        self._check_provider(provider)
+        api_key = provider["api_key"]
+        model_name = provider.get("model_name", "gpt-3.5-turbo")
 
-        system_prompt = self.get_system_prompt()
-        model_name = self.api_config.get("model_name", "gpt-3.5-turbo")
-
-        url = self._build_chat_url(base_url)
+        url = self._build_chat_url(provider["base_url"])
         payload = {
             "model": model_name,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"以下是论文原始内容，请按要求处理：\n\n{raw_text}"},
-            ],
-            "temperature": 0.05,
+            "messages": self._chat_messages(raw_text, note),
+            "temperature": TEMPERATURE,
             "stream": False,
         }
 
         data = json.dumps(payload).encode("utf-8")
-        req = urllib.request.Request(
-            url,
-            data=data,
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {api_key}",
-            },
-            method="POST",
-        )
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}",
+        }
 
         try:
-            with urllib.request.urlopen(req, timeout=60) as resp:
+            # 复用该提供商的 keep-alive 连接，省去每次请求的 TCP / TLS 握手
+            pool = http_client.pool_for(provider)
+            with pool.request(
+                "POST", url, body=data, headers=headers, timeout=http_client.completion_timeout(provider),
+                cancel=cancelled,
+            ) as resp:
                 resp_text = resp.read().decode("utf-8", errors="ignore")
                 result = json.loads(resp_text)
                 return result["choices"][0]["message"]["content"]
-        except urllib.error.HTTPError as e:
-            detail = e.read().decode("utf-8", errors="ignore")
-            raise RuntimeError(f"HTTP {e.code}: {detail}")
+        except (http_client.HTTPStatusError, scheduler.RequestCancelled):
+            raise
         except Exception as e:
-            raise RuntimeError(str(e))
+            raise RuntimeError(str(e)) from e
 
     def convert_to_plain_text(self, input_path):
-        """步骤 1: 使用 Pandoc 将 docx/md/pdf 转换为纯文本"""
+        """步骤 1: 读取原文件为纯文本（txt/md 直读，docx 内置提取，其余格式交给 Pandoc）"""
         print(f"[1/4] 正在读取并清洗原文件: {os.path.basename(input_path)}...")
 
-        filename = os.path.basename(input_path)
-        temp_txt_path = os.path.join(TEMP_DIR, f"{filename}.txt")
-
-        # 构建 pandoc 命令：强制转换为 plain text
-        cmd = f'pandoc "{input_path}" -t plain --wrap=none -o "{temp_txt_path}"'
-
+        # txt / md 原样读入，保留 Markdown 结构，不经任何转换
+        if input_path.lower().endswith((".txt", ".md")):
+            try:
+                text, encoding = extract.read_text_file(input_path)
+                print(f"   -> 文本编码: {encoding}")
+                return text
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"[Error] 读取文本失败: {e}")
+                sys.exit(1)
+
+        # docx 直接在进程内流式提取（保留标题/列表/表格标记），无需启动 Pandoc
+        if input_path.lower().endswith(".docx"):
+            try:
+                return extract.extract_text(input_path)
+            except (zipfile.BadZipFile, KeyError, ET.ParseError) as e:
+                print(f"[Warning] 内置 docx 解析失败，改用 Pandoc: {e}")
+
+        # 强制转换为 plain text（优先走常驻 pandoc server，结果直接返回，不落临时文件）
+        runner = pandoc_runner.get_default_runner()
         try:
-            subprocess.run(cmd, shell=True, check=True)
-            with open(temp_txt_path, "r", encoding="utf-8") as f:
-                return f.read()
-        except subprocess.CalledProcessError:
-            print("[Error] Pandoc 转换失败，请检查是否安装 Pandoc。")
+            return runner.convert(input_path, "plain", options={"wrap": "none"}, cancel=self.cancel_token)
+        except cancel.Cancelled:
+            raise
+        except pandoc_runner.PandocError as e:
+            print(f"[Error] Pandoc 转换失败，请检查是否安装 Pandoc。\n{e}")
             sys.exit(1)
         except Exception as e:
             print(f"[Error] 读取文本失败: {e}")
@@ -141,49 +267,342 @@ class Preprocessor:
         with open(PROMPT_FILE, "r", encoding="utf-8") as f:
             return f.read()
 
-    def call_ai_api(self, raw_text):
-        """API 模式: 直接调用接口"""
+    def call_ai_api(self, raw_text, note=None, cancel=None):
+        """API 模式: 直接调用接口（失败按退避重试，再切换备用提供商，见 scheduler）
+
+        Args:
+            note: 附加在原文前的补充说明（分片模式下说明本片段的范围与输出要求）
+            cancel: 取消令牌，默认 self.cancel_token
+        """
         print("[2/4] [API模式] 正在发送给 AI 进行排版 (请耐心等待)...")
         try:
-            self.init_api()
+            sched = self.make_scheduler(cancel=cancel)
+            result = sched.run(
+                self._tracked(lambda provider, ctx: self._complete_once(provider, raw_text, note, ctx.cancelled))
+            )
+            self._record_winner(sched)
+            return result
+        except scheduler.RequestCancelled:
+            raise
         except Exception as e:
-            if "proxies" in str(e):
-                return self._call_ai_api_simple(raw_text)
+            print(f"[Error] AI API 调用失败: {e}")
             raise
 
-        system_prompt = self.get_system_prompt()
-        model_name = self.api_config.get("model_name", "gpt-3.5-turbo")
-
+    def _complete_once(self, provider, raw_text, note=None, cancelled=None):
+        """向单个提供商发送一次非流式请求（SDK 的非流式请求无法中途关闭，被取消时等其自行结束）"""
+        client = self._openai_client(provider)
+        if client is None:
+            return self._call_ai_api_simple(raw_text, note, provider, cancelled)
         try:
-            response = self.client.chat.completions.create(
-                model=model_name,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"以下是论文原始内容，请按要求处理：\n\n{raw_text}"},
-                ],
-                temperature=0.05,
+            response = client.chat.completions.create(
+                model=provider.get("model_name", "gpt-3.5-turbo"),
+                messages=self._chat_messages(raw_text, note),
+                temperature=TEMPERATURE,
                 stream=False,
             )
             return response.choices[0].message.content
         except Exception as e:
             if "proxies" in str(e):
-                return self._call_ai_api_simple(raw_text)
+                return self._call_ai_api_simple(raw_text, note, provider, cancelled)
+            raise
+
+    def _chat_messages(self, raw_text, note=None):
+        with self.tracer.span("prompt", cat="ai"):
+            user_content = f"以下是论文原始内容，请按要求处理：\n\n{raw_text}"
+            if note:
+                user_content = f"{note}\n\n{user_content}"
+            return [
+                {"role": "system", "content": self.get_system_prompt()},
+                {"role": "user", "content": user_content},
+            ]
+
+    def stream_ai_api(self, raw_text, on_text=None, log=print, note=None, cancel=None):
+        """API 模式（流式）: 逐块接收 SSE，每收到一段正文就回调 on_text(片段)，返回完整回复
+
+        推理模型在输出正文前可能先长时间输出思考内容；流式接收下超时只针对相邻两块之间的间隔，
+        不再受整段生成时长限制。尚未输出正文前失败会按退避重试 / 切换备用提供商；
+        发出对冲请求后正文先缓存，胜出的请求结束后再一次性交给 on_text。
+
+        Args:
+            on_text: 正文增量回调（如 FileSplitter.feed）
+            log: 日志输出函数（记录首字节、首段正文与总耗时）
+            note: 附加在原文前的补充说明（同 call_ai_api）
+            cancel: 取消令牌，默认 self.cancel_token
+        """
+        print("[2/4] [API模式] 正在以流式方式发送给 AI 进行排版...")
+        t0 = time.perf_counter()
+        marks = {}
+
+        def attempt(provider, ctx):
+            pieces = []
+            live = []  # 非空表示正文已直接交给 on_text
+
+            def on_chunk(content):
+                if ctx.cancelled.is_set():
+                    raise scheduler.RequestCancelled()
+                ctx.first_byte()
+                if "first_byte" not in marks:
+                    marks["first_byte"] = time.perf_counter() - t0
+                    log(f"   -> 首字节: {marks['first_byte']:.1f}s")
+                if not content:
+                    return
+                if "first_text" not in marks:
+                    marks["first_text"] = time.perf_counter() - t0
+                    log(f"   -> 开始输出正文: {marks['first_text']:.1f}s")
+                pieces.append(content)
+                if not live and ctx.commit():
+                    live.append(True)
+                if live and on_text:
+                    on_text(content)
+
+            self._stream_once(provider, raw_text, on_chunk, note, ctx.cancelled)
+            return "".join(pieces), bool(live)
+
+        try:
+            sched = self.make_scheduler(log, cancel=cancel)
+            response, delivered = sched.run(self._tracked(attempt, text_of=lambda r: r[0]))
+            self._record_winner(sched)
+        except scheduler.RequestCancelled:
+            raise
+        except Exception as e:
             print(f"[Error] AI API 调用失败: {e}")
             raise
+        if not delivered and on_text and response:
+            on_text(response)
+
+        log(f"   -> AI 回复接收完毕: {time.perf_counter() - t0:.1f}s, 共 {len(response)} 字")
+        return response
+
+    def _stream_once(self, provider, raw_text, on_chunk, note=None, cancelled=None):
+        """向单个提供商发送一次流式请求，cancelled 被置位后尽快关闭连接"""
+        client = self._openai_client(provider)
+        if client is None:
+            return self._stream_ai_api_simple(raw_text, on_chunk, note, provider, cancelled)
+
+        received = []
+        # 客户端默认超时按非流式请求设置，流式请求只限制两块数据的间隔
+        timeout = http_client.stream_timeout(provider)
+        options = {"timeout": timeout} if timeout is not None else {}
+        try:
+            stream = client.chat.completions.create(
+                model=provider.get("model_name", "gpt-3.5-turbo"),
+                messages=self._chat_messages(raw_text, note),
+                temperature=TEMPERATURE,
+                stream=True,
+                **options,
+            )
+            try:
+                # 被取消时从取消线程关闭响应流，正在阻塞读取的迭代随之结束
+                with cancel.watching(cancelled, getattr(stream, "close", lambda: None)):
+                    for chunk in stream:
+                        received.append(True)
+                        delta = chunk.choices[0].delta if chunk.choices else None
+                        on_chunk(getattr(delta, "content", None))
+            finally:
+                close = getattr(stream, "close", None)
+                if close:
+                    close()
+        except Exception as e:
+            cancel.check(cancelled)
+            # 已收到内容后出错不能改走兼容模式（回调已消费部分片段）
+            if "proxies" not in str(e) or received:
+                raise
+            self._stream_ai_api_simple(raw_text, on_chunk, note, provider, cancelled)
 
-    def prepare_web_mode(self, raw_text):
-        """网页模式: 拼接 Prompt 并复制到剪切板"""
-        print("[2/4] [网页模式] 正在生成提示词...")
+    def _stream_ai_api_simple(self, raw_text, on_chunk, note=None, provider=None, cancelled=None):
+        """兼容模式（流式）：绕过 OpenAI SDK，直接读取 SSE（每行 data: {...}，以 data: [DONE] 结束）"""
+        provider = provider or self.api_config
+        self._check_provider(provider)
+
+        payload = {
+            "model": provider.get("model_name", "gpt-3.5-turbo"),
+            "messages": self._chat_messages(raw_text, note),
+            "temperature": TEMPERATURE,
+            "stream": True,
+        }
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "text/event-stream",
+            "Authorization": f"Bearer {provider['api_key']}",
+        }
 
-        base_prompt = self.get_system_prompt()
-        placeholder = "[在此处粘贴你的论文内容]"
+        # 读取超时作用于每次读取，即两块数据之间的最长间隔；
+        # 读到 [DONE] 后仍把流读完，连接才能归还连接池复用（被取消时连接池立即关闭连接）
+        pool = http_client.pool_for(provider)
+        body = json.dumps(payload).encode("utf-8")
+        url = self._build_chat_url(provider["base_url"])
+        with pool.request("POST", url, body=body, headers=headers, cancel=cancelled) as resp:
+            done = False
+            for line in resp:
+                if cancelled is not None and cancelled.is_set():
+                    raise scheduler.RequestCancelled()
+                line = line.strip()
+                if done or not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    done = True
+                    continue
+                event = json.loads(data.decode("utf-8", errors="ignore"))
+                choices = event.get("choices") or [{}]
+                on_chunk((choices[0].get("delta") or {}).get("content"))
+
+    def use_sharding(self, raw_text):
+        """是否对该原文启用分片模式（api_config 中 "shard": true / false / "auto"）"""
+        shard = self.api_config.get("shard", "auto")
+        if shard == "auto":
+            return len(raw_text) >= sharding.SHARD_MIN_CHARS
+        return bool(shard)
+
+    def call_ai_api_sharded(self, raw_text, concurrency=None, max_chars=None, log=print):
+        """API 模式（分片）: 按章节切分原文，摘要与各章分片并发请求，再按顺序拼回完整回复
 
-        # 拼接完整内容
-        if placeholder in base_prompt:
-            full_content = base_prompt.replace(placeholder, raw_text)
-        else:
+        Args:
+            concurrency: 同时进行的请求数，默认取 api_config["shard_concurrency"]
+            max_chars: 单片原文的目标字数
+            log: 日志输出函数
+        Returns:
+            与整篇请求格式相同的回复（===FILE: ...=== 分隔）；识别不到章节时返回 None
+        """
+        front, shards = sharding.split_chapters(raw_text, max_chars or sharding.SHARD_MAX_CHARS)
+        if not shards:
+            log("   -> 未识别到章节标题，改为整篇请求")
+            return None
+
+        concurrency = concurrency or self.api_config.get("shard_concurrency", sharding.SHARD_CONCURRENCY)
+        log(f"   -> 分片模式: 摘要 + {len(shards)} 个正文分片 (并发 {concurrency})")
+        t0 = time.perf_counter()
+
+        def request(label, text, note, token):
+            t = time.perf_counter()
+            if self.api_config.get("stream", True):
+                reply = self.stream_ai_api(text, log=lambda _msg: None, note=note, cancel=token)
+            else:
+                reply = self.call_ai_api(text, note=note, cancel=token)
+            log(f"   -> {label} 完成 ({time.perf_counter() - t:.1f}s)")
+            return parse_sections(reply or "", expected=EXPECTED_FILES)
+
+        # 各分片共用一个子令牌：任一分片失败即取消子令牌，其余分片的连接立即关闭，
+        # 不必等它们各自跑完（整个任务被取消时子令牌随之取消）
+        with self.cancel_token.linked() as token, \
+                ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ai-shard") as pool:
+            futures = []
+            if front.strip():
+                futures.append(pool.submit(request, "摘要", front, sharding.FRONT_NOTE, token))
+            for shard in shards:
+                label = f"正文分片 {shard.index}/{len(shards)}"
+                futures.append(pool.submit(request, label, shard.text, shard.note(len(shards)), token))
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+            failed = next((f for f in futures if f in done and f.exception() is not None), None)
+            if failed is not None:
+                token.cancel("分片请求失败")
+                for f in futures:
+                    f.cancel()
+                raise failed.exception()
+            results = [f.result() for f in futures]
+
+        front_sections = results[0] if front.strip() else {}
+        bodies = []
+        for shard, sections in zip(shards, results[-len(shards):]):
+            if not sections.get("body.md"):
+                raise RuntimeError(f"正文分片 {shard.index} 未返回 body.md")
+            bodies.append(sections["body.md"])
+
+        parts = [f"===FILE: {name}===\n{content}" for name, content in front_sections.items() if name != "body.md"]
+        parts.append("===FILE: body.md===\n" + sharding.renumber_headings("\n\n".join(bodies)))
+        log(f"   -> 分片合并完成: {time.perf_counter() - t0:.1f}s")
+        return "\n\n".join(parts)
+
+    # ---------- AI 回复缓存 ----------
+    @staticmethod
+    def _model_of(provider):
+        return provider.get("model_name", "gpt-3.5-turbo"), provider.get("base_url", "")
+
+    def _record_winner(self, sched):
+        if sched.winner is not None:
+            with self._served_lock:
+                self._served.append(sched.winner)
+
+    def served_provider(self):
+        """实际给出本次 AI 回复的提供商：尚未请求（如从缓存 / 任务日志恢复）时为主提供商，
+        分片回复由不同模型给出时为 None（无法归属到单个模型，不写缓存）"""
+        with self._served_lock:
+            served = list(self._served)
+        if not served:
+            return self.api_config
+        if len({self._model_of(p) for p in served}) > 1:
+            return None
+        return served[0]
+
+    def ai_settings(self, provider=None):
+        """决定 AI 回复内容的配置：提示词、模型与接口地址（默认主提供商）、温度、分片设置"""
+        model_name, base_url = self._model_of(provider or self.api_config)
+        return (
+            self.get_system_prompt(),
+            model_name,
+            base_url,
+            repr(TEMPERATURE),
+            repr(self.api_config.get("shard", "auto")),
+        )
+
+    def response_cache_key(self, raw_text, provider=None):
+        return cache.hash_parts(*self.ai_settings(provider), raw_text)
+
+    def candidate_providers(self):
+        """可能给出回复的提供商（主提供商 + 备用），同一模型只保留一个"""
+        seen, result = set(), []
+        for provider in self.providers():
+            if self._model_of(provider) not in seen:
+                seen.add(self._model_of(provider))
+                result.append(provider)
+        return result
+
+    def load_cached_response(self, raw_text):
+        """查找同一原文、同一提示词与配置下、由本次可用的某个提供商（按顺序）给出的 AI 回复，未命中返回 None"""
+        for provider in self.candidate_providers():
+            data = get_ai_cache().get_bytes(self.response_cache_key(raw_text, provider))
+            if data is None:
+                continue
+            try:
+                text = zlib.decompress(data).decode("utf-8")
+            except (zlib.error, UnicodeDecodeError):
+                continue
+            with self._served_lock:
+                self._served = [provider]
+            return text
+        return None
+
+    def save_cached_response(self, raw_text, response):
+        """按实际给出回复的提供商写入缓存（见 served_provider）"""
+        provider = self.served_provider()
+        if provider is None:
+            print("[Info] 分片回复来自不同的模型，不写入 AI 回复缓存")
+            return
+        try:
+            data = zlib.compress(response.encode("utf-8"), 6)
+            get_ai_cache().put_bytes(self.response_cache_key(raw_text, provider), data)
+        except OSError as e:
+            print(f"[Warning] 写入 AI 回复缓存失败: {e}")
+
+    def build_web_prompt(self, raw_text):
+        """网页模式: 把原文填入 Prompt，得到要粘贴给 AI 网页端的完整内容"""
+        with self.tracer.span("prompt", cat="ai"):
+            base_prompt = self.get_system_prompt()
+            placeholder = "[在此处粘贴你的论文内容]"
+
+            # 拼接完整内容
+            if placeholder in base_prompt:
+                return base_prompt.replace(placeholder, raw_text)
             # 如果 prompt.txt 里没找到占位符，直接拼在后面
-            full_content = base_prompt + "\n\n" + raw_text
+            return base_prompt + "\n\n" + raw_text
+
+    def prepare_web_mode(self, raw_text):
+        """网页模式: 拼接 Prompt 并复制到剪切板"""
+        print("[2/4] [网页模式] 正在生成提示词...")
+        full_content = self.build_web_prompt(raw_text)
+        if pyperclip is None:
+            print("[Error] 缺少 pyperclip 库。请运行: pip install pyperclip")
+            return None
 
         # 复制到剪切板
         try:
@@ -218,12 +637,13 @@ class Preprocessor:
             print(f"[Error] 剪切板操作失败: {e}")
             return None
 
-    def split_and_save(self, ai_response, output_dir=None):
+    def split_and_save(self, ai_response, output_dir=None, expected=EXPECTED_FILES):
         """步骤 3: 解析 AI 返回的文本并拆分文件
 
         Args:
             ai_response: AI 返回的文本
             output_dir: 输出目录，如果为 None 则使用默认的 MD_DIR
+            expected: 允许的文件名（见 FileSplitter），默认为 prompt.txt 约定的三个文件
         """
         if not ai_response:
             return False
@@ -235,22 +655,15 @@ class Preprocessor:
         if not os.path.exists(target_dir):
             os.makedirs(target_dir)
 
-        # ==================== 修复报错的关键部分 ====================
-        # 原报错原因：正则表达式字符串必须用引号包裹，否则 Python 会把 ``` 当作语法错误
-        # 修复后：使用 r'^...$' 格式
-
-        # 1. 清洗：去掉可能存在的 markdown 代码块包裹
-        # 去掉开头的 ```markdown 或 ```
-        clean_response = re.sub(r"^```(markdown)?\s*", "", ai_response.strip())
-        # 去掉结尾的 ```
-        clean_response = re.sub(r"\s*```$", "", clean_response)
-        # ==========================================================
-
-        # 2. 正则匹配拆分
-        pattern = r"===FILE:\s*(.*?)===\s*(.*?)(?=(===FILE:|$))"
-        matches = re.findall(pattern, clean_response, re.DOTALL)
+        # 按 ===FILE: xxx=== 拆分（与流式模式共用同一个解析器）
+        splitter = FileSplitter(
+            target_dir, on_file=lambda name, _path: print(f"   -> 已保存: {name}"), expected=expected
+        )
+        splitter.feed(ai_response)
+        saved_files = splitter.close()
+        report_split_issues(splitter, print)
 
-        if not matches:
+        if not saved_files:
             print("[Error] 无法解析 AI 返回的内容。")
             print("请检查 AI 是否严格按照 '===FILE: filename===' 格式输出。")
             # 调试用：将内容保存到 debug.txt 方便用户查看
@@ -260,19 +673,7 @@ class Preprocessor:
             print(f"已将原始内容保存至: {debug_path}")
             return False
 
-        saved_files = []
-        for filename, content, _ in matches:
-            filename = filename.strip()
-            content = content.strip()
-
-            save_path = os.path.join(target_dir, filename)
-
-            with open(save_path, "w", encoding="utf-8") as f:
-                f.write(content)
-            saved_files.append(filename)
-            print(f"   -> 已保存: {filename}")
-
-        return len(saved_files) > 0
+        return True
 
     def run_build_engine(self):
         """步骤 4: 调用构建脚本"""
@@ -313,7 +714,13 @@ def main():
 
     formatted_md = None
     if mode == "1":
-        formatted_md = processor.call_ai_api(raw_text)
+        formatted_md = processor.load_cached_response(raw_text)
+        if formatted_md:
+            print("[2/4] [API模式] 命中 AI 回复缓存，跳过 API 调用")
+        else:
+            formatted_md = processor.call_ai_api(raw_text)
+            if formatted_md:
+                processor.save_cached_response(raw_text, formatted_md)
     else:
         # 默认为网页模式
         formatted_md = processor.prepare_web_mode(raw_text)
@@ -0,0 +1,141 @@
+"""AI 提供商的滚动延迟统计与自动选路
+
+每次请求结束后记录一条样本（首字节耗时、输出速度、是否出错），按指数滑动平均（EWMA）更新，
+持久化到项目根目录的 provider_stats.json：
+
+    {"DeepSeek": {"ttfb": 3.2, "tokens_per_sec": 41.5, "error_rate": 0.05, "requests": 37, ...}}
+
+自动模式（api_config.json 顶层 "auto_provider": true）下，每次请求前用 rank() 按得分
+（预计完成一次典型请求的耗时，按错误率放大）给已配置的提供商排序，最快的作为主提供商，其余依次作为备用。
+"""
+import json
+import os
+import re
+import threading
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATS_FILE = os.path.join(ROOT_DIR, "provider_stats.json")
+
+# 滑动平均权重：新样本占 20%，约反映最近 10 次请求
+ALPHA = 0.2
+# 计算得分时假设的典型输出长度（token）
+REFERENCE_TOKENS = 2000
+# 错误率上限（避免得分除以 0）
+MAX_ERROR_RATE = 0.9
+
+_CJK = re.compile(r"[\u3000-\u9fff\uff00-\uffef]")
+
+
+def estimate_tokens(text):
+    """粗略估算 token 数：中文及全角字符按 1 个 / 字，其余按 4 字符 1 个"""
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _ewma(old, new):
+    if old is None:
+        return new
+    return old + ALPHA * (new - old)
+
+
+class ProviderStats:
+    """线程安全的统计表，每次 record 后写回文件"""
+
+    def __init__(self, path=STATS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = None
+
+    def _load(self):
+        if self._data is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # 统计写入失败不影响主流程
+
+    def record(self, name, ok, ttfb=None, elapsed=None, tokens=0):
+        """记录一次请求
+
+        Args:
+            name: 提供商名称（见 scheduler.provider_name）
+            ok: 是否成功
+            ttfb: 首字节耗时（秒）
+            elapsed: 总耗时（秒），与 ttfb 之差用于计算输出速度
+            tokens: 输出的 token 数（可用 estimate_tokens 估算）
+        """
+        with self._lock:
+            entry = self._load().setdefault(name, {"requests": 0, "errors": 0})
+            entry["requests"] += 1
+            entry["errors"] += 0 if ok else 1
+            entry["error_rate"] = _ewma(entry.get("error_rate"), 0.0 if ok else 1.0)
+            if ok and ttfb is not None:
+                entry["ttfb"] = _ewma(entry.get("ttfb"), ttfb)
+            if ok and tokens and elapsed and elapsed > (ttfb or 0):
+                entry["tokens_per_sec"] = _ewma(entry.get("tokens_per_sec"), tokens / (elapsed - (ttfb or 0)))
+            entry["updated"] = time.time()
+            self._save()
+
+    def get(self, name):
+        with self._lock:
+            return dict(self._load().get(name) or {})
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._load().items()}
+
+    def score(self, name):
+        """预计完成一次典型请求的秒数（越小越好）；从未请求过返回 None，从未成功过返回 inf"""
+        entry = self.get(name)
+        if not entry.get("requests"):
+            return None
+        if entry.get("ttfb") is None:
+            return float("inf")
+        seconds = entry["ttfb"]
+        if entry.get("tokens_per_sec"):
+            seconds += REFERENCE_TOKENS / entry["tokens_per_sec"]
+        # 出错后需要重试：期望请求次数约为 1 / (1 - 错误率)
+        return seconds / (1 - min(entry.get("error_rate") or 0.0, MAX_ERROR_RATE))
+
+    def rank(self, providers, name_of):
+        """按得分排序提供商配置；从未请求过的排在最前（先各试一次），同分保持原顺序"""
+        def key(item):
+            index, provider = item
+            score = self.score(name_of(provider))
+            return (score is not None, score or 0.0, index)
+
+        return [provider for _index, provider in sorted(enumerate(providers), key=key)]
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_stats():
+    """进程内共享的统计表"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = ProviderStats()
+        return _default
+
+
+def set_stats_file(path):
+    """改用指定的统计文件（如基准测试使用临时文件，避免污染真实统计）"""
+    global _default
+    with _default_lock:
+        _default = ProviderStats(path)
+        return _default
@@ -0,0 +1,66 @@
+"""按提供商限制 AI 请求的并发数与速率
+
+api_config.json 中的提供商条目可设置：
+
+    "max_concurrent": 2   同时进行的请求数上限
+    "rpm": 30             每分钟最多发起的请求数（请求均匀错开，间隔 60 / rpm 秒）
+
+同一进程内按提供商名称共用一组限制：批量模式下多份文档、分片模式下多个分片的请求一起计数。
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from .scheduler import RequestCancelled, provider_name
+
+
+class ProviderLimiter:
+    def __init__(self, max_concurrent=None, rpm=None):
+        self.max_concurrent = max_concurrent or None
+        self.rpm = rpm or None
+        self._slots = threading.BoundedSemaphore(self.max_concurrent) if self.max_concurrent else None
+        self._lock = threading.Lock()
+        self._next_start = 0.0  # 下一个请求最早的发起时间（time.monotonic）
+
+    def _wait(self, seconds, cancelled):
+        if cancelled is not None:
+            if cancelled.wait(seconds):
+                raise RequestCancelled()
+        else:
+            time.sleep(seconds)
+
+    @contextmanager
+    def slot(self, cancelled=None):
+        """占用一个请求名额；cancelled（threading.Event）被置位时放弃等待并抛出 RequestCancelled"""
+        if self._slots is not None:
+            while not self._slots.acquire(timeout=0.2):
+                if cancelled is not None and cancelled.is_set():
+                    raise RequestCancelled()
+        try:
+            if self.rpm:
+                with self._lock:
+                    now = time.monotonic()
+                    start = max(now, self._next_start)
+                    self._next_start = start + 60.0 / self.rpm
+                if start > now:
+                    self._wait(start - now, cancelled)
+            yield
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_for(provider):
+    """该提供商的共享限流器（提供商配置中的限制改变后自动换新）"""
+    settings = (provider.get("max_concurrent"), provider.get("rpm"))
+    name = provider_name(provider)
+    with _limiters_lock:
+        entry = _limiters.get(name)
+        if entry is None or entry[0] != settings:
+            entry = (settings, ProviderLimiter(*settings))
+            _limiters[name] = entry
+        return entry[1]
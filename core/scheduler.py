@@ -0,0 +1,241 @@
+"""AI 请求调度：重试、退避、备用提供商与对冲请求
+
+    sched = RequestScheduler([主提供商配置, 备用提供商配置, ...], retries=2, hedge_after=20)
+    result = sched.run(lambda provider, ctx: 发起一次请求(provider, ctx))
+
+- 重试：429 / 5xx / 超时 / 连接错误按带抖动的指数退避重试（有 Retry-After 时至少等待该时长）；
+  其他错误（如 401 Key 无效）不重试，直接换下一个提供商；全部失败时抛出最后一个错误
+- 对冲：设置 hedge_after 且有备用提供商时，主请求在该时长内没有首字节（ctx.first_byte()），
+  就把同一请求发给备用提供商，先完成的一方胜出，另一方的 ctx.cancelled 被置位
+- 流式输出：已向下游输出过内容（ctx.commit() 返回 True）的请求失败后不再重试，避免内容重复；
+  一旦发出对冲请求，所有请求都只能先缓存输出，由调用方在结束后取胜者的结果
+- 取消：传入任务的 CancelToken（见 core.cancel）时，任务被取消后每一路请求的 ctx.cancelled 都被置位
+"""
+import http.client
+import queue
+import random
+import socket
+import threading
+import time
+
+from .cancel import Cancelled, CancelToken
+
+RETRIES = 2
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+# 可重试的 HTTP 状态码（另加所有 5xx）
+RETRY_STATUS = {408, 409, 425, 429}
+
+
+class RequestCancelled(Cancelled):
+    """请求被取消（对冲请求中落败的一方，或整个任务被取消）"""
+
+
+def _errors(exc):
+    while exc is not None:
+        yield exc
+        exc = exc.__cause__
+
+
+def _status(exc):
+    status = getattr(exc, "status", None) or getattr(exc, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(exc):
+    """429 / 5xx / 超时 / 连接类错误可重试"""
+    for e in _errors(exc):
+        status = _status(e)
+        if status is not None:
+            return status in RETRY_STATUS or status >= 500
+        if type(e).__name__ in ("APIConnectionError", "APITimeoutError"):
+            return True
+        if isinstance(e, (TimeoutError, socket.timeout, ConnectionError, http.client.HTTPException, OSError)):
+            return True
+    return False
+
+
+def is_provider_error(exc):
+    """提供商一侧的失败：带 HTTP 状态码的错误响应，或连接 / 超时类错误（本地配置错误等不算）"""
+    return any(_status(e) is not None for e in _errors(exc)) or is_retryable(exc)
+
+
+def retry_after(exc):
+    """服务端要求的最短等待秒数（Retry-After），没有则返回 0"""
+    for e in _errors(exc):
+        value = getattr(e, "retry_after", None)
+        if value is None:
+            headers = getattr(getattr(e, "response", None), "headers", None)
+            value = headers.get("retry-after") if headers is not None else None
+        try:
+            return max(0.0, float(value))
+        except (TypeError, ValueError):
+            continue
+    return 0.0
+
+
+def provider_name(provider):
+    return provider.get("provider") or provider.get("base_url") or "API"
+
+
+class AttemptContext:
+    """单次请求的上下文，由请求函数回调"""
+
+    def __init__(self, scheduler, provider, lane, cancelled):
+        self._scheduler = scheduler
+        self.provider = provider
+        self.lane = lane  # "primary" / "hedge"
+        self.cancelled = cancelled  # CancelToken，被置位时应尽快中止请求（可用 watching 登记关闭连接）
+        self.committed = False
+        self.started = time.perf_counter()
+        self.ttfb = None  # 首字节耗时（秒）
+
+    def first_byte(self):
+        """收到首字节时调用（主请求收到首字节后不再发出对冲请求）"""
+        if self.ttfb is None:
+            self.ttfb = time.perf_counter() - self.started
+        self._scheduler._on_first_byte(self)
+
+    def commit(self):
+        """请求直接向下游输出内容前调用：返回 True 表示可以直接输出，False 表示需先缓存"""
+        return self._scheduler._commit(self)
+
+
+class RequestScheduler:
+    def __init__(
+        self,
+        providers,
+        retries=RETRIES,
+        backoff_base=BACKOFF_BASE,
+        backoff_max=BACKOFF_MAX,
+        hedge_after=None,
+        cancel=None,
+        log=print,
+    ):
+        """
+        Args:
+            providers: 提供商配置列表，第一个为主提供商，其余按顺序作为备用
+            retries: 每个提供商的最大重试次数（不含首次）
+            backoff_base / backoff_max: 指数退避的基数与上限（秒）
+            hedge_after: 主请求首字节的等待预算（秒）；None 表示不发对冲请求
+            cancel: 任务的 CancelToken，被取消时中止全部请求并抛出 RequestCancelled
+            log: 日志输出函数
+        """
+        self.providers = [p for p in providers if p]
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.cancel = cancel or CancelToken()
+        self.log = log
+        self.hedged = False
+        self.winner = None  # 胜出请求的提供商配置
+        self._lock = threading.Lock()
+        self._progress = threading.Event()  # 主请求收到首字节或已结束
+
+    # ---------- AttemptContext 回调 ----------
+    def _on_first_byte(self, ctx):
+        if ctx.lane == "primary":
+            self._progress.set()
+
+    def _commit(self, ctx):
+        with self._lock:
+            if not ctx.committed and not self.hedged:
+                ctx.committed = True
+            return ctx.committed
+
+    # ---------- 调度 ----------
+    def backoff(self, attempt, exc=None):
+        """第 attempt 次重试前的等待时间：上限内指数增长，一半固定、一半随机抖动"""
+        cap = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        delay = cap / 2 + random.uniform(0, cap / 2)
+        if exc is not None:
+            delay = max(delay, min(self.backoff_max, retry_after(exc)))
+        return delay
+
+    def _lane(self, fn, providers, lane, cancelled):
+        """在 providers 上依次尝试（每个提供商按退避重试），返回 (提供商, 结果)"""
+        last_error = None
+        for index, provider in enumerate(providers):
+            name = provider_name(provider)
+            if index > 0:
+                self.log(f"   -> 改用备用提供商: {name}")
+            for attempt in range(self.retries + 1):
+                if cancelled.is_set():
+                    raise RequestCancelled()
+                ctx = AttemptContext(self, provider, lane, cancelled)
+                try:
+                    result = fn(provider, ctx)
+                except Exception as e:
+                    if cancelled.is_set():
+                        raise RequestCancelled() from e
+                    # 已向下游输出过内容，重试会导致内容重复
+                    if ctx.committed:
+                        raise
+                    last_error = e
+                    if not is_retryable(e):
+                        self.log(f"   -> {name} 请求失败（不可重试）: {e}")
+                        break
+                    if attempt == self.retries:
+                        self.log(f"   -> {name} 请求失败，已重试 {self.retries} 次: {e}")
+                        break
+                    delay = self.backoff(attempt, e)
+                    self.log(f"   -> {name} 请求失败: {e}，{delay:.1f}s 后重试 ({attempt + 1}/{self.retries})")
+                    if cancelled.wait(delay):
+                        raise RequestCancelled() from e
+                    continue
+                if cancelled.is_set():
+                    raise RequestCancelled()
+                return provider, result
+        raise last_error or ValueError("未配置可用的 API 提供商")
+
+    def run(self, fn):
+        """执行请求 fn(provider, ctx) -> 结果"""
+        if not self.hedge_after or len(self.providers) < 2:
+            with self.cancel.linked() as cancelled:
+                self.winner, result = self._lane(fn, self.providers, "primary", cancelled)
+            return result
+
+        with self.cancel.linked() as primary, self.cancel.linked() as hedge:
+            return self._run_hedged(fn, {"primary": primary, "hedge": hedge})
+
+    def _run_hedged(self, fn, cancels):
+        results = queue.Queue()
+
+        def run_lane(lane, providers):
+            try:
+                results.put((lane, True, self._lane(fn, providers, lane, cancels[lane])))
+            except BaseException as e:  # noqa: BLE001 - 交给调用线程处理
+                results.put((lane, False, e))
+            finally:
+                if lane == "primary":
+                    self._progress.set()
+
+        threading.Thread(target=run_lane, args=("primary", self.providers), daemon=True).start()
+        lanes = 1
+        self._progress.wait(self.hedge_after)
+        with self._lock:
+            if not self._progress.is_set():
+                self.hedged = True
+        if self.hedged:
+            backup = self.providers[1:]
+            self.log(
+                f"   -> {provider_name(self.providers[0])} {self.hedge_after:g}s 内无响应，"
+                f"同时向 {provider_name(backup[0])} 发出对冲请求"
+            )
+            threading.Thread(target=run_lane, args=("hedge", backup), daemon=True).start()
+            lanes = 2
+
+        errors = {}
+        for _ in range(lanes):
+            lane, ok, value = results.get()
+            if ok:
+                for other, event in cancels.items():
+                    if other != lane:
+                        event.set()
+                self.winner, result = value
+                if self.hedged:
+                    self.log(f"   -> 对冲结果: {provider_name(self.winner)} 先完成")
+                return result
+            errors[lane] = value
+        raise errors.get("primary") or errors["hedge"]
@@ -0,0 +1,422 @@
+"""本地排版服务：通过 HTTP 提交文档 → 排队 → 工作线程池排版 → 查询状态 / 下载结果
+
+    python -m core.server --port 8765 --workers 2 --queue 8
+
+接口（均返回 JSON，下载除外）：
+
+    POST /jobs?filename=论文.docx&preset=thesis[&components=cover,abs_cn,body][&pdf=1][&docx=0][&cache=0]
+        请求体为文件原始内容，返回 202 与任务信息；排队数已满时返回 503 并带 Retry-After
+    GET  /jobs                        全部任务
+    GET  /jobs/<id>                   任务状态（排队位置、当前阶段、各阶段耗时、最近日志、输出文件）
+    GET  /jobs/<id>/files/<文件名>     下载结果 docx / pdf
+    GET  /health                      排队数、运行中任务数、工作线程数
+
+    curl --data-binary @论文.docx "http://127.0.0.1:8765/jobs?filename=thesis.docx&preset=thesis"
+
+- 仅 API 模式，AI 配置每个任务开始时从 api_config.json 读取（修改配置无需重启服务）
+- 每个任务有独立的目录（上传文件与输出）和独立的 Markdown 临时目录（FormatJob 用 mkdtemp 创建）
+- 读取与 AI 请求在各工作线程并行；组装按后端能同时组装的份数排队（见 batch.default_build_workers）
+- 结束超过 JOB_TTL 的任务在之后提交新任务时连同文件一起清理
+"""
+import argparse
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from . import build_engine
+from .batch import SUPPORTED_EXTS, default_build_workers
+from .build_engine import COMPONENT_REGISTRY, PRESETS
+from .pipeline import FormatJob, sanitize_filename
+
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+# 同时处理（读取 + AI + 组装）的任务数
+SERVER_WORKERS = 2
+# 排队中的任务上限，超出时拒绝新任务（503），由客户端稍后重试
+QUEUE_DEPTH = 8
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+# 任务结束后保留结果的时长（秒）
+JOB_TTL = 24 * 3600
+JOBS_DIR = os.path.join(build_engine.Config.TEMP_DIR, "server_jobs")
+# 状态接口返回的最近日志行数
+LOG_TAIL = 50
+
+
+class ServiceError(Exception):
+    """请求无法受理（对应 HTTP 状态码）"""
+
+    def __init__(self, status, message, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class FormatService:
+    def __init__(
+        self,
+        workers: int = SERVER_WORKERS,
+        queue_depth: int = QUEUE_DEPTH,
+        jobs_dir: str = JOBS_DIR,
+        backend=None,
+        build_workers: int | None = None,
+        api_config_loader=None,
+        log=print,
+    ):
+        """
+        Args:
+            workers: 工作线程数（同时处理的任务数）
+            queue_depth: 排队任务上限
+            jobs_dir: 各任务目录的上级目录
+            backend: 组装后端（见 DocumentBuilder）
+            build_workers: 同时组装的任务数，默认按后端决定
+            api_config_loader: 返回本次任务 API 配置的函数，默认读取 api_config.json
+        """
+        self.workers = max(1, workers)
+        self.jobs_dir = jobs_dir
+        self.backend = backend
+        self.api_config_loader = api_config_loader or _load_api_config
+        self.log = log
+
+        self.jobs = {}
+        self._queue = queue.Queue(maxsize=max(1, queue_depth))
+        self._lock = threading.Lock()
+        self._build_slots = threading.BoundedSemaphore(build_workers or default_build_workers(backend))
+        self._threads = []
+        self._durations = deque(maxlen=20)  # 最近完成任务的耗时，用于估算 Retry-After
+
+    # ---------- 生命周期 ----------
+    def start(self):
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker_loop, name=f"format-worker-{i + 1}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def shutdown(self, wait=True):
+        """不再接收新任务；排队中的任务会被处理完"""
+        for _ in self._threads:
+            self._queue.put(None)
+        if wait:
+            for t in self._threads:
+                t.join()
+        self._threads = []
+
+    # ---------- 任务 ----------
+    def submit(self, filename, data, components, export_docx=True, export_pdf=False, use_ai_cache=True):
+        """保存上传的文件并加入队列，返回任务信息；队列已满时抛出 ServiceError(503)"""
+        self._gc()
+        name = sanitize_filename(os.path.basename(filename or ""))
+        if os.path.splitext(name)[1].lower() not in SUPPORTED_EXTS:
+            raise ServiceError(400, f"仅支持 {' / '.join(SUPPORTED_EXTS)} 文件")
+        if not data:
+            raise ServiceError(400, "请求体为空")
+        unknown = [key for key in components if key not in COMPONENT_REGISTRY]
+        if unknown or not components:
+            raise ServiceError(400, f"未知组件: {', '.join(unknown)}" if unknown else "未选择任何组件")
+        if not export_docx and not export_pdf:
+            raise ServiceError(400, "未选择任何导出格式")
+
+        job_id = uuid.uuid4().hex[:12]
+        job_dir = os.path.join(self.jobs_dir, job_id)
+        entry = {
+            "id": job_id,
+            "filename": name,
+            "components": list(components),
+            "export_docx": bool(export_docx),
+            "export_pdf": bool(export_pdf),
+            "use_ai_cache": bool(use_ai_cache),
+            "status": "queued",
+            "stage": None,
+            "submitted": time.time(),
+            "started": None,
+            "finished": None,
+            "timings": {},
+            "outputs": [],
+            "error": None,
+            "_dir": job_dir,
+            "_log": deque(maxlen=LOG_TAIL),
+        }
+        os.makedirs(os.path.join(job_dir, "input"))
+        with open(os.path.join(job_dir, "input", name), "wb") as f:
+            f.write(data)
+
+        with self._lock:
+            try:
+                self._queue.put_nowait(job_id)
+            except queue.Full:
+                shutil.rmtree(job_dir, ignore_errors=True)
+                raise ServiceError(503, "排队任务已满，请稍后重试", retry_after=self._retry_after()) from None
+            self.jobs[job_id] = entry
+        self.log(f"📥 [{job_id}] 已受理: {name}")
+        return self.status(job_id)
+
+    def status(self, job_id):
+        with self._lock:
+            entry = self.jobs.get(job_id)
+            if entry is None:
+                raise ServiceError(404, "任务不存在")
+            info = {k: v for k, v in entry.items() if not k.startswith("_")}
+            info["outputs"] = [os.path.basename(p) for p in entry["outputs"]]
+            info["log"] = list(entry["_log"])
+            if entry["status"] == "queued":
+                waiting = sorted(
+                    (e for e in self.jobs.values() if e["status"] == "queued"), key=lambda e: e["submitted"]
+                )
+                info["position"] = next(i for i, e in enumerate(waiting, 1) if e is entry)
+            return info
+
+    def list_jobs(self):
+        with self._lock:
+            ids = sorted(self.jobs, key=lambda k: self.jobs[k]["submitted"])
+        return [self.status(job_id) for job_id in ids]
+
+    def output_path(self, job_id, name):
+        with self._lock:
+            entry = self.jobs.get(job_id)
+            if entry is None:
+                raise ServiceError(404, "任务不存在")
+            if entry["status"] != "ok":
+                raise ServiceError(409, f"任务尚未完成（{entry['status']}）")
+            for path in entry["outputs"]:
+                if os.path.basename(path) == name:
+                    return path
+        raise ServiceError(404, "文件不存在")
+
+    def health(self):
+        with self._lock:
+            counts = {}
+            for entry in self.jobs.values():
+                counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        return {
+            "workers": self.workers,
+            "queue_depth": self._queue.maxsize,
+            "queued": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "jobs": counts,
+        }
+
+    # ---------- 内部 ----------
+    def _retry_after(self):
+        """建议客户端多久后重试：约等于队首任务轮到的时间，至少 5 秒"""
+        if not self._durations:
+            return 30
+        average = sum(self._durations) / len(self._durations)
+        return max(5, int(average * self._queue.qsize() / self.workers))
+
+    def _gc(self):
+        """清理结束超过 JOB_TTL 的任务及其文件"""
+        now = time.time()
+        with self._lock:
+            expired = [
+                e for e in self.jobs.values()
+                if e["finished"] is not None and now - e["finished"] > JOB_TTL
+            ]
+            for entry in expired:
+                del self.jobs[entry["id"]]
+        for entry in expired:
+            shutil.rmtree(entry["_dir"], ignore_errors=True)
+
+    def _job_log(self, entry):
+        prefix = f"[{entry['id']}]"
+
+        def log(text):
+            entry["_log"].append(text)
+            self.log(f"{prefix} {text}")
+
+        return log
+
+    def _worker_loop(self):
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                return
+            with self._lock:
+                entry = self.jobs.get(job_id)
+            if entry is not None:
+                self._run(entry)
+
+    def _set(self, entry, **fields):
+        with self._lock:
+            entry.update(fields)
+
+    def _run(self, entry):
+        self._set(entry, status="running", stage="prepare", started=time.time())
+        api_config = self.api_config_loader()
+        job = FormatJob(
+            os.path.join(entry["_dir"], "input", entry["filename"]),
+            entry["components"],
+            api_config,
+            output_dir=os.path.join(entry["_dir"], "output"),
+            export_docx=entry["export_docx"],
+            export_pdf=entry["export_pdf"],
+            use_ai_cache=entry["use_ai_cache"],
+            backend=self.backend,
+            incremental=False,  # 每个任务的输出目录都是新建的，增量构建清单无从复用
+            # 组装受 _build_slots 限制，不能在 AI 阶段提前启动后端（会占住 Word 实例池的实例）
+            speculative_build=False,
+            log=self._job_log(entry),
+        )
+        try:
+            if not api_config.get("api_key"):
+                raise ValueError("API Key 未配置（请先在 api_config.json 中配置）")
+            job.prepare()
+            for stage, step in (("extract", job.extract), ("ai", job.run_ai), ("split", job.split)):
+                self._set(entry, stage=stage, timings=dict(job.timings))
+                step()
+            self._set(entry, stage="build-wait", timings=dict(job.timings))
+            with self._build_slots:
+                self._set(entry, stage="build")
+                job.resolve_outputs()
+                job.build()
+        except Exception as e:
+            job.log(f"❌ 失败: {e}")
+            self._set(entry, status="failed", error=str(e))
+        else:
+            self._set(entry, status="ok", outputs=list(job.outputs))
+        finally:
+            job.cleanup()
+            finished = time.time()
+            self._set(entry, stage=None, finished=finished, timings=dict(job.timings))
+            self._durations.append(finished - entry["started"])
+
+
+def _load_api_config():
+    from . import config_manager
+
+    return config_manager.get_request_config(config_manager.load_api_config())
+
+
+def _flag(params, name, default):
+    value = params.get(name, [None])[0]
+    if value is None:
+        return default
+    return value.lower() not in ("0", "false", "no", "off", "")
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "AutoFormatter"
+
+        def log_message(self, *_args):
+            pass
+
+        def _route(self):
+            # 请求行按 latin-1 解码，还原为 UTF-8 以支持未转义的中文文件名
+            raw = self.path.encode("latin-1", "replace").decode("utf-8", "replace")
+            parts = urlsplit(raw)
+            segments = [unquote(s) for s in parts.path.strip("/").split("/") if s]
+            return segments, parse_qs(parts.query)
+
+        def _json(self, status, payload, headers=None):
+            data = json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _error(self, e):
+            headers = {"Retry-After": str(e.retry_after)} if e.retry_after else None
+            self._json(e.status, {"error": str(e)}, headers)
+
+        def _file(self, path):
+            size = os.path.getsize(path)
+            ctype = "application/pdf" if path.lower().endswith(".pdf") else \
+                "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(size))
+            self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(os.path.basename(path))}")
+            self.end_headers()
+            with open(path, "rb") as f:
+                shutil.copyfileobj(f, self.wfile)
+
+        def do_GET(self):
+            segments, _params = self._route()
+            try:
+                if segments == ["health"]:
+                    return self._json(200, service.health())
+                if segments == ["jobs"]:
+                    return self._json(200, service.list_jobs())
+                if len(segments) == 2 and segments[0] == "jobs":
+                    return self._json(200, service.status(segments[1]))
+                if len(segments) == 4 and segments[0] == "jobs" and segments[2] == "files":
+                    return self._file(service.output_path(segments[1], segments[3]))
+                raise ServiceError(404, "接口不存在")
+            except ServiceError as e:
+                self._error(e)
+
+        def do_POST(self):
+            segments, params = self._route()
+            try:
+                if segments != ["jobs"]:
+                    raise ServiceError(404, "接口不存在")
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > MAX_UPLOAD_BYTES:
+                    self.close_connection = True  # 不读取过大的请求体，直接断开
+                    raise ServiceError(413, f"文件超过 {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+                data = self.rfile.read(length)
+
+                preset = params.get("preset", ["thesis"])[0]
+                if params.get("components"):
+                    components = [k for k in params["components"][0].split(",") if k]
+                elif preset in PRESETS:
+                    components = PRESETS[preset]
+                else:
+                    raise ServiceError(400, f"未知预设: {preset}")
+                info = service.submit(
+                    params.get("filename", [""])[0],
+                    data,
+                    components,
+                    export_docx=_flag(params, "docx", True),
+                    export_pdf=_flag(params, "pdf", False),
+                    use_ai_cache=_flag(params, "cache", True),
+                )
+                self._json(202, info, {"Location": f"/jobs/{info['id']}"})
+            except ServiceError as e:
+                self._error(e)
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地排版服务（HTTP，API 模式）")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS, help="同时处理的任务数")
+    parser.add_argument("--queue", type=int, default=QUEUE_DEPTH, help="排队任务上限，超出返回 503")
+    parser.add_argument("--build-workers", type=int, default=None, help="同时组装的任务数")
+    parser.add_argument("--backend", default=None, help="组装后端: word / word-pool / ooxml / auto")
+    args = parser.parse_args(argv)
+
+    service = FormatService(
+        workers=args.workers,
+        queue_depth=args.queue,
+        backend=args.backend,
+        build_workers=args.build_workers,
+    ).start()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"🚀 排版服务已启动: http://{args.host}:{server.server_port} "
+          f"(工作线程 {service.workers}, 排队上限 {args.queue})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown(wait=False)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,191 @@
+"""长论文按章节分片
+
+整篇原文一次性发给 AI 时，长论文容易超出上下文长度，耗时也随篇幅线性增长。
+这里在章节边界（"第X章" / "1 绪论"，单章过长时再按 "1.1" 小节）把原文切成若干片：
+
+    front, shards = split_chapters(raw_text, max_chars=12000)
+    # front  -> 封面信息 + 中英文摘要，单独请求 abstract_cn.md / abstract_en.md
+    # shards -> [Shard(...), ...]，每片只请求 body.md，可并发
+
+各片 body.md 按顺序拼接后，用 renumber_headings 统一标题编号（# 1 / ## 1.1 / ### 1.1.1），
+避免模型在不同分片中各自从 1 开始编号。
+"""
+import re
+from dataclasses import dataclass
+
+# 单片原文的目标字数：相邻的短章节会合并到同一片，超过该值的单章再按小节切分
+SHARD_MAX_CHARS = 12000
+# 原文超过该字数时自动启用分片（api_config 中 "shard": "auto"）
+SHARD_MIN_CHARS = 30000
+# 同时进行的 AI 请求数（api_config 中 "shard_concurrency" 可覆盖）
+SHARD_CONCURRENCY = 4
+
+_CN_DIGITS = {"零": 0, "〇": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+
+_CHAPTER_CN = re.compile(r"^第\s*([零〇一二两三四五六七八九十\d]+)\s*章")
+_CHAPTER_NUM = re.compile(r"^(\d{1,2})(?:[ \t　]+|、)(?=\S)")
+_SECTION_NUM = re.compile(r"^(\d{1,2})\s*[.．]\s*(\d{1,2})(?![.．\d])[ \t　]*(?=\S)")
+# 标题行不会以这些标点结尾（用于排除 "1 个样本……。" 之类的正文行）
+_SENTENCE_END = ("。", "；", "，", "：", ".", ";", ",", ":")
+_HEADING_MAX_LEN = 50
+
+_MD_HEADING = re.compile(
+    r"^(#{1,3})[ \t]+(?:第\s*[零〇一二两三四五六七八九十\d]+\s*章|\d+(?:\.\d+)*)(?=[ \t　])", re.M
+)
+
+
+@dataclass
+class Shard:
+    """一段正文原文"""
+    index: int  # 从 1 开始
+    first_chapter: int  # 本片起始章号
+    last_chapter: int  # 本片结束章号
+    text: str
+    continued: bool = False  # 是否从某章中间（小节处）开始
+
+    def note(self, total):
+        """随请求发送的补充说明：本片范围与输出要求"""
+        if self.first_chapter == self.last_chapter:
+            scope = f"第 {self.first_chapter} 章"
+        else:
+            scope = f"第 {self.first_chapter}～{self.last_chapter} 章"
+        lines = [
+            f"【分片说明】这是论文正文的第 {self.index}/{total} 部分（{scope}），其余部分由其他请求并行处理。",
+            "只输出 ===FILE: body.md=== 一个模块，不要输出摘要，也不要补写未提供的章节。",
+            f"章节编号从 {self.first_chapter} 开始，与原文保持一致（图表编号同理）。",
+        ]
+        if self.continued:
+            lines.append(f"本部分从第 {self.first_chapter} 章中间的小节开始，不要重复输出该章的一级标题。")
+        return "\n".join(lines)
+
+
+FRONT_NOTE = (
+    "【分片说明】这是论文的前置部分（题目与中英文摘要），正文由其他请求并行处理。\n"
+    "只输出 ===FILE: abstract_cn.md=== 与 ===FILE: abstract_en.md=== 两个模块，不要输出 body.md。"
+)
+
+
+def _parse_number(token):
+    if token.isdigit():
+        return int(token)
+    # 中文数字：十、十二、二十、二十三
+    if "十" in token:
+        tens, _, ones = token.partition("十")
+        return _CN_DIGITS.get(tens, 1) * 10 + (_CN_DIGITS.get(ones, 0) if ones else 0)
+    return _CN_DIGITS.get(token)
+
+
+def _heading_candidate(line):
+    stripped = line.strip()
+    return 0 < len(stripped) <= _HEADING_MAX_LEN and not stripped.endswith(_SENTENCE_END)
+
+
+def find_chapters(lines):
+    """返回 [(行号, 章号), ...]：章号须从 1 起连续递增，以排除正文中的编号列表
+
+    原文开头带目录时，目录里的章标题会先匹配一遍；再次遇到第 1 章时从头重新计数。
+    """
+    chapters = []
+    for i, line in enumerate(lines):
+        if not _heading_candidate(line):
+            continue
+        stripped = line.strip()
+        m = _CHAPTER_CN.match(stripped) or _CHAPTER_NUM.match(stripped)
+        if not m:
+            continue
+        number = _parse_number(m.group(1))
+        if number == 1:
+            chapters = [(i, 1)]
+        elif chapters and number == chapters[-1][1] + 1:
+            chapters.append((i, number))
+    return chapters
+
+
+def _split_sections(lines, chapter):
+    """单章内按 "N.M" 小节切分，返回各小节起始行号（相对 lines）"""
+    starts = []
+    expected = 1
+    for i, line in enumerate(lines):
+        if not _heading_candidate(line):
+            continue
+        m = _SECTION_NUM.match(line.strip())
+        if m and int(m.group(1)) == chapter and int(m.group(2)) == expected:
+            starts.append(i)
+            expected += 1
+    return starts
+
+
+def _chapter_pieces(lines, chapter, max_chars):
+    """把一章切成不超过 max_chars 的若干块，返回 [(文本, 是否从小节开始), ...]"""
+    text = "\n".join(lines)
+    if len(text) <= max_chars:
+        return [(text, False)]
+
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line) + 1)
+
+    # 在不超过 max_chars 的最后一个小节边界处切开（单个小节本身过长时整节成块）
+    pieces = []
+    begin = 0
+    prev = 0
+    for s in [s for s in _split_sections(lines, chapter) if s > 0] + [len(lines)]:
+        if offsets[s] - offsets[begin] > max_chars and prev > begin:
+            pieces.append(("\n".join(lines[begin:prev]), begin > 0))
+            begin = prev
+        prev = s
+    pieces.append(("\n".join(lines[begin:]), begin > 0))
+    return pieces
+
+
+def split_chapters(raw_text, max_chars=SHARD_MAX_CHARS):
+    """按章节切分原文
+
+    Returns:
+        (front, shards)：front 为第一章之前的内容；shards 为 Shard 列表。
+        识别不到章节时 shards 为空，调用方应退回整篇请求。
+    """
+    lines = raw_text.splitlines()
+    chapters = find_chapters(lines)
+    if len(chapters) < 2:
+        return raw_text, []
+
+    front = "\n".join(lines[:chapters[0][0]]).strip()
+    bounds = [line for line, _no in chapters] + [len(lines)]
+
+    shards = []
+    current = None  # [first_chapter, last_chapter, [texts], continued]
+
+    def flush():
+        if current is not None:
+            shards.append(
+                Shard(len(shards) + 1, current[0], current[1], "\n".join(current[2]).strip(), current[3])
+            )
+
+    for (start, number), end in zip(chapters, bounds[1:]):
+        for piece, continued in _chapter_pieces(lines[start:end], number, max_chars):
+            # 相邻短章节合并到同一片，直到超过 max_chars
+            if current is not None and not continued and sum(map(len, current[2])) + len(piece) <= max_chars:
+                current[1] = number
+                current[2].append(piece)
+                continue
+            flush()
+            current = [number, number, [piece], continued]
+    flush()
+    return front, shards
+
+
+def renumber_headings(markdown):
+    """按出现顺序重排 # / ## / ### 标题的数字编号（保留标题文字与未编号的标题）"""
+    counters = [0, 0, 0]
+
+    def replace(m):
+        level = len(m.group(1))
+        if level > 1 and counters[level - 2] == 0:
+            return m.group(0)
+        counters[level - 1] += 1
+        for i in range(level, 3):
+            counters[i] = 0
+        return f"{m.group(1)} " + ".".join(str(n) for n in counters[:level])
+
+    return _MD_HEADING.sub(replace, markdown)
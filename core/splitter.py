@@ -0,0 +1,295 @@
+"""AI 回复拆分（===FILE: xxx=== 分隔格式）
+
+AI 回复形如：
+
+    ===FILE: abstract_cn.md===
+    ...
+    ===FILE: body.md===
+    ...
+
+FileSplitter 支持增量输入：流式响应每到一块就 feed()，某个文件一旦结束
+（遇到下一个 ===FILE: 标记）立即回调 on_file，最后一个文件在 close() 时结束。
+一次性拆分整段回复时同样适用（feed 全文后 close）。
+
+    splitter = FileSplitter(out_dir, on_file=lambda name, path: print(name), expected=EXPECTED_FILES)
+    for chunk in stream:
+        splitter.feed(chunk)
+    splitter.close()
+
+按行单遍扫描，每个字符只处理一次，内容逐行直接写入目标文件（内存占用与回复长度无关）：
+
+- 标记必须独占一行（允许 ** / ` / # 等包裹，及 "=== FILE: x ===" 这类空格），正文中的 === 不会误切
+- 兼容 CRLF 换行与开头的 BOM
+- 去掉 AI 给整段回复或每个文件加的 ```markdown 代码块包裹，正文中成对的代码块保留；
+  文件开头的裸 ``` 要等到其配对的 ``` 之后（下一个标记或回复结束前）再无内容才视为包裹，
+  判定之前暂缓写出（否则是正文开头的代码块，原样保留）
+- 同名文件出现多次时按顺序接在一起（回调 on_file 两次），记录在 duplicates
+- 文件名只取 basename，缺扩展名补 .md；给定 expected 时按其（不区分大小写）校正，
+  不在其中的段落丢弃并记录在 rejected，避免写出预期之外的文件或写到目录之外
+"""
+import os
+import re
+
+# prompt.txt 约定的三个文件
+EXPECTED_FILES = ("abstract_cn.md", "abstract_en.md", "body.md")
+
+MARKER = re.compile(r"[ \t>*#`]*===[ \t]*FILE[ \t]*:[ \t]*([^=\n]*?)[ \t]*===[*`]*[ \t]*(.*)")
+_FENCE = re.compile(r"[ \t]*(?:`{3,}|~{3,})[ \t]*([\w+-]*)[ \t]*")
+_WRAPPER_INFO = ("", "markdown", "md")
+_SAFE_NAME = re.compile(r"[\w\-. ]+")
+
+
+def normalize_name(raw, expected=None):
+    """把标记中的文件名规范为可安全写盘的 basename；不合法或不在 expected 中时返回 None"""
+    name = raw.strip().strip("`'\"*").strip()
+    name = name.replace("\\", "/").rsplit("/", 1)[-1].strip()
+    if name and "." not in name:
+        name += ".md"
+    if expected is not None:
+        return {e.lower(): e for e in expected}.get(name.lower())
+    if not name or name.startswith(".") or not _SAFE_NAME.fullmatch(name):
+        return None
+    return name
+
+
+def _fence_info(line):
+    """代码块围栏行返回其语言标记（可能为空串），否则返回 None"""
+    if not line.lstrip(" \t").startswith(("```", "~~~")):
+        return None
+    m = _FENCE.fullmatch(line)
+    return None if m is None else m.group(1).lower()
+
+
+class _Section:
+    __slots__ = (
+        "name", "path", "out", "parts", "started", "wrapper", "fences", "held", "written",
+        "deferred", "deferred_fences", "deferred_closing",
+    )
+
+    def __init__(self, name, wrapper=False):
+        self.name = name
+        self.path = None
+        self.out = None  # 写盘时的文件对象
+        self.parts = None  # 不写盘时的内容行
+        self.started = False  # 是否已出现非空行
+        self.wrapper = wrapper  # 是否处于 ```markdown 包裹内
+        self.fences = 0  # 已写出的围栏行数（奇数表示正文中有未闭合的代码块）
+        self.held = []  # 暂缓写出的空行 / 围栏行（可能是文件末尾要去掉的部分）
+        self.written = False
+        self.deferred = None  # 以裸 ``` 开头时暂缓的行（首行即该围栏），判定是否为包裹后重放
+        self.deferred_fences = 0  # 暂缓的行中首行之后的围栏行数
+        self.deferred_closing = False  # 最后一个非空行是否为与首行配对的 ```
+
+
+class FileSplitter:
+    def __init__(self, output_dir, on_file=None, expected=None):
+        """
+        Args:
+            output_dir: 拆分结果的保存目录；为 None 时不写盘，内容保存在 self.sections 中
+            on_file: 每写完一个文件时的回调 on_file(文件名, 路径)，不写盘时路径为 None
+            expected: 允许的文件名集合（如 EXPECTED_FILES），None 表示接受任何安全的文件名
+        """
+        self.output_dir = output_dir
+        self.on_file = on_file
+        self.expected = None if expected is None else tuple(expected)
+        self.saved = []  # 已写出的文件名（按首次出现的顺序）
+        self.sections = {}  # 文件名 -> 内容（仅 output_dir 为 None 时）
+        self.rejected = []  # 被丢弃的段落的原始文件名
+        self.duplicates = []  # 重复出现的文件名
+        self._section = None  # 当前段落；第一个标记之前的内容（如 ```markdown）丢弃
+        self._wrapper_open = False  # 是否有跨文件的 ```markdown 包裹尚未闭合
+        self._buf = []  # 尚未遇到换行的末尾片段
+        self._started = False
+        self._closed = False
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+
+    def feed(self, text):
+        """追加一段回复文本"""
+        if not text:
+            return
+        if not self._started:
+            self._started = True
+            text = text.lstrip("\ufeff")
+        if "\n" not in text:
+            self._buf.append(text)
+            return
+        lines = text.split("\n")
+        if self._buf:
+            self._buf.append(lines[0])
+            lines[0] = "".join(self._buf)
+            self._buf = []
+        tail = lines.pop()
+        if tail:
+            self._buf.append(tail)
+        for line in lines:
+            self._line(line.rstrip("\r"))
+
+    def close(self):
+        """回复结束：写出最后一个文件，返回已写出的文件名列表"""
+        if not self._closed:
+            self._closed = True
+            if self._buf:
+                self._line("".join(self._buf).rstrip("\r"))
+                self._buf = []
+            self._end_section()
+        return self.saved
+
+    # ---------- 内部 ----------
+    def _line(self, line):
+        if "===" in line:
+            m = MARKER.fullmatch(line)
+            if m is not None:
+                self._start_section(m.group(1))
+                if m.group(2).strip():
+                    self._line(m.group(2))
+                return
+
+        section = self._section
+        if section is None:
+            # 标记之前的内容丢弃，只记录是否以 ```markdown 包裹开始
+            info = _fence_info(line)
+            if info is not None:
+                self._wrapper_open = info in _WRAPPER_INFO
+            return
+        if section.name is None:
+            return
+
+        if section.deferred is not None:
+            self._defer(section, line)
+            return
+
+        if not section.started:
+            if not line.strip():
+                return
+            section.started = True
+            info = _fence_info(line)
+            if info in ("markdown", "md"):
+                section.wrapper = True  # 每个文件单独的 ```markdown 包裹
+                return
+            if info == "":
+                section.deferred = [line]  # 可能是包裹，也可能是正文开头的代码块
+                return
+        self._body_line(section, line)
+
+    def _defer(self, section, line):
+        """暂缓以裸 ``` 开头的文件：配对的 ``` 之后又出现正文时即可判定为代码块"""
+        if line.strip():
+            info = _fence_info(line)
+            if info is None and section.deferred_closing:
+                section.deferred.append(line)
+                self._resolve(section, wrapper=False)
+                return
+            if info is not None:
+                section.deferred_closing = info == "" and section.deferred_fences % 2 == 0
+                section.deferred_fences += 1
+        section.deferred.append(line)
+
+    def _resolve(self, section, wrapper):
+        """裸 ``` 判定完毕：是包裹则去掉开头（结尾由 _end_section 去掉），否则原样重放全部暂缓的行"""
+        lines, section.deferred = section.deferred, None
+        if wrapper:
+            section.wrapper = True
+            lines = lines[1:]
+        for line in lines:
+            self._body_line(section, line)
+
+    def _body_line(self, section, line):
+        if not line.strip() or _fence_info(line) in _WRAPPER_INFO:
+            # 空行与可能的包裹围栏先暂缓：若到文件末尾都没有后续内容就去掉
+            section.held.append(line)
+            return
+        self._write_held(section)
+        self._write(section, line)
+
+    def _write_held(self, section):
+        for held in section.held:
+            self._write(section, held)
+        section.held = []
+
+    def _write(self, section, line):
+        if _fence_info(line) is not None:
+            section.fences += 1
+        text = line if not section.written else "\n" + line
+        section.written = True
+        if section.out is not None:
+            section.out.write(text)
+        else:
+            section.parts.append(text)
+
+    def _start_section(self, raw_name):
+        self._end_section()
+        name = normalize_name(raw_name, self.expected)
+        wrapper, self._wrapper_open = self._wrapper_open, False
+        section = _Section(name, wrapper=wrapper)
+        self._section = section
+        if name is None:
+            self.rejected.append(raw_name.strip())
+            return
+
+        duplicate = name in self.saved
+        if duplicate:
+            self.duplicates.append(name)
+        if self.output_dir is None:
+            section.parts = [self.sections.pop(name, "")]
+            section.written = bool(section.parts[0])
+            if section.written:
+                section.parts.append("\n")  # 与上一段之间空一行
+        else:
+            section.path = os.path.join(self.output_dir, name)
+            section.out = open(section.path, "a" if duplicate else "w", encoding="utf-8")
+            if duplicate and section.out.tell() > 0:
+                section.out.write("\n")
+                section.written = True
+
+    def _end_section(self):
+        section, self._section = self._section, None
+        if section is None or section.name is None:
+            return
+
+        if section.deferred is not None:
+            # 首行的裸 ``` 与末尾（紧接下一个文件的 ```markdown 之前）配对的 ``` 之间即全部正文时，才是包裹
+            tail = [line for line in section.deferred[1:] if line.strip()]
+            if tail and _fence_info(tail[-1]) in ("markdown", "md"):
+                tail.pop()
+            fences = sum(_fence_info(line) is not None for line in tail[:-1])
+            wrapper = bool(tail) and _fence_info(tail[-1]) == "" and fences % 2 == 0
+            self._resolve(section, wrapper)
+
+        held = section.held
+        while held and not held[-1].strip():
+            held.pop()
+        # 紧接下一个标记之前的 ```markdown：下一个文件的包裹开头
+        opens_next = bool(held) and _fence_info(held[-1]) in ("markdown", "md")
+        if opens_next:
+            held.pop()
+            while held and not held[-1].strip():
+                held.pop()
+        # 末尾多出的 ```（前面的代码块都已成对闭合）：闭合本文件（或整段回复）的包裹，不属于正文
+        closed = bool(held) and _fence_info(held[-1]) == "" and (
+            section.fences + sum(_fence_info(line) is not None for line in held[:-1])
+        ) % 2 == 0
+        if closed:
+            held.pop()
+            while held and not held[-1].strip():
+                held.pop()
+        self._write_held(section)
+        # 包裹整段回复的 ```markdown 要到最后一个文件末尾才闭合
+        self._wrapper_open = opens_next or (section.wrapper and not closed)
+
+        if section.out is not None:
+            section.out.close()
+        else:
+            self.sections[section.name] = "".join(section.parts)
+        if section.name not in self.saved:
+            self.saved.append(section.name)
+        if self.on_file:
+            self.on_file(section.name, section.path)
+
+
+def parse_sections(text, expected=None):
+    """一次性拆分整段回复，返回 {文件名: 内容}（不写盘）"""
+    splitter = FileSplitter(None, expected=expected)
+    splitter.feed(text)
+    splitter.close()
+    return splitter.sections
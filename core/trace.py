@@ -0,0 +1,113 @@
+"""排版任务的耗时分段记录（Chrome trace 格式）
+
+    tracer = Tracer("论文.docx")
+    with tracer.span("extract"):
+        ...
+    tracer.save("论文.trace.json")   # 在 chrome://tracing 或 https://ui.perfetto.dev 中打开
+    for line in tracer.summary_lines():
+        print(line)
+
+各段按线程分行显示，同一线程内的嵌套调用自然形成层级（如 build > assemble > InsertFile）。
+对冲请求、并行的 Pandoc 转换等在其他线程中执行的片段也记在同一个 Tracer 中（线程安全）。
+不需要记录时传 NULL_TRACER，调用方无需判断。
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class Tracer:
+    def __init__(self, name="job"):
+        self.name = name
+        self.events = []
+        self._t0 = time.perf_counter()
+        self._pid = os.getpid()
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, cat="stage", **args):
+        """记录 with 块的耗时；块内抛出的异常类型记入 args["error"]"""
+        start = time.perf_counter()
+        try:
+            yield args
+        except BaseException as e:
+            args["error"] = type(e).__name__
+            raise
+        finally:
+            self.add(name, start, time.perf_counter(), cat, **args)
+
+    def add(self, name, start, end, cat="stage", **args):
+        """补记一段已知起止时间（time.perf_counter）的片段，如首字节耗时"""
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": round((start - self._t0) * 1e6, 1),
+            "dur": round(max(0.0, end - start) * 1e6, 1),
+            "pid": self._pid,
+            "tid": thread.ident,
+        }
+        if args:
+            event["args"] = {k: v if isinstance(v, (int, float, bool, type(None))) else str(v) for k, v in args.items()}
+        with self._lock:
+            self.events.append(event)
+            self._threads.setdefault(thread.ident, thread.name)
+
+    def to_json(self):
+        meta = [{"name": "process_name", "ph": "M", "pid": self._pid, "args": {"name": self.name}}]
+        with self._lock:
+            meta += [
+                {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": name}}
+                for tid, name in self._threads.items()
+            ]
+            events = sorted(self.events, key=lambda e: e["ts"])
+        return {"traceEvents": meta + events, "displayTimeUnit": "ms"}
+
+    def save(self, path):
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_json(), f, ensure_ascii=False)
+        os.replace(tmp, path)
+        return path
+
+    def summary(self):
+        """按名称汇总：[(名称, 次数, 合计秒, 最长秒)]，按首次出现的先后排序"""
+        rows = {}
+        with self._lock:
+            events = sorted(self.events, key=lambda e: e["ts"])
+        for event in events:
+            row = rows.setdefault(event["name"], [0, 0.0, 0.0])
+            seconds = event["dur"] / 1e6
+            row[0] += 1
+            row[1] += seconds
+            row[2] = max(row[2], seconds)
+        return [(name, count, total, longest) for name, (count, total, longest) in rows.items()]
+
+    def summary_lines(self):
+        rows = self.summary()
+        if not rows:
+            return []
+        width = max(12, max(len(name) for name, *_ in rows) + 2)
+        lines = [f"{'阶段':<{width - 2}}{'次数':>6}{'合计':>10}{'最长':>10}"]
+        for name, count, total, longest in rows:
+            lines.append(f"{name:<{width}}{count:>6}{total:>9.3f}s{longest:>9.3f}s")
+        return lines
+
+
+class _NullTracer:
+    """不记录任何内容的 Tracer"""
+
+    events = ()
+
+    def span(self, name, cat="stage", **args):
+        return nullcontext(args)
+
+    def add(self, name, start, end, cat="stage", **args):
+        pass
+
+
+NULL_TRACER = _NullTracer()
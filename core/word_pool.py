@@ -0,0 +1,411 @@
+"""常驻 Word 实例池
+
+每次构建都 CoInitialize + DispatchEx + Quit 会在真正干活前白白花掉数秒。
+实例池预先启动 N 个 Word，每个实例固定在自己的 COM 单线程套间 (STA) 线程上，
+所有对它的调用都投递到该线程执行；构建时租用一个实例，用完重置后归还。
+
+- 健康检查：租用时在限定时间内关闭残留文档，失败即回收并换一个实例
+- 回收：单实例构建满 max_docs 篇、或某次调用超时（视为卡死）时回收并补充新实例
+- 启动失败：实例连续启动失败、池中已没有存活或启动中的实例时，acquire() 抛出 WordPoolError（带最后一次的错误），
+  下一次 acquire() 重新启动实例，Word 恢复后无需重启程序
+- 取消：任务被取消时（PooledWordBackend.abort）立即放弃等待当前调用，该实例在调用结束后退出并由新实例补充
+- 指标：租用等待时间、实例存活时长、回收原因等，见 WordPool.metrics()
+
+可传入 app_factory=fake_word.FakeWordApplication 在无 Office 的环境下测试。
+"""
+import atexit
+import collections
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from .backends import BuildBackend, WordComBackend
+from .build_engine import Config
+from .cancel import Cancelled
+
+
+class WordInstanceHung(TimeoutError):
+    """Word 实例在限定时间内未响应"""
+
+
+class WordPoolError(RuntimeError):
+    """实例池中的 Word 全部启动失败"""
+
+
+class PooledWordInstance:
+    """固定在独立 STA 线程上的一个 Word 实例"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, app_factory=None, startup_delay=0.2):
+        self.id = next(self._ids)
+        self.backend = WordComBackend(app_factory=app_factory, startup_delay=startup_delay)
+        self.created_at = time.monotonic()
+        self.docs_built = 0
+        self.hung = False
+        self.interrupted = False  # 调用被取消的任务放弃（实例须回收，见 interrupt）
+        self.ready = Future()
+        self._waiting = None
+        self._wait_lock = threading.Lock()
+        self._tasks = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name=f"WordSTA-{self.id}", daemon=True)
+        self._thread.start()
+
+    @property
+    def age(self):
+        return time.monotonic() - self.created_at
+
+    def _loop(self):
+        # backend.start() 内完成本线程的 CoInitialize 与 Word 启动
+        try:
+            self.backend.start()
+        except BaseException as e:
+            self.ready.set_exception(e)
+            self.backend.shutdown()
+            return
+        self.ready.set_result(self)
+
+        while True:
+            item = self._tasks.get()
+            if item is None:
+                break
+            fn, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(self.backend))
+            except BaseException as e:
+                future.set_exception(e)
+
+        self.backend.shutdown()
+
+    def call(self, fn, timeout=None):
+        """在实例线程上执行 fn(backend)，超时则标记为卡死；被 interrupt() 时抛出 Cancelled"""
+        future = Future()
+        woken = threading.Event()
+        future.add_done_callback(lambda _f: woken.set())
+        with self._wait_lock:
+            if self.interrupted:
+                raise Cancelled(f"Word 实例 #{self.id} 的调用已中止")
+            self._waiting = woken
+        self._tasks.put((fn, future))
+        try:
+            woken.wait(timeout)
+        finally:
+            with self._wait_lock:
+                self._waiting = None
+        if future.done():
+            return future.result()
+        future.cancel()
+        if self.interrupted:
+            raise Cancelled(f"Word 实例 #{self.id} 的调用已中止")
+        self.hung = True
+        raise WordInstanceHung(f"Word 实例 #{self.id} 在 {timeout}s 内无响应")
+
+    def interrupt(self):
+        """放弃等待正在进行的调用（可在任意线程调用）；实例归还时被回收，不再用于其他构建"""
+        with self._wait_lock:
+            self.interrupted = True
+            woken = self._waiting
+        if woken is not None:
+            woken.set()
+
+    def stop(self, wait=0):
+        """退出 Word 并结束线程；卡死或被中止的实例只能放弃等待（守护线程随进程退出）"""
+        self._tasks.put(None)
+        if wait and not (self.hung or self.interrupted):
+            self._thread.join(wait)
+
+
+class WordPool:
+    def __init__(
+        self,
+        size=None,
+        max_docs=None,
+        call_timeout=None,
+        health_timeout=10,
+        app_factory=None,
+        startup_delay=0.2,
+    ):
+        """
+        Args:
+            size: 常驻实例数，默认 Config.WORD_POOL_SIZE
+            max_docs: 单实例最多构建的文档数，达到后回收重建，默认 Config.WORD_POOL_MAX_DOCS
+            call_timeout: 单次调用超时（秒），超时视为卡死并回收，默认 Config.WORD_CALL_TIMEOUT
+            health_timeout: 租用时健康检查（重置）的超时（秒）
+            app_factory: 创建 Word.Application 的可调用对象，默认 DispatchEx
+        """
+        self.size = size or Config.WORD_POOL_SIZE
+        self.max_docs = max_docs or Config.WORD_POOL_MAX_DOCS
+        self.call_timeout = call_timeout or Config.WORD_CALL_TIMEOUT
+        self.health_timeout = health_timeout
+        self.app_factory = app_factory
+        self.startup_delay = startup_delay
+
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._instances = set()
+        self._started = False
+        self._closed = False
+
+        self._lease_waits = collections.deque(maxlen=200)
+        self._leases = 0
+        self._recycles = collections.Counter()
+        self._spawn_failures = 0
+        self._spawn_error = None  # 最后一次启动失败的异常（实例全部启动失败时由 acquire 抛出）
+
+    # ---------- 生命周期 ----------
+    def start(self, wait=True):
+        """预启动全部实例（并行启动），wait=True 时等待全部就绪"""
+        with self._lock:
+            if self._started:
+                return self
+            self._started = True
+        instances = [self._spawn() for _ in range(self.size)]
+        if wait:
+            for inst in instances:
+                try:
+                    inst.ready.result()
+                except Exception:
+                    pass
+        return self
+
+    def _spawn(self, attempts=3):
+        inst = PooledWordInstance(self.app_factory, self.startup_delay)
+        with self._lock:
+            self._instances.add(inst)
+
+        def _on_ready(future):
+            if self._closed:
+                inst.stop()
+                return
+            if future.exception() is None:
+                self._idle.put(inst)
+                return
+            print(f"[Warning] Word 实例 #{inst.id} 启动失败: {future.exception()}")
+            # 先补充重试的实例再移除失败的，acquire 不会在两者之间误判为"没有实例"
+            if attempts > 1:
+                self._spawn(attempts - 1)
+            with self._lock:
+                self._instances.discard(inst)
+                self._spawn_failures += 1
+                self._spawn_error = future.exception()
+
+        inst.ready.add_done_callback(_on_ready)
+        return inst
+
+    def _revive(self):
+        """上次的实例全部启动失败时按需重新启动（Word 可能已经恢复）"""
+        with self._lock:
+            if self._instances or self._spawn_error is None:
+                return
+            self._spawn_error = None
+        for _ in range(self.size):
+            self._spawn()
+
+    def shutdown(self, wait=10):
+        self._closed = True
+        with self._lock:
+            instances = list(self._instances)
+            self._instances.clear()
+        for inst in instances:
+            inst.stop(wait=wait)
+
+    # ---------- 租用 ----------
+    def acquire(self, timeout=None, cancelled=None):
+        """租用一个健康且已重置的实例
+
+        Args:
+            timeout: 最长等待秒数（None 表示一直等待）
+            cancelled: threading.Event，等待空闲实例期间被置位时放弃租用并抛出 Cancelled
+        Raises:
+            TimeoutError: 超时仍没有空闲实例
+            WordPoolError: 池中的实例全部启动失败
+        """
+        if self._closed:
+            raise RuntimeError("Word 实例池已关闭")
+        self.start(wait=False)
+        self._revive()
+
+        t0 = time.perf_counter()
+        deadline = None if timeout is None else t0 + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            if cancelled is not None and cancelled.is_set():
+                raise Cancelled("已放弃等待 Word 实例")
+            # 定期醒来检查取消与"实例全部启动失败"
+            remaining = 0.2 if remaining is None else min(remaining, 0.2)
+            try:
+                inst = self._idle.get(timeout=remaining)
+            except queue.Empty:
+                with self._lock:
+                    error = None if self._instances else self._spawn_error
+                if error is not None:
+                    raise WordPoolError(str(error)) from error
+                if deadline is None or time.perf_counter() < deadline:
+                    continue
+                raise TimeoutError(f"等待 Word 实例超时 ({timeout}s)") from None
+
+            try:
+                inst.call(lambda backend: backend.reset(), timeout=self.health_timeout)
+            except Exception as e:
+                print(f"[Warning] Word 实例 #{inst.id} 健康检查失败，已回收: {e}")
+                self._recycle(inst, "unhealthy")
+                continue
+
+            wait = time.perf_counter() - t0
+            with self._lock:
+                self._leases += 1
+                self._lease_waits.append(wait)
+            return inst
+
+    def release(self, inst):
+        inst.docs_built += 1
+        if inst.hung:
+            self._recycle(inst, "hung")
+        elif inst.interrupted:
+            self._recycle(inst, "cancelled")
+        elif inst.docs_built >= self.max_docs:
+            self._recycle(inst, "max_docs")
+        elif self._closed:
+            inst.stop()
+        else:
+            self._idle.put(inst)
+
+    def _recycle(self, inst, reason):
+        with self._lock:
+            self._instances.discard(inst)
+            self._recycles[reason] += 1
+        inst.stop()
+        if not self._closed:
+            self._spawn()
+
+    # ---------- 指标 ----------
+    def metrics(self):
+        with self._lock:
+            waits = list(self._lease_waits)
+            instances = list(self._instances)
+            return {
+                "size": self.size,
+                "idle": self._idle.qsize(),
+                "leases": self._leases,
+                "lease_wait_avg_ms": round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+                "lease_wait_max_ms": round(max(waits) * 1000, 2) if waits else 0.0,
+                "instance_ages_s": sorted(round(inst.age, 1) for inst in instances),
+                "docs_per_instance": sorted(inst.docs_built for inst in instances),
+                "recycles": dict(self._recycles),
+                "spawn_failures": self._spawn_failures,
+            }
+
+
+class PooledWordBackend(BuildBackend):
+    """从实例池租用 Word 的后端：start() 租用，shutdown() 归还，调用投递到实例线程执行"""
+
+    name = "word-pool"
+    display_name = "Word (实例池)"
+
+    def __init__(self, pool=None, lease_timeout=None):
+        """
+        Args:
+            pool: WordPool，默认进程内共享的实例池（见 get_default_pool）
+            lease_timeout: 等待空闲实例的最长时间（秒），默认 Config.WORD_LEASE_TIMEOUT
+        """
+        self.pool = pool
+        self.lease_timeout = Config.WORD_LEASE_TIMEOUT if lease_timeout is None else lease_timeout
+        self._inst = None
+        self._lease_wait = 0.0
+        self._calls_before = 0
+        self._last_stats = {}
+        self._aborted = threading.Event()
+
+    def _run(self, method, *args, **kwargs):
+        return self._inst.call(
+            lambda backend: getattr(backend, method)(*args, **kwargs),
+            timeout=self.pool.call_timeout,
+        )
+
+    def start(self):
+        self._lease(self.lease_timeout)
+
+    def try_start(self, timeout):
+        try:
+            self._lease(timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    def _lease(self, timeout):
+        if self.pool is None:
+            self.pool = get_default_pool()
+        t0 = time.perf_counter()
+        self._inst = self.pool.acquire(timeout=timeout, cancelled=self._aborted)
+        self._lease_wait = time.perf_counter() - t0
+        self._calls_before = self._inst.backend.stats().get("com_round_trips", 0)
+
+    def new_document(self, template):
+        self._run("new_document", template)
+
+    def insert_file(self, path):
+        self._run("insert_file", path)
+
+    def insert_page_break(self):
+        self._run("insert_page_break")
+
+    def update_toc(self):
+        self._run("update_toc")
+
+    def process_styles(self):
+        self._run("process_styles")
+
+    def save_as(self, path):
+        self._run("save_as", path)
+
+    def export_pdf(self, path):
+        self._run("export_pdf", path)
+
+    def close_document(self, save_changes=True):
+        if self._inst is None or self._inst.hung or self._inst.interrupted:
+            return  # 回收时实例线程退出 Word，残留文档不保存
+        self._run("close_document", save_changes)
+
+    def abort(self):
+        self._aborted.set()
+        inst = self._inst
+        if inst is not None:
+            inst.interrupt()
+
+    def shutdown(self):
+        inst, self._inst = self._inst, None
+        self._aborted.clear()
+        if inst is None:
+            return
+        self._last_stats = {
+            "lease_wait_ms": round(self._lease_wait * 1000, 2),
+            "instance_id": inst.id,
+            "instance_age_s": round(inst.age, 1),
+            "instance_docs": inst.docs_built + 1,
+        }
+        calls = inst.backend.stats().get("com_round_trips")
+        if calls is not None:
+            self._last_stats["com_round_trips"] = calls - self._calls_before
+        self.pool.release(inst)
+
+    def stats(self):
+        return dict(self._last_stats)
+
+
+# ================= 进程级默认实例池 =================
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_pool():
+    """按 Config 创建（并预启动）进程内共享的实例池，进程退出时自动关闭"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = WordPool().start(wait=False)
+            atexit.register(_default_pool.shutdown)
+        return _default_pool
@@ -1,12 +1,15 @@
 import os
-import time
-import tempfile
-import shutil
 import pyperclip
 from PyQt6.QtCore import QThread, pyqtSignal
 
-from .preprocess import Preprocessor
-from . import build_engine
+from .batch import BatchRunner
+from .cancel import Cancelled, CancelToken
+from .handoff import Handoff, HandoffTimeout
+from .journal import JobJournal
+from .pipeline import FormatJob, JobCancelled, JobError
+
+# 网页模式最长等待用户粘贴 AI 回复的时间（秒），超时后任务失败（断点保留，可继续上次任务）
+WEB_MODE_TIMEOUT = 2 * 3600
 
 
 class WorkerThread(QThread):
@@ -30,14 +33,16 @@ class WorkerThread(QThread):
         output_basename: str | None = None,
         export_docx: bool = True,
         export_pdf: bool = False,
+        use_ai_cache: bool = True,
+        journal=None,
     ):
+        """journal: "继续上次任务"时传入 core.journal.latest() 取回的任务日志，新任务在 run() 中创建"""
         super().__init__()
         self.input_path = input_path
         self.mode = mode  # 'api' 或 'web'
         self.components = components
         self.api_config = api_config or {}  # API 配置
-        self.user_confirmed = False  # 用于网页模式的同步锁
-        self.user_response = None
+        self.handoff = Handoff()  # 网页模式：主界面弹窗把用户粘贴的回复交给本线程
         self.save_path = None
         self.temp_md_dir = None  # 临时目录路径
 
@@ -46,65 +51,79 @@ class WorkerThread(QThread):
         self.output_basename = (output_basename or "").strip() or None
         self.export_docx = bool(export_docx)
         self.export_pdf = bool(export_pdf)
-
-    def _sanitize_filename(self, name: str) -> str:
-        """Windows 文件名清理：去掉不允许字符"""
-        invalid = '<>:/\\|?*"'
-        cleaned = "".join(("_" if ch in invalid else ch) for ch in (name or ""))
-        cleaned = cleaned.strip().strip(".")
-        return cleaned
-
-    def _is_file_locked(self, filepath: str) -> bool:
-        if not filepath or not os.path.exists(filepath):
-            return False
-        try:
-            with open(filepath, "a"):
-                pass
-            return False
-        except PermissionError:
-            return True
-        except Exception:
-            return False
+        # 是否复用 AI 回复缓存（关闭时仍会用新回复刷新缓存）
+        self.use_ai_cache = bool(use_ai_cache)
+        self.journal = journal
+        self.outputs = []
+        # 【取消】按钮置位的取消令牌，贯穿任务的各个阶段（见 core.cancel）
+        self.cancel_token = CancelToken()
 
     def log(self, text):
         self.log_signal.emit(text)
 
+    @property
+    def cancelled(self):
+        return self.cancel_token.is_set()
+
+    def cancel(self):
+        """主界面点击【取消】：结束 Pandoc 进程、关闭 AI 请求连接、放弃 Word 调用，线程随后结束"""
+        if not self.cancel_token.is_set():
+            self.log("⏹️ 正在取消任务...")
+            self.cancel_token.cancel("用户取消")
+
+    def settings(self):
+        """写入任务日志的任务设置（不含 API Key，继续任务时重新读取 API 配置）"""
+        return {
+            "input_path": os.path.abspath(self.input_path),
+            "mode": self.mode,
+            "components": list(self.components),
+            "output_dir": self.output_dir,
+            "output_basename": self.output_basename,
+            "export_docx": self.export_docx,
+            "export_pdf": self.export_pdf,
+            "use_ai_cache": self.use_ai_cache,
+        }
+
     def run(self):
         try:
-            processor = Preprocessor(api_config=self.api_config)
-            builder = build_engine.DocumentBuilder()
+            # 每个阶段完成后在任务日志中记一次断点，失败时可从断点继续（见 core.journal）
+            if self.journal is None:
+                self.journal = JobJournal.create(self.settings())
+            job = FormatJob.from_journal(self.journal, self.api_config, cancel_token=self.cancel_token, log=self.log)
+        except OSError as e:
+            self.log(f"⚠️ 无法创建任务日志，本次不记录断点: {e}")
+            job = FormatJob(
+                self.input_path,
+                self.components,
+                self.api_config,
+                output_dir=self.output_dir,
+                output_basename=self.output_basename,
+                export_docx=self.export_docx,
+                export_pdf=self.export_pdf,
+                use_ai_cache=self.use_ai_cache,
+                cancel_token=self.cancel_token,
+                log=self.log,
+            )
+        try:
+            job.prepare()
+            self.temp_md_dir = job.temp_md_dir
 
-            # 创建临时目录用于存放拆分的 markdown 文件
-            self.temp_md_dir = tempfile.mkdtemp(prefix="autoformatter_")
-            self.log(f"📁 已创建临时目录: {self.temp_md_dir}")
+            # 输入与上次相比均未变化时直接沿用已有输出（见 core.incremental）
+            if self.mode == "api" and job.up_to_date():
+                self.outputs = list(job.outputs)
+                self.finish_signal.emit(True)
+                return
 
             # 1. 转纯文本
-            self.log(f"📄 正在读取文件: {os.path.basename(self.input_path)}...")
-            raw_text = processor.convert_to_plain_text(self.input_path)
-
-            formatted_md = None
+            raw_text = job.extract()
 
             # 2. AI 处理阶段
             if self.mode == "api":
-                self.log("🤖 [API模式] 正在调用 AI 进行排版 (请耐心等待)...")
-                try:
-                    # 如果你没有配置 API Key，这里会报错
-                    formatted_md = processor.call_ai_api(raw_text)
-                except Exception as e:
-                    self.log(f"❌ API 调用失败: {e}")
-                    self._cleanup_temp_dir()
-                    self.finish_signal.emit(False)
-                    return
-            else:
+                job.run_ai()
+            elif not job.restore_response():  # 继续上次任务时，用户上次粘贴的回复已在任务日志中
                 # === 网页模式逻辑 ===
                 self.log("🔗 [网页模式] 正在生成提示词...")
-                base_prompt = processor.get_system_prompt()
-
-                # 拼接提示词
-                if "[在此处粘贴你的论文内容]" in base_prompt:
-                    full_content = base_prompt.replace("[在此处粘贴你的论文内容]", raw_text)
-                else:
-                    full_content = base_prompt + "\n\n" + raw_text
+                full_content = job.processor.build_web_prompt(raw_text)
 
                 # 复制到剪切板
                 pyperclip.copy(full_content)
@@ -120,130 +139,111 @@ class WorkerThread(QThread):
                 )
                 self.ask_user_signal.emit(msg)
 
-                # === 线程阻塞，等待用户点击确定 ===
-                while not self.user_confirmed:
-                    time.sleep(0.5)
+                # 用户在浏览器中与 AI 对话期间，先把组装后端等准备好（须在本线程，Word COM 不能跨线程）；
+                # 用户一交回回复就不再开始后续准备，等待实例池的时间也有上限，不会耽误读取回复
+                job.warm_up(stop=self.handoff)
 
-                self.log("📋 正在读取用户粘贴的内容...")
-                formatted_md = (self.user_response or "").strip()
+                # === 线程阻塞，等待用户点击确定（或点击【取消】） ===
+                try:
+                    response = self.handoff.wait(WEB_MODE_TIMEOUT, cancel=self.cancel_token)
+                except Cancelled as e:
+                    raise JobCancelled() from e
+                except HandoffTimeout as e:
+                    self.log(f"⌛ 等待粘贴 AI 回复超过 {WEB_MODE_TIMEOUT // 60} 分钟，任务已结束。")
+                    raise JobError(
+                        "等待超时", title="等待超时", detail="长时间没有收到粘贴的 AI 回复，请点击【继续上次任务】重新开始。"
+                    ) from e
 
-                if not formatted_md or len(formatted_md) < 10:
-                    self.log("❌ 输入内容为空或无效，流程终止。")
-                    self._cleanup_temp_dir()
-                    self.finish_signal.emit(False)
-                    return
+                self.log("📋 正在读取用户粘贴的内容...")
+                job.set_response(response)
 
             # 3. 拆分文件到临时目录
-            self.log("✂️ 正在拆分 Markdown 文件到临时目录...")
-            if processor.split_and_save(formatted_md, output_dir=self.temp_md_dir):
-                self.log("✅ Markdown 拆分完成。")
-
-                # 4. 组装 Word 文档到临时位置
-                self.log(f"🔨 正在组装 Word 文档 (包含: {len(self.components)} 个组件)...")
-
-                # 构造局部 registry，覆盖 markdown 文件路径（避免修改全局 COMPONENT_REGISTRY，线程更安全）
-                local_registry = {k: dict(v) for k, v in build_engine.COMPONENT_REGISTRY.items()}
-                for key in ["abs_cn", "abs_en", "body"]:
-                    if key in local_registry:
-                        original_path = local_registry[key].get("path", "")
-                        filename = os.path.basename(original_path) if original_path else ""
-                        if filename:
-                            local_registry[key]["path"] = os.path.join(self.temp_md_dir, filename)
+            job.split()
 
-                try:
-                    # 调用构建器，先输出到临时文件
-                    if not self.export_docx and not self.export_pdf:
-                        self.log("❌ 未选择任何导出格式（docx/pdf），流程终止。")
-                        self.finish_signal.emit(False)
-                        return
-
-                    # 5. 计算输出路径（可自定义目录；留空默认 outputs）
-                    outputs_root = build_engine.Config.OUTPUTS_DIR
-                    os.makedirs(outputs_root, exist_ok=True)
-
-                    final_dir = (self.output_dir or "").strip()
-                    if not final_dir:
-                        final_dir = outputs_root
-                    # 相对路径默认放到 outputs 下
-                    if not os.path.isabs(final_dir):
-                        final_dir = os.path.abspath(os.path.join(outputs_root, final_dir))
-                    os.makedirs(final_dir, exist_ok=True)
-
-                    base = self.output_basename
-                    if not base:
-                        base = os.path.splitext(os.path.basename(self.input_path))[0]
-                    base = self._sanitize_filename(base) or f"Output_{int(time.time())}"
-
-                    final_docx = os.path.join(final_dir, f"{base}.docx") if self.export_docx else None
-                    final_pdf = os.path.join(final_dir, f"{base}.pdf") if self.export_pdf else None
-
-                    # 输出占用检测
-                    for target in [p for p in [final_docx, final_pdf] if p]:
-                        if self._is_file_locked(target):
-                            self.log(f"❌ 输出失败：目标文件被占用: {os.path.basename(target)}")
-                            self.error_signal.emit(
-                                "输出失败（文件被占用）",
-                                "检测到目标文件可能正在被 Word/其他程序占用：\n\n"
-                                f"{target}\n\n"
-                                "请先关闭占用程序后重试。",
-                            )
-                            self.finish_signal.emit(False)
-                            return
-
-                    # 6. 构建：docx 可能是最终文件，也可能只是 pdf 的临时中间产物
-                    docx_build_path = final_docx or os.path.join(self.temp_md_dir, f"{base}_temp.docx")
-                    self.log("🔧 正在生成 Word 文档...")
-                    builder.build(
-                        self.components,
-                        docx_build_path,
-                        output_pdf_filename=final_pdf,
-                        component_registry=local_registry,
-                    )
-
-                    # 兼容：如果仅导出 pdf，不保留中间 docx
-                    if not self.export_docx:
-                        try:
-                            if os.path.exists(docx_build_path):
-                                os.remove(docx_build_path)
-                        except Exception:
-                            pass
-
-                    outputs = [p for p in [final_docx, final_pdf] if p]
-                    self.log("✅ 导出完成：")
-                    for p in outputs:
-                        self.log(f"- {os.path.abspath(p)}")
-                    self.finish_signal.emit(True)
-
-                finally:
-                    # 清理临时目录
-                    self._cleanup_temp_dir()
-
-            else:
-                self.log("❌ 文件拆分失败，请检查 AI 返回格式是否包含 ===FILE: ...===")
-                self._cleanup_temp_dir()
-                self.finish_signal.emit(False)
+            # 4. 计算输出路径并组装文档
+            job.resolve_outputs()
+            job.build()
+            self.outputs = list(job.outputs)
+            self.finish_signal.emit(True)
 
+        except JobCancelled:
+            self.log("⏹️ 任务已取消。")
+            self.finish_signal.emit(False)
+        except JobError as e:
+            if e.title:
+                self.error_signal.emit(e.title, e.detail or str(e))
+            self.finish_signal.emit(False)
         except Exception as e:
             self.log(f"❌ 发生严重错误: {str(e)}")
             import traceback
 
             self.log(traceback.format_exc())
-            self._cleanup_temp_dir()
             self.finish_signal.emit(False)
+        finally:
+            # 清理临时目录
+            job.cleanup()
 
     def confirm_continue(self, response_text):
-        """主界面弹窗点击确定后，调用此方法解锁线程"""
-        self.user_response = response_text
-        self.user_confirmed = True
+        """主界面弹窗点击确定后调用：交回用户粘贴的回复，立即唤醒本线程
+
+        Returns:
+            本线程已超时或被取消、不再等待时返回 False
+        """
+        return self.handoff.put(response_text)
 
     def set_save_path(self, path):
         self.save_path = path
 
-    def _cleanup_temp_dir(self):
-        """清理临时目录"""
-        if self.temp_md_dir and os.path.exists(self.temp_md_dir):
-            try:
-                shutil.rmtree(self.temp_md_dir)
-                self.log("🗑️ 已清理临时目录")
-            except Exception as e:
-                self.log(f"⚠️ 清理临时目录失败: {e}")
+
+class BatchWorkerThread(QThread):
+    """批量模式后台线程：驱动 BatchRunner（其内部自带读取 / AI / 组装线程池），仅支持 API 模式"""
+    log_signal = pyqtSignal(str)
+    finish_signal = pyqtSignal(bool)
+
+    def __init__(
+        self,
+        input_paths,
+        components,
+        api_config,
+        output_dir: str | None = None,
+        export_docx: bool = True,
+        export_pdf: bool = False,
+        use_ai_cache: bool = True,
+    ):
+        super().__init__()
+        self.runner = BatchRunner(
+            input_paths,
+            components,
+            api_config,
+            output_dir=output_dir,
+            export_docx=export_docx,
+            export_pdf=export_pdf,
+            use_ai_cache=use_ai_cache,
+            cancel_token=CancelToken(),
+            log=self.log,
+        )
+        self.summary = None
+
+    def log(self, text):
+        self.log_signal.emit(text)
+
+    @property
+    def cancelled(self):
+        return self.runner.cancel_token.is_set()
+
+    def cancel(self):
+        """取消批量任务：进行中的文档立即中止，尚未开始的不再处理"""
+        if not self.cancelled:
+            self.log("⏹️ 正在取消批量任务...")
+            self.runner.cancel_token.cancel("用户取消")
+
+    def run(self):
+        try:
+            self.summary = self.runner.run()
+            self.finish_signal.emit(self.summary["failed"] == 0)
+        except Exception as e:
+            self.log(f"❌ 发生严重错误: {str(e)}")
+            import traceback
+
+            self.log(traceback.format_exc())
+            self.finish_signal.emit(False)
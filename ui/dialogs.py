@@ -1,8 +1,7 @@
 import os
 import sys
 import json
-import urllib.request
-import urllib.error
+import time
 
 from PyQt6.QtWidgets import (
     QDialog,
@@ -16,11 +15,15 @@ from PyQt6.QtWidgets import (
     QMessageBox,
     QGroupBox,
     QTextEdit,
+    QCheckBox,
+    QTableWidget,
+    QTableWidgetItem,
+    QHeaderView,
 )
 from PyQt6.QtCore import Qt, QUrl, QThread, pyqtSignal
 from PyQt6.QtGui import QFont, QDesktopServices, QPixmap
 
-from core import config_manager
+from core import config_manager, http_client, provider_stats
 
 
 def resource_path(relative_path):
@@ -52,25 +55,28 @@ class ConnectionTesterThread(QThread):
                 "messages": [{"role": "user", "content": "Hi"}],
                 "max_tokens": 5,
             }
-            import json, urllib.request
             data = json.dumps(payload).encode("utf-8")
-            req = urllib.request.Request(
-                url,
-                data=data,
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {self.config['api_key']}",
-                },
-                method="POST",
-            )
-            with urllib.request.urlopen(req, timeout=30) as resp:
+            headers = {
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {self.config['api_key']}",
+            }
+            # 与正式请求共用连接池：测试时建立的连接之后可直接复用
+            pool = http_client.pool_for(self.config)
+            with pool.request("POST", url, body=data, headers=headers, timeout=30) as resp:
                 resp.read()
 
+        t0 = time.perf_counter()
+
+        def _record_success():
+            # 测试请求很短，整段耗时近似首字节耗时，作为测速统计的一次样本
+            provider_stats.get_stats().record(self.config["provider"], ok=True, ttfb=time.perf_counter() - t0)
+
         try:
             from openai import OpenAI
         except Exception:
             try:
                 _simple_test_request()
+                _record_success()
                 self.finished_signal.emit(True, "✅ API 连接测试成功！")
                 return
             except Exception as e2:
@@ -78,17 +84,19 @@ class ConnectionTesterThread(QThread):
                 return
 
         try:
-            client = OpenAI(api_key=self.config["api_key"], base_url=self.config["base_url"])
+            client = http_client.get_openai_client(OpenAI, self.config)
             client.chat.completions.create(
                 model=self.config["model_name"],
                 messages=[{"role": "user", "content": "Hi"}],
                 max_tokens=5,
             )
+            _record_success()
             self.finished_signal.emit(True, "✅ API 连接测试成功！")
         except Exception as e:
             if "proxies" in str(e):
                 try:
                     _simple_test_request()
+                    _record_success()
                     self.finished_signal.emit(True, "✅ API 连接测试成功！")
                     return
                 except Exception as e2:
@@ -144,6 +152,23 @@ class ApiConfigDialog(QDialog):
 
         layout.addLayout(form)
 
+        # 自动选路：按测速统计每次选最快的提供商
+        self.cb_auto_provider = QCheckBox("自动选择最快的提供商（按下方测速统计，在所有已配置 Key 的提供商中选路）")
+        self.cb_auto_provider.setFont(QFont("微软雅黑", 10))
+        layout.addWidget(self.cb_auto_provider)
+
+        # 测速统计
+        stats_box = QGroupBox("提供商测速统计（最近请求的滑动平均）")
+        stats_layout = QVBoxLayout(stats_box)
+        self.table_stats = QTableWidget(0, 6)
+        self.table_stats.setHorizontalHeaderLabels(["提供商", "首字节", "输出速度", "错误率", "请求数", "预计耗时"])
+        self.table_stats.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table_stats.verticalHeader().setVisible(False)
+        self.table_stats.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table_stats.setMaximumHeight(160)
+        stats_layout.addWidget(self.table_stats)
+        layout.addWidget(stats_box)
+
         # 提示信息
         tip_label = QLabel(
             "💡 提示：\n"
@@ -182,6 +207,34 @@ class ApiConfigDialog(QDialog):
 
         # 加载现有配置
         self.load_config()
+        self.refresh_stats()
+
+    def refresh_stats(self):
+        """刷新测速统计表，按预计耗时从快到慢排列"""
+        stats = provider_stats.get_stats()
+        rows = []
+        for name, entry in stats.snapshot().items():
+            score = stats.score(name)
+            rows.append((score if score is not None else float("inf"), name, entry))
+        rows.sort(key=lambda row: row[0])
+
+        def fmt(value, pattern):
+            return pattern.format(value) if value is not None else "-"
+
+        self.table_stats.setRowCount(len(rows))
+        for i, (score, name, entry) in enumerate(rows):
+            cells = [
+                name,
+                fmt(entry.get("ttfb"), "{:.1f} s"),
+                fmt(entry.get("tokens_per_sec"), "{:.0f} tok/s"),
+                fmt(entry.get("error_rate"), "{:.0%}"),
+                str(entry.get("requests", 0)),
+                fmt(score if score != float("inf") else None, "{:.1f} s"),
+            ]
+            for col, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                self.table_stats.setItem(i, col, item)
 
     def on_provider_changed(self, provider):
         """当选择提供商时，自动填充默认值"""
@@ -206,6 +259,7 @@ class ApiConfigDialog(QDialog):
         """加载保存的配置"""
         config = config_manager.load_api_config()
         presets = config_manager.get_api_presets()
+        self.cb_auto_provider.setChecked(bool(config.get("auto_provider", False)))
         if config:
             provider = config.get("provider", "DeepSeek")
             if provider in presets:
@@ -262,6 +316,7 @@ class ApiConfigDialog(QDialog):
     def on_test_finished(self, success, message):
         self.btn_test.setEnabled(True)
         self.btn_test.setText("测试连接")
+        self.refresh_stats()
         if success:
             QMessageBox.information(self, "成功", message)
         else:
@@ -283,13 +338,20 @@ class ApiConfigDialog(QDialog):
 
         existing = config_manager.load_api_config()
         providers = existing.get("providers", {})
+        # 保留条目中的其他选项（如 retries / hedge_after），只更新界面上可编辑的字段
         providers[config["provider"]] = {
+            **providers.get(config["provider"], {}),
             "api_key": config["api_key"],
             "base_url": config["base_url"],
             "model_name": config["model_name"],
         }
 
-        save_payload = {"provider": config["provider"], "providers": providers}
+        save_payload = {
+            **existing,
+            "provider": config["provider"],
+            "providers": providers,
+            "auto_provider": self.cb_auto_provider.isChecked(),
+        }
 
         if config_manager.save_api_config(save_payload):
             QMessageBox.information(self, "成功", "配置已保存！")
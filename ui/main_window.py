@@ -22,19 +22,16 @@ from PyQt6.QtGui import QFont
 
 from core import build_engine
 from core import config_manager
-from core.worker import WorkerThread
+from core import journal
+from core.worker import BatchWorkerThread, WorkerThread
 from .widgets import DropArea
 from .dialogs import ApiConfigDialog, WebModeDialog
 from .styles import global_stylesheet
 from .overlay_tour import OverlayTour
 
 # ================= 组件预设配置 =================
-# Key 对应 build_engine.COMPONENT_REGISTRY 的键
-PRESETS = {
-    "thesis": ["cover", "originality", "abs_cn", "abs_en", "symbols", "toc", "body"],
-    "paper": ["cover", "abs_cn", "body"],
-    "report": ["cover_exp", "toc", "body"],
-}
+# Key 对应 build_engine.COMPONENT_REGISTRY 的键（与批量模式共用，定义见 build_engine.PRESETS）
+PRESETS = build_engine.PRESETS
 
 
 class MainWindow(QMainWindow):
@@ -43,6 +40,9 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("SCAU 论文自动化排版工具")
         self.resize(750, 850)
         self.input_file = None
+        self.input_files = []  # 批量模式：拖入的多个文件
+        self.worker = None  # 当前的 WorkerThread / BatchWorkerThread
+        self.web_dialog = None  # 网页模式等待粘贴回复的弹窗
 
         # 主题设置（持久化）
         self.current_theme = config_manager.get_theme("light")
@@ -67,6 +67,7 @@ class MainWindow(QMainWindow):
         # 1. 拖拽区域
         self.drop_area = DropArea()
         self.drop_area.file_dropped.connect(self.on_file_loaded)
+        self.drop_area.files_dropped.connect(self.on_files_loaded)
         self.drop_area.setFixedHeight(180)
         main_layout.addWidget(self.drop_area)
 
@@ -90,6 +91,13 @@ class MainWindow(QMainWindow):
         layout_mode.addWidget(self.rb_web)
         layout_mode.addWidget(self.rb_api)
 
+        # AI 回复缓存：同一原文、提示词与模型再次排版时直接复用上次的回复
+        self.cb_ai_cache = QCheckBox("复用缓存")
+        self.cb_ai_cache.setFont(QFont("微软雅黑", 10))
+        self.cb_ai_cache.setChecked(True)
+        self.cb_ai_cache.setToolTip("API 模式下，原文、提示词与模型配置均未变化时直接使用上次的 AI 回复；取消勾选则强制重新请求")
+        layout_mode.addWidget(self.cb_ai_cache)
+
         layout_mode.addStretch(1)
 
         # 主题切换
@@ -289,7 +297,26 @@ class MainWindow(QMainWindow):
             "QPushButton:disabled { background-color: #B0BEC5; }"
         )
         self.btn_start.clicked.connect(self.start_process)
-        main_layout.addWidget(self.btn_start)
+
+        # 继续上次失败 / 中断的任务（见 core.journal）
+        self.btn_resume = QPushButton("继续上次任务")
+        self.btn_resume.setFixedHeight(50)
+        self.btn_resume.setToolTip("上次排版中途失败时，从最后完成的阶段继续（不再重复调用 AI）")
+        self.btn_resume.clicked.connect(self.resume_last_job)
+
+        # 取消进行中的任务：结束 Pandoc、中断 AI 请求、放弃 Word 文档（见 core.cancel）
+        self.btn_cancel = QPushButton("取消")
+        self.btn_cancel.setFixedHeight(50)
+        self.btn_cancel.setToolTip("中止当前任务；已完成的阶段保留在任务日志中，可稍后继续")
+        self.btn_cancel.setEnabled(False)
+        self.btn_cancel.clicked.connect(self.cancel_worker)
+
+        row_start = QHBoxLayout()
+        row_start.addWidget(self.btn_start, 3)
+        row_start.addWidget(self.btn_resume, 1)
+        row_start.addWidget(self.btn_cancel, 1)
+        main_layout.addLayout(row_start)
+        self.refresh_resume_button()
 
         # 7. 日志输出框
         self.txt_log = QTextEdit()
@@ -357,10 +384,14 @@ class MainWindow(QMainWindow):
         show_dir = output_dir
 
         lines = [f"输出目录: {show_dir}"]
-        if docx_path:
-            lines.append(f"- {docx_path}")
-        if pdf_path:
-            lines.append(f"- {pdf_path}")
+        if self.input_files and (docx_path or pdf_path):
+            formats = " / ".join(ext for ext, path in ((".docx", docx_path), (".pdf", pdf_path)) if path)
+            lines.append(f"- 批量模式：{len(self.input_files)} 个文件各自以输入文件名导出 ({formats})")
+        else:
+            if docx_path:
+                lines.append(f"- {docx_path}")
+            if pdf_path:
+                lines.append(f"- {pdf_path}")
         if not docx_path and not pdf_path:
             lines.append("(请至少选择一种导出格式)")
 
@@ -539,7 +570,7 @@ class MainWindow(QMainWindow):
     def update_drop_area_style(self):
         """根据主题 + 是否已加载文件，刷新拖拽区样式。"""
         theme = self.current_theme
-        loaded = bool(self.input_file)
+        loaded = bool(self.input_file or self.input_files)
 
         if loaded:
             # 已加载文件：保持绿色提示，但深色主题下略压暗
@@ -567,6 +598,7 @@ class MainWindow(QMainWindow):
 
     def on_file_loaded(self, path):
         self.input_file = path
+        self.input_files = []
         self.lbl_path.setText(f"✅ 已加载: {path}")
         filename = os.path.basename(path)
         self.drop_area.setText(f"📄\n文件已就绪\n{filename}\n或拖入其他文档")
@@ -580,6 +612,18 @@ class MainWindow(QMainWindow):
             pass
         self.update_output_preview()
 
+    def on_files_loaded(self, paths):
+        """拖入多个文件 / 文件夹：进入批量模式（导出文件名取各自的输入文件名）"""
+        self.input_file = None
+        self.input_files = list(paths)
+        self.lbl_path.setText(f"✅ 已加载 {len(paths)} 个文件（批量模式，仅支持 API 自动模式）")
+        self.drop_area.setText(f"📚\n批量模式：{len(paths)} 个文件已就绪\n或拖入其他文档")
+        self.update_drop_area_style()
+        for path in paths:
+            self.log(f"文件已加载: {path}")
+        self.edit_output_name.clear()
+        self.update_output_preview()
+
     def log(self, text):
         self.txt_log.append(text)
         # 自动滚动到底部
@@ -602,6 +646,9 @@ class MainWindow(QMainWindow):
             return False
 
     def start_process(self):
+        if self.input_files:
+            self.start_batch()
+            return
         if not self.input_file:
             QMessageBox.warning(self, "提示", "请先拖入论文文件！")
             return
@@ -660,7 +707,7 @@ class MainWindow(QMainWindow):
         api_config = None
         if mode == "api":
             raw_config = config_manager.load_api_config()
-            api_config = config_manager.get_selected_provider_config(raw_config)
+            api_config = config_manager.get_request_config(raw_config)
 
             if not api_config or not api_config.get("api_key"):
                 QMessageBox.warning(self, "提示", "请先配置 API 信息！\n点击【⚙️ API 配置】按钮进行设置。")
@@ -669,33 +716,168 @@ class MainWindow(QMainWindow):
                 return
 
         # 启动线程
-        self.worker = WorkerThread(
-            self.input_file,
-            mode,
+        self.start_worker(
+            WorkerThread(
+                self.input_file,
+                mode,
+                selected_keys,
+                api_config,
+                output_dir=output_dir,
+                output_basename=base,
+                export_docx=bool(docx_path),
+                export_pdf=bool(pdf_path),
+                use_ai_cache=self.cb_ai_cache.isChecked(),
+            )
+        )
+
+    def refresh_resume_button(self):
+        last = journal.latest()
+        self.btn_resume.setEnabled(last is not None)
+        if last is not None:
+            name = os.path.basename(last.settings.get("input_path", ""))
+            self.btn_resume.setToolTip(f"上次任务：{name}\n{last.describe()}")
+
+    def resume_last_job(self):
+        """从最近一个未完成的任务日志继续：已完成的阶段直接读取保存的产物"""
+        last = journal.latest()
+        if last is None:
+            QMessageBox.information(self, "提示", "没有可以继续的任务。")
+            self.refresh_resume_button()
+            return
+        settings = last.settings
+        name = os.path.basename(settings.get("input_path", ""))
+        answer = QMessageBox.question(self, "继续上次任务", f"{name}\n\n{last.describe()}。\n\n是否继续？")
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+
+        api_config = None
+        if settings.get("mode") == "api":
+            api_config = config_manager.get_request_config(config_manager.load_api_config())
+            if not last.done("ai") and not api_config.get("api_key"):
+                QMessageBox.warning(self, "提示", "请先配置 API 信息！\n点击【⚙️ API 配置】按钮进行设置。")
+                return
+
+        self.btn_start.setEnabled(False)
+        self.btn_start.setText("正在处理中...")
+        self.txt_log.clear()
+        self.start_worker(
+            WorkerThread(
+                settings["input_path"],
+                settings.get("mode", "api"),
+                settings["components"],
+                api_config,
+                output_dir=settings.get("output_dir"),
+                output_basename=settings.get("output_basename"),
+                export_docx=settings.get("export_docx", True),
+                export_pdf=settings.get("export_pdf", False),
+                use_ai_cache=settings.get("use_ai_cache", True),
+                journal=last,
+            )
+        )
+
+    def cancel_worker(self):
+        if self.worker is None or not self.worker.isRunning():
+            return
+        self.btn_cancel.setEnabled(False)
+        self.btn_cancel.setText("正在取消...")
+        self.worker.cancel()
+
+    def reset_cancel_button(self, enabled=False):
+        self.btn_cancel.setEnabled(enabled)
+        self.btn_cancel.setText("取消")
+
+    def start_worker(self, worker):
+        self.worker = worker
+        self.btn_resume.setEnabled(False)
+        self.reset_cancel_button(True)
+        self.worker.log_signal.connect(self.log)
+        self.worker.finish_signal.connect(self.on_finish)
+        self.worker.ask_user_signal.connect(self.on_ask_user)
+        self.worker.ask_save_signal.connect(self.on_ask_save)
+        self.worker.error_signal.connect(self.on_worker_error)
+        self.worker.start()
+
+    def start_batch(self):
+        """批量模式：API 模式下并发处理全部文件，结束后在导出目录写入 batch_manifest.json"""
+        if not self.rb_api.isChecked():
+            QMessageBox.warning(self, "提示", "批量排版仅支持 API 自动模式，请先切换模式。")
+            return
+
+        selected_keys = [k for k, cb in self.checks.items() if cb.isChecked()]
+        if not selected_keys:
+            QMessageBox.warning(self, "提示", "请至少勾选一个组件！")
+            return
+
+        _outputs_root, output_dir, _base, docx_path, pdf_path = self.build_output_paths()
+        if not docx_path and not pdf_path:
+            QMessageBox.warning(self, "提示", "请至少选择一种导出格式（DOCX / PDF）！")
+            return
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+        except Exception as e:
+            QMessageBox.critical(self, "无法创建导出目录", f"导出目录不可用：\n{output_dir}\n\n原因：{e}")
+            return
+
+        api_config = config_manager.get_request_config(config_manager.load_api_config())
+        if not api_config.get("api_key"):
+            QMessageBox.warning(self, "提示", "请先配置 API 信息！\n点击【⚙️ API 配置】按钮进行设置。")
+            return
+
+        self.btn_start.setEnabled(False)
+        self.btn_start.setText("正在批量处理中...")
+        self.btn_resume.setEnabled(False)
+        self.txt_log.clear()
+
+        self.worker = BatchWorkerThread(
+            self.input_files,
             selected_keys,
             api_config,
             output_dir=output_dir,
-            output_basename=base,
             export_docx=bool(docx_path),
             export_pdf=bool(pdf_path),
+            use_ai_cache=self.cb_ai_cache.isChecked(),
         )
         self.worker.log_signal.connect(self.log)
-        self.worker.finish_signal.connect(self.on_finish)
-        self.worker.ask_user_signal.connect(self.on_ask_user)
-        self.worker.ask_save_signal.connect(self.on_ask_save)
-        self.worker.error_signal.connect(self.on_worker_error)
+        self.worker.finish_signal.connect(self.on_batch_finish)
+        self.reset_cancel_button(True)
         self.worker.start()
 
+    def on_batch_finish(self, success):
+        self.btn_start.setEnabled(True)
+        self.btn_start.setText("开始排版")
+        self.reset_cancel_button()
+        self.refresh_resume_button()
+        summary = self.worker.summary
+        if summary is None:
+            QMessageBox.warning(self, "失败", "批量排版过程中出现错误，请查看下方日志。")
+            return
+        tips = [
+            f"成功 {summary['ok']} 份，失败 {summary['failed']} 份，耗时 {summary['wall_s']:.0f} 秒。",
+            f"处理清单：{self.worker.runner.manifest_path}",
+        ]
+        if success:
+            QMessageBox.information(self, "批量排版完成", "\n".join(tips))
+        else:
+            QMessageBox.warning(self, "批量排版完成（有失败）", "\n".join(tips + ["", "失败原因见清单与下方日志。"]))
+
     def on_worker_error(self, title, message):
         QMessageBox.warning(self, title, message)
 
     def on_ask_user(self, msg):
-        """处理网页模式的弹窗交互"""
-        dialog = WebModeDialog(self, msg)
-        if dialog.exec() == QDialog.DialogCode.Accepted:
-            self.worker.confirm_continue(dialog.get_text())
+        """处理网页模式的弹窗交互：确定则交回粘贴的回复，取消则取消任务"""
+        worker = self.worker
+        self.web_dialog = WebModeDialog(self, msg)
+        try:
+            accepted = self.web_dialog.exec() == QDialog.DialogCode.Accepted
+            text = self.web_dialog.get_text()
+        finally:
+            self.web_dialog = None
+        if worker.handoff.closed:  # 任务已不再等待（超时），弹窗由 on_finish 关闭
+            return
+        if accepted:
+            worker.confirm_continue(text)
         else:
-            self.worker.confirm_continue("")
+            worker.cancel()
 
     def on_ask_save(self, default_name):
         """让用户选择保存路径与文件名"""
@@ -708,16 +890,20 @@ class MainWindow(QMainWindow):
         self.worker.set_save_path(path)
 
     def on_finish(self, success):
+        if self.web_dialog is not None:  # 等待粘贴回复时任务已结束（超时）
+            self.web_dialog.reject()
         self.btn_start.setEnabled(True)
         self.btn_start.setText("开始排版")
-        if success:
-            _outputs_root, output_dir, _base, docx_path, pdf_path = self.build_output_paths()
-            show_dir = output_dir
+        self.reset_cancel_button()
+        self.refresh_resume_button()
+        if self.worker.cancelled and not success:
+            QMessageBox.information(self, "已取消", "任务已取消。\n已完成的阶段保留在任务日志中，可点击【继续上次任务】接着做。")
+        elif success:
+            # 以实际输出为准（"继续上次任务"时与界面上当前的导出设置可能不同）
+            outputs = self.worker.outputs
+            show_dir = os.path.dirname(outputs[0]) if outputs else self.build_output_paths()[1]
             tips = ["文档生成成功！", f"输出目录：{show_dir}"]
-            if docx_path:
-                tips.append(f"- {os.path.basename(docx_path)}")
-            if pdf_path:
-                tips.append(f"- {os.path.basename(pdf_path)}")
+            tips += [f"- {os.path.basename(p)}" for p in outputs]
             QMessageBox.information(self, "成功", "\n".join(tips))
         else:
             QMessageBox.warning(self, "失败", "排版过程中出现错误，请查看下方日志。")
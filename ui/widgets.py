@@ -1,15 +1,17 @@
-import os
 from PyQt6.QtWidgets import QLabel, QMessageBox
 from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QDragEnterEvent, QDropEvent, QFont
 
+from core.batch import collect_inputs
+
 
 class DropArea(QLabel):
     file_dropped = pyqtSignal(str)
+    files_dropped = pyqtSignal(list)  # 多个文件或文件夹：批量模式
 
     def __init__(self):
         super().__init__()
-        self.setText("📂\n\n将论文文件拖拽至此\n(支持 .docx / .md / .txt)")
+        self.setText("📂\n\n将论文文件拖拽至此\n(支持 .docx / .md / .txt，拖入多个文件或文件夹可批量排版)")
         self.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.setFont(QFont("微软雅黑", 13))
         # 默认样式（会被主窗口主题刷新覆盖）
@@ -32,18 +34,14 @@ class DropArea(QLabel):
         if not files:
             return
 
-        allowed_exts = {".docx", ".md", ".txt"}
-
-        # 支持一次拖入多个时：选择第一个合法文件
-        for path in files:
-            if not path:
-                continue
-            if not os.path.isfile(path):
-                continue
-            ext = os.path.splitext(path)[1].lower()
-            if ext in allowed_exts:
-                self.file_dropped.emit(path)
-                return
+        # 文件夹展开为其中的合法文件；合计多于一个时进入批量模式
+        inputs = collect_inputs([path for path in files if path])
+        if len(inputs) == 1:
+            self.file_dropped.emit(inputs[0])
+            return
+        if inputs:
+            self.files_dropped.emit(inputs)
+            return
 
         # 没有任何合法文件
         QMessageBox.warning(